@@ -0,0 +1,212 @@
+"""
+🥷 Dojutsu-for-AI — Faceted skills catalog
+Built once per process from the skill files, then queried in place of the
+`list_skills()` string dump:
+
+  prefix     name-prefix search — path-compressed trie over the names; skills
+             are numbered in (lowercase name, key) order, so every trie node
+             is a contiguous id range
+  contains   substring search — one lowercase "name key description" blob,
+             scanned with str.find, offsets mapped back to ids by bisect
+  source     frontmatter `source` (cursor_mdc, cursorrules, microsoft, …)
+  scope      declared file scope facet: "any" (no scope), an extension ("py",
+             "ts", …) or "path" (path globs without an extension)
+  files      workspace files / extensions, same cut as ScopedRAG
+  cursor     opaque keyset cursor (last name + key), stable across rebuilds
+
+Facet counts for the whole corpus are precomputed; a filtered query counts
+facets over its matches only.
+"""
+import base64
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from scopes import _PURE_EXT, ScopeIndex, _ext_hint, parse_scope, parse_workspace
+
+MAX_LIMIT = 500
+_NO_SOURCE = "none"
+_EXT = re.compile(r"^[a-z0-9_+-]+(?:\.[a-z0-9_+-]+)*$")
+
+
+def scope_facets(meta):
+    """Scope facet values for a skill's frontmatter."""
+    patterns = parse_scope(meta)
+    if patterns is None:
+        return ["any"]
+    out = set()
+    for p in patterns:
+        m = _PURE_EXT.match(p)
+        hint = m.group(1).lower() if m else _ext_hint(p)
+        out.add(hint if hint and _EXT.match(hint) else "path")  # truncated globs → "path"
+    return sorted(out)
+
+
+def _lcp(a, b, start):
+    end = min(len(a), len(b))
+    i = start
+    while i < end and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _trie(names, lo, hi, depth):
+    """Radix trie over sorted `names[lo:hi]` (all sharing names[lo][:depth]).
+    Node = (lo, hi, {first char: (edge label, child)})."""
+    edges, i = {}, lo
+    while i < hi and len(names[i]) == depth:
+        i += 1
+    while i < hi:
+        c, j = names[i][depth], i + 1
+        while j < hi and names[j][depth] == c:
+            j += 1
+        end = _lcp(names[i], names[j - 1], depth)
+        edges[c] = (names[i][depth:end], _trie(names, i, j, end))
+        i = j
+    return lo, hi, edges
+
+
+def encode_cursor(name, key):
+    return base64.urlsafe_b64encode(f"{name}\0{key}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        name, key = raw.split("\0")
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'") from None
+    return name, key
+
+
+class Catalog:
+    """Read-only catalog over (key, meta) records; see module docstring."""
+
+    def __init__(self, records):
+        latest = dict(records)
+        order = sorted(latest, key=lambda k: ((latest[k].get("name") or k).lower(), k))
+        self.keys = order
+        self.names = [latest[k].get("name") or k for k in order]
+        self.descriptions = [latest[k].get("description", "") for k in order]
+        self.sources = [latest[k].get("source") or _NO_SOURCE for k in order]
+        self.scopes_of = [scope_facets(latest[k]) for k in order]
+        self.sort_keys = [(n.lower(), k) for n, k in zip(self.names, order)]
+        self.ids = {k: i for i, k in enumerate(order)}
+        self.scopes = ScopeIndex()
+        for k in order:
+            self.scopes.add(k, latest[k])
+
+        lowered = [n for n, _ in self.sort_keys]
+        self.trie = _trie(lowered, 0, len(lowered), 0)
+        rows = [f"{n}\t{k}\t{d}".lower().replace("\n", " ")
+                for n, k, d in zip(self.names, order, self.descriptions)]
+        self.blob = "\n".join(rows)
+        self.starts, pos = [], 0
+        for row in rows:
+            self.starts.append(pos)
+            pos += len(row) + 1
+
+        self.by_source, self.by_scope = {}, {}
+        for i, (source, scopes) in enumerate(zip(self.sources, self.scopes_of)):
+            self.by_source.setdefault(source, []).append(i)
+            for s in scopes:
+                self.by_scope.setdefault(s, []).append(i)
+        self.facets = self.facet_counts(range(len(order)))
+
+    def facet_counts(self, ids):
+        """{"source": {value: n}, "scope": {value: n}}, largest first."""
+        def ranked(counts):
+            return dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+        return {"source": ranked(Counter(self.sources[i] for i in ids)),
+                "scope": ranked(Counter(s for i in ids for s in self.scopes_of[i]))}
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ── lookups ──────────────────────────────────────────────────────────────
+
+    def prefix_range(self, prefix):
+        """Id range of names starting with `prefix` (case-insensitive)."""
+        prefix, d = prefix.lower(), 0
+        lo, hi, edges = self.trie
+        while d < len(prefix):
+            edge = edges.get(prefix[d])
+            if edge is None:
+                return range(0)
+            label, (lo, hi, edges) = edge
+            if not label.startswith(prefix[d:d + len(label)]):
+                return range(0)
+            d += len(label)
+        return range(lo, hi)
+
+    def substring(self, text):
+        """Ids whose name, key or description contains `text` (case-insensitive)."""
+        text = text.lower()
+        if not text or "\n" in text:
+            return set() if text else set(range(len(self)))
+        out, pos = set(), self.blob.find(text)
+        while pos >= 0:
+            i = bisect_right(self.starts, pos) - 1
+            out.add(i)
+            nxt = self.starts[i + 1] if i + 1 < len(self.starts) else len(self.blob)
+            pos = self.blob.find(text, nxt)
+        return out
+
+    def _values(self, postings, spec):
+        ids = set()
+        for v in (s.strip().lower() for s in spec.split(",")):
+            ids.update(postings.get(v, ()))
+        return ids
+
+    # ── query ────────────────────────────────────────────────────────────────
+
+    def query(self, prefix="", contains="", source="", scope="", files="", limit=50,
+              cursor=""):
+        """{"total", "items", "next_cursor", "facets"} for the combined filters
+        (comma-separated values OR within a filter, filters AND together)."""
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        base = self.prefix_range(prefix) if prefix else range(len(self))
+        filters = []
+        if contains:
+            filters.append(self.substring(contains))
+        if source:
+            filters.append(self._values(self.by_source, source))
+        if scope:
+            filters.append(self._values(self.by_scope, scope))
+        workspace = parse_workspace(files)
+        if workspace:
+            allowed = self.scopes.candidates(**workspace)
+            filters.append({self.ids[k] for k in allowed})
+        if filters:
+            filters.sort(key=len)
+            smallest, rest = filters[0], filters[1:]
+            matches = sorted(i for i in smallest if i in base and all(i in f for f in rest))
+        else:
+            matches = base
+        facets = self.facets if len(matches) == len(self) else self.facet_counts(matches)
+        start = 0
+        if cursor:
+            name, key = decode_cursor(cursor)
+            start = bisect_left(matches, bisect_right(self.sort_keys, (name.lower(), key)))
+        page = matches[start:start + limit]
+        items = [{"key": self.keys[i], "name": self.names[i],
+                  "description": self.descriptions[i], "source": self.sources[i],
+                  "scope": self.scopes_of[i]} for i in page]
+        last = page[-1] if start + limit < len(matches) else None
+        return {"total": len(matches), "items": items,
+                "next_cursor": None if last is None else encode_cursor(self.names[last],
+                                                                       self.keys[last]),
+                "facets": facets}
+
+
+_CORPUS = None
+
+
+def corpus_catalog():
+    """Catalog over the skill roots, built on first use."""
+    global _CORPUS
+    if _CORPUS is None:
+        from skills_corpus import iter_skill_files, parse_skill, read_skill
+        _CORPUS = Catalog((key, parse_skill(read_skill(path))[0])
+                          for key, path in iter_skill_files())
+    return _CORPUS
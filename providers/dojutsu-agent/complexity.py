@@ -0,0 +1,131 @@
+"""
+🥷 Dojutsu-for-AI — Local task complexity classifier (no LLM call)
+Picks how much of the Precision Absolute pipeline a task deserves:
+
+  execution  → Execution only                    (1 LLM call)
+  byakugan   → Byakugan + Execution              (2 LLM calls)
+  full       → Byakugan × Mode Sage × Jōgan × RAG × Execution (5 steps)
+
+Signals: task length, distinct technologies matched against the skills
+vocabulary (skill directory names; stop words never count, on either side),
+and heavy / light keyword hints.
+"""
+import re
+from enum import Enum
+from typing import NamedTuple
+
+from skill_index import _STOP
+from skills_corpus import SKILLS_DIR
+
+
+class Depth(str, Enum):
+    """Pipeline depth, shallowest first; compares equal to its string value."""
+    EXECUTION = "execution"
+    BYAKUGAN = "byakugan"
+    FULL = "full"
+
+    @classmethod
+    def of(cls, score):
+        if score < EXEC_MAX:
+            return cls.EXECUTION
+        return cls.BYAKUGAN if score < BYAKUGAN_MAX else cls.FULL
+
+
+DEPTHS = tuple(d.value for d in Depth)
+
+# Skill-name fragments that say nothing about a technology
+_GENERIC = {
+    "cursorrules", "prompt", "file", "fil", "pro", "general", "best", "practices",
+    "rules", "guidelines", "guide", "development", "expert", "instructions",
+    "system", "assistant", "technical", "additional", "resources", "master",
+    "programmer", "setup", "style", "code", "coding", "and", "with", "for",
+    "the", "app", "web", "api", "dev", "sdk", "rest", "review", "design",
+    "title", "describing", "issue", "clear", "concise", "descriptive", "customize",
+    "find", "skills", "keys", "model", "models", "framework", "application",
+    "structure", "principles",
+}
+
+HEAVY = {
+    "production", "distributed", "scalable", "scale", "microservice", "microservices",
+    "architecture", "migration", "migrate", "concurrency", "concurrent", "auth",
+    "authentication", "authorization", "security", "queue", "cluster", "sharding",
+    "replication", "idempotency", "idempotent", "backpressure", "realtime",
+    "real-time", "multi-tenant", "failover", "high-availability", "pipeline",
+    "orchestration", "streaming", "consistency", "transactions", "deployment",
+}
+LIGHT = {
+    "function", "snippet", "regex", "rename", "typo", "one-liner", "example",
+    "hello", "convert", "format", "explain", "simple", "quick", "small", "helper",
+    "script", "fix", "print", "sort", "reverse",
+}
+
+# Score thresholds: < EXEC_MAX → execution, < BYAKUGAN_MAX → byakugan, else full
+EXEC_MAX, BYAKUGAN_MAX = 2.0, 5.0
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9.+#_-]*")
+
+
+class Complexity(NamedTuple):
+    depth: Depth
+    score: float
+    reason: str
+    technologies: tuple
+
+
+def _vocabulary(skills_dir=SKILLS_DIR):
+    vocab = set()
+    if not skills_dir.is_dir():
+        return vocab
+    for d in skills_dir.iterdir():
+        if not d.is_dir() or d.name.startswith(("_", ".")):
+            continue
+        name = d.name.lower().replace("_", "-")
+        vocab.add(name)
+        vocab.update(p for p in name.split("-")
+                     if len(p) >= 3 and p not in _GENERIC and p not in _STOP)
+    return vocab
+
+
+_VOCAB = None
+
+
+def vocabulary():
+    """Technology vocabulary derived once from the skills directory names."""
+    global _VOCAB
+    if _VOCAB is None:
+        _VOCAB = frozenset(_vocabulary())
+    return _VOCAB
+
+
+def _terms(task):
+    words = [w.strip(".-_") for w in _WORD.findall(task.lower())]
+    words = [w for w in words if w]
+    pairs = [f"{a}-{b}" for a, b in zip(words, words[1:])]
+    return words, pairs
+
+
+def classify(task, vocab=None):
+    """Return a Complexity(depth, score, reason, technologies) for `task`."""
+    vocab = vocabulary() if vocab is None else vocab
+    words, pairs = _terms(task)
+    techs = sorted({t for t in words + pairs
+                    if t not in _STOP and (t in vocab or t.replace(".", "") in vocab)}
+                   - _GENERIC - LIGHT)
+    heavy = sorted({w for w in words + pairs if w in HEAVY})
+    light = sorted({w for w in words if w in LIGHT})
+
+    length_pts = min(len(words) / 15.0, 3.0)
+    tech_pts = min(len(techs), 4) * 1.0
+    score = round(length_pts + tech_pts + 1.5 * len(heavy) - 1.0 * len(light), 2)
+
+    depth = Depth.of(score)
+
+    parts = [f"{len(words)} words", f"{len(techs)} technologies"]
+    if techs:
+        parts[-1] += f" ({', '.join(techs[:5])})"
+    if heavy:
+        parts.append(f"heavy: {', '.join(heavy[:5])}")
+    if light:
+        parts.append(f"light: {', '.join(light[:5])}")
+    reason = f"score {score} → {depth.value} [{'; '.join(parts)}]"
+    return Complexity(depth, score, reason, tuple(techs))
@@ -0,0 +1,165 @@
+"""
+🥷 Dojutsu-for-AI — Copy-on-write map
+A dict-like hash trie for state that is forked and edited a little at a time
+(the skills index generations). `copy()` is O(1): both maps share every node.
+A write then copies only the nodes on its key's path — at most one branch per
+level (32 slots) and one leaf (≤ LEAF_MAX entries) — so the cost of an edit is
+logarithmic in the map's size, and everything else stays shared.
+
+Layout: leaves are plain dicts until they outgrow LEAF_MAX, then split into a
+32-way branch on the next 5 bits of the key's hash. Small maps are a single
+leaf, so reading them costs about what a dict does. Each node records the edit
+token of the map that created it; a map writes in place only to nodes carrying
+its own token, and copy() hands both sides fresh tokens.
+
+Iteration order follows the trie (hash order), not insertion order.
+"""
+from collections.abc import MutableMapping
+from itertools import chain
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+LEAF_MAX = 256
+
+
+class _Leaf(dict):
+    __slots__ = ("edit",)
+
+
+class _Branch(list):
+    __slots__ = ("edit",)
+
+
+def _owned(node, edit):
+    out = type(node)(node)
+    out.edit = edit
+    return out
+
+
+class CowMap(MutableMapping):
+    __slots__ = ("_root", "_len", "_edit")
+
+    def __init__(self, items=()):
+        self._edit = object()
+        self._root = _Leaf()
+        self._root.edit = self._edit
+        self._len = 0
+        if items:
+            self.update(items)
+
+    def copy(self):
+        """O(1) copy; from now on each side copies what it writes."""
+        out = CowMap.__new__(CowMap)
+        out._root, out._len, out._edit = self._root, self._len, object()
+        self._edit = object()
+        return out
+
+    # ── reads ────────────────────────────────────────────────────────────────
+
+    def _leaf(self, h):
+        node, shift = self._root, 0
+        while type(node) is _Branch:
+            node = node[(h >> shift) & _MASK]
+            shift += _BITS
+        return node
+
+    def __getitem__(self, key):
+        leaf = self._leaf(hash(key))
+        if leaf is None:
+            raise KeyError(key)
+        return leaf[key]
+
+    def get(self, key, default=None):
+        leaf = self._leaf(hash(key))
+        return default if leaf is None else leaf.get(key, default)
+
+    def __contains__(self, key):
+        leaf = self._leaf(hash(key))
+        return leaf is not None and key in leaf
+
+    def __len__(self):
+        return self._len
+
+    def _leaves(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if type(node) is _Branch:
+                stack.extend(child for child in reversed(node) if child)
+            elif node:
+                yield node
+
+    def __iter__(self):
+        if type(self._root) is _Leaf:
+            return iter(self._root)
+        return chain.from_iterable(self._leaves())
+
+    def items(self):
+        if type(self._root) is _Leaf:
+            return self._root.items()
+        return chain.from_iterable(leaf.items() for leaf in self._leaves())
+
+    def values(self):
+        if type(self._root) is _Leaf:
+            return self._root.values()
+        return chain.from_iterable(leaf.values() for leaf in self._leaves())
+
+    def __repr__(self):
+        return f"CowMap({dict(self.items())!r})"
+
+    # ── writes ───────────────────────────────────────────────────────────────
+
+    def _writable(self, h):
+        """(parent branch or None, leaf, leaf depth in bits) for hash `h`, with
+        every node on the path owned by this map."""
+        edit = self._edit
+        node = self._root
+        if node.edit is not edit:
+            node = self._root = _owned(node, edit)
+        parent, shift = None, 0
+        while type(node) is _Branch:
+            i = (h >> shift) & _MASK
+            child = node[i]
+            if child is None:
+                child = node[i] = _Leaf()
+                child.edit = edit
+            elif child.edit is not edit:
+                child = node[i] = _owned(child, edit)
+            parent, node, shift = node, child, shift + _BITS
+        return parent, node, shift
+
+    def _split(self, parent, h, leaf, shift):
+        branch = _Branch([None] * (_MASK + 1))
+        branch.edit = self._edit
+        for key, value in leaf.items():
+            i = (hash(key) >> shift) & _MASK
+            child = branch[i]
+            if child is None:
+                child = branch[i] = _Leaf()
+                child.edit = self._edit
+            child[key] = value
+        if parent is None:
+            self._root = branch
+        else:
+            parent[(h >> (shift - _BITS)) & _MASK] = branch
+
+    def __setitem__(self, key, value):
+        h = hash(key)
+        parent, leaf, shift = self._writable(h)
+        size = len(leaf)
+        leaf[key] = value
+        if len(leaf) > size:
+            self._len += 1
+            if len(leaf) > LEAF_MAX and shift < _HASH_BITS:
+                self._split(parent, h, leaf, shift)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        h = hash(key)
+        parent, leaf, shift = self._writable(h)
+        del leaf[key]
+        self._len -= 1
+        if parent is not None and not leaf:
+            parent[(h >> (shift - _BITS)) & _MASK] = None
@@ -0,0 +1,254 @@
+"""
+🥷 Dojutsu-for-AI — Precomputed extractive skill digests
+Offline (tools/build_skill_digests.py): every SKILL.md is cut into units —
+sentences, list items, headings, fenced code blocks — ranked against the
+skill's own `description` frontmatter, duplicate fences dropped, and the best
+units kept at fixed token budgets. Only character spans are stored, in
+<skills dir>/digests.json next to the skills, keyed by skill directory.
+
+Runtime: `get_content(keys, budget)` splits the budget across the skills and
+slices each file at the largest digest level that fits — no summarization
+call, no re-ranking. A digest whose file hash changed falls back to the full
+skill.
+"""
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+from skills_corpus import iter_skill_files, parse_skill, read_skill, skill_dirs
+
+BUDGETS = (256, 1024, 4096)
+DIGEST_FILE = "digests.json"
+VERSION = 1
+
+_STOP = frozenset("""a an and are as at be by for from has have in into is it its of on or
+that the this to was were will with you your use using when should can not""".split())
+_BOILERPLATE = re.compile(
+    r"^(adhere to|follow these|this (guide|document|file)|these (guidelines|rules)|"
+    r"you are an? |as an? (expert|senior))", re.IGNORECASE)
+_ANTI = re.compile(r"^\W*(❌|bad\b|don'?t\b|avoid\b|never\b|wrong\b)", re.IGNORECASE)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z`*_\[(])")
+_LIST = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_WORDS = re.compile(r"[a-z][a-z0-9_+#.-]{2,}")
+
+
+def tokens_of(text):
+    """Token estimate used for budgets (≈ 4 chars per token)."""
+    return (len(text) + 3) // 4
+
+
+def _terms(text):
+    return [w.strip(".-") for w in _WORDS.findall(text.lower()) if w not in _STOP]
+
+
+# ── offline build ────────────────────────────────────────────────────────────
+
+def split_units(text, offset=0):
+    """Cut `text` into [{kind, start, end, heading}] with absolute offsets."""
+    units, heading, para = [], None, []
+    lines = text.splitlines(keepends=True)
+    pos, i = offset, 0
+
+    def flush():
+        if not para:
+            return
+        start, chunk = para[0][0], "".join(t for _, t in para)
+        cursor = 0
+        for piece in _SENTENCE.split(chunk.rstrip()):
+            at = chunk.index(piece, cursor)
+            cursor = at + len(piece)
+            if piece.strip():
+                units.append({"kind": "text", "start": start + at, "end": start + cursor,
+                              "heading": heading})
+        para.clear()
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        if stripped.startswith(("```", "~~~")):
+            flush()
+            fence, start = stripped[:3], pos
+            pos += len(line)
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence):
+                pos += len(lines[i])
+                i += 1
+            if i < len(lines):
+                pos += len(lines[i])
+                i += 1
+            if units and units[-1]["kind"] in ("text", "item") and units[-1]["heading"] == heading:
+                lead = text[units[-1]["start"] - offset:start - offset]
+                if lead.rstrip().endswith(":") or "\n\n" not in lead.strip(" \t"):
+                    start = units.pop()["start"]  # keep the "❌ BAD:" / "✅ GOOD:" lead-in
+            units.append({"kind": "code", "start": start, "end": pos, "heading": heading})
+            continue
+        if stripped.startswith("#"):
+            flush()
+            heading = len(units)
+            units.append({"kind": "heading", "start": pos, "end": pos + len(line.rstrip("\n")),
+                          "heading": None})
+        elif not stripped:
+            flush()
+        elif _LIST.match(line):
+            flush()
+            units.append({"kind": "item", "start": pos, "end": pos + len(line.rstrip("\n")),
+                          "heading": heading})
+        else:
+            para.append((pos, line))
+        pos += len(line)
+        i += 1
+    flush()
+    return units
+
+
+def _shingles(text, n=5):
+    words = text.split()
+    return {" ".join(words[j:j + n]) for j in range(max(1, len(words) - n + 1))}
+
+
+def rank_units(text, units, description, name=""):
+    """Score units against the description; drop duplicate fences and restatements."""
+    desc = set(_terms(f"{description} {name.replace('-', ' ')}"))
+    bags = [set(_terms(text[u["start"]:u["end"]])) for u in units]
+    df = Counter(t for bag in bags for t in bag)
+    n = max(1, len(units))
+    seen_code, kept = [], []
+    for idx, (u, bag) in enumerate(zip(units, bags)):
+        if u["kind"] == "heading":
+            continue
+        body = text[u["start"]:u["end"]]
+        if u["kind"] == "code":
+            fence = min((i for i in (body.find("```"), body.find("~~~")) if i >= 0), default=0)
+            norm = re.sub(r"\s+", " ", body[fence:].strip("`~ \n")).strip()
+            sh = _shingles(norm)
+            if not norm or any(len(sh & s) / len(sh | s) >= 0.8 for s in seen_code):
+                continue
+            seen_code.append(sh)
+        if desc and bag and len(bag & desc) / len(bag | desc) > 0.5:
+            continue  # restates the description
+        overlap = sum(math.log(1 + n / df[t]) for t in bag & desc)
+        score = overlap / math.sqrt(len(bag) + 1)
+        score += 0.3 if u["kind"] == "code" else 0.0
+        score += 0.2 * (1 - idx / n)
+        if _BOILERPLATE.match(body.strip()):
+            score *= 0.3
+        if u["kind"] == "code" and _ANTI.match(body):
+            score *= 0.25  # anti-pattern examples go last
+        kept.append((score, idx))
+    kept.sort(key=lambda p: (-p[0], p[1]))
+    return [idx for _, idx in kept]
+
+
+def select(text, units, ranked, budget):
+    """Greedy pick within `budget` tokens (section headings included) → merged spans."""
+    chosen, used = set(), 0
+    for idx in ranked:
+        u = units[idx]
+        extra = [idx]
+        if u["heading"] is not None and u["heading"] not in chosen:
+            extra.append(u["heading"])
+        cost = sum(tokens_of(text[units[j]["start"]:units[j]["end"]]) + 1 for j in extra)
+        if used + cost <= budget:
+            chosen.update(extra)
+            used += cost
+    spans = []
+    for j in sorted(chosen):
+        s, e = units[j]["start"], units[j]["end"]
+        if spans and not text[spans[-1][1]:s].strip(" \t"):
+            spans[-1][1] = e
+        else:
+            spans.append([s, e])
+    return spans
+
+
+def build_entry(text, budgets=BUDGETS):
+    meta, body = parse_skill(text)
+    offset = len(text) - len(body)
+    units = split_units(body, offset)
+    ranked = rank_units(text, units, meta.get("description", ""), meta.get("name", ""))
+    full = tokens_of(body)
+    return {
+        "name": meta.get("name", ""),
+        "sha1": hashlib.sha1(text.encode()).hexdigest(),
+        "tokens": full,
+        "levels": {str(b): None if full <= b else select(text, units, ranked, b)
+                   for b in budgets},
+    }
+
+
+def build(root, budgets=BUDGETS):
+    """Compute digests for every skill under `root` and write root/digests.json."""
+    root = Path(root)
+    skills = {key: build_entry(read_skill(path), budgets)
+              for key, path in iter_skill_files([root])}
+    data = {"version": VERSION, "budgets": list(budgets), "skills": skills}
+    (root / DIGEST_FILE).write_text(json.dumps(data, separators=(",", ":"), sort_keys=True))
+    return data
+
+
+# ── runtime ──────────────────────────────────────────────────────────────────
+
+_LOADED = {}
+
+
+def _load(root):
+    root = Path(root)
+    if root not in _LOADED:
+        f = root / DIGEST_FILE
+        data = json.loads(f.read_text()) if f.is_file() else {"skills": {}}
+        by_name = {e["name"]: k for k, e in data["skills"].items() if e.get("name")}
+        _LOADED[root] = (data["skills"], by_name)
+    return _LOADED[root]
+
+
+def skill_name(key):
+    """Bare skill name of an index key — SkillsRAG keys are "<source>::<name>"."""
+    return key.rsplit("::", 1)[-1]
+
+
+def _locate(key):
+    name = skill_name(key)
+    for root in skill_dirs():
+        skills, by_name = _load(root)
+        dir_key = name if name in skills else by_name.get(name)
+        if dir_key is not None:
+            return Path(root) / dir_key / "SKILL.md", skills[dir_key]
+    return None, None
+
+
+def digest(key, budget):
+    """Digest of one skill at the largest level ≤ `budget` tokens, or None if unknown/stale."""
+    path, entry = _locate(key)
+    if path is None or not path.is_file():
+        return None
+    text = read_skill(path)
+    if hashlib.sha1(text.encode()).hexdigest() != entry["sha1"]:
+        return None
+    fitting = [int(b) for b in entry["levels"] if int(b) <= budget]
+    level = str(max(fitting) if fitting else min(int(b) for b in entry["levels"]))
+    spans = entry["levels"][level]
+    if spans is None:
+        return parse_skill(text)[1]
+    return "\n".join(text[s:e] for s, e in spans)
+
+
+def get_content(keys, budget, rag=None, sanitize=None):
+    """Skills content for `keys` within ~`budget` tokens (split evenly per skill).
+    Skills without a digest fall back to `rag.get_content([key])`."""
+    keys = list(keys)
+    share = budget // max(1, len(keys))
+    parts = []
+    for key in keys:
+        text = digest(key, share)
+        if text is None:
+            if rag is None:
+                continue
+            parts.append(rag.get_content([key]))
+            continue
+        if sanitize is not None:
+            text = sanitize(text)
+        parts.append(f"## {skill_name(key)}\n{text.strip()}")
+    return "\n\n".join(p for p in parts if p)
@@ -0,0 +1,122 @@
+"""
+🥷 Dojutsu-for-AI — Fused analysis stage
+Byakugan × Mode Sage × Jōgan in ONE LLM call instead of three sequential
+round trips (each re-sending the task + previous outputs).
+
+The model answers a fixed JSON schema; a tolerant parser splits it back into
+the usual `byakugan`, `mode_sage` and `jougan` stage dicts
+({"module", "content", "time"}) so downstream consumers see no difference.
+"""
+import json
+import re
+
+from prompts import task_message
+
+SECTIONS = ("byakugan", "mode_sage", "jougan")
+
+FUSED_SYSTEM = """You are three analysts working in sequence on a software task.
+
+1. BYAKUGAN (structural vision): what is REALLY needed vs what is said — core
+   entities, data flows, boundaries, hidden requirements.
+2. MODE SAGE (systemic coherence): given the Byakugan view, the architecture that
+   stays coherent — patterns, layering, where drift would start.
+3. JOGAN (trajectory anticipation): given both, the failure modes, scaling limits
+   and non-return decisions to settle before writing code.
+
+Answer with ONE JSON object and nothing else, matching this schema:
+{"byakugan": "<markdown>", "mode_sage": "<markdown>", "jougan": "<markdown>"}"""
+
+DELTA_SYSTEM = """You are the same three analysts (BYAKUGAN, MODE SAGE, JOGAN) revisiting a
+software task you already analysed. You get your prior conclusions, condensed, and
+ONE change the user now asks for. Do not repeat what still holds: for each analyst,
+state only what the change adds, removes or invalidates. Use "" when it changes
+nothing for that analyst.
+
+Answer with ONE JSON object and nothing else, matching this schema:
+{"byakugan": "<markdown>", "mode_sage": "<markdown>", "jougan": "<markdown>"}"""
+
+_HEADINGS = {
+    "byakugan": r"byakugan",
+    "mode_sage": r"mode[\s_-]*sage",
+    "jougan": r"j(?:ō|o|ou)gan",
+}
+_HEADING = re.compile(
+    r"^\s*(?:#+\s*|\*\*)?\s*(?:\d+[.)]\s*)?(" + "|".join(_HEADINGS.values()) + r")\b[^\n]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def _section_of(title):
+    for name, pattern in _HEADINGS.items():
+        if re.match(pattern, title, re.IGNORECASE):
+            return name
+    return None
+
+
+def _parse_json(text):
+    body = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text.strip())
+    start, end = body.find("{"), body.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(body[start:end + 1], strict=False)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    data = {k.lower().replace(" ", "_").replace("ō", "ou"): v for k, v in data.items()}
+    if not any(k in data for k in SECTIONS):
+        return None
+    out = {}
+    for k in SECTIONS:
+        v = data.get(k) or ""
+        out[k] = v if isinstance(v, str) else json.dumps(v, ensure_ascii=False)
+    return out
+
+
+def _parse_headings(text):
+    marks = [(m.start(), m.end(), _section_of(m.group(1))) for m in _HEADING.finditer(text)]
+    if not marks:
+        return None
+    out = dict.fromkeys(SECTIONS, "")
+    for i, (_, end, name) in enumerate(marks):
+        stop = marks[i + 1][0] if i + 1 < len(marks) else len(text)
+        out[name] = (out[name] + "\n" + text[end:stop].strip()).strip()
+    return out
+
+
+def parse_fused(text):
+    """Split a fused answer into {byakugan, mode_sage, jougan} strings.
+    JSON first, then markdown headings, else everything lands in byakugan."""
+    return (_parse_json(text) or _parse_headings(text)
+            or {"byakugan": text.strip(), "mode_sage": "", "jougan": ""})
+
+
+class FusedAnalysis:
+    """One-call replacement for Byakugan → ModeSage → Jougan."""
+
+    def __init__(self, llm_caller):
+        self.llm = llm_caller
+
+    def analyze(self, task):
+        content, elapsed = self.llm(
+            FUSED_SYSTEM, task_message(task),
+            label="Byakugan × Mode Sage × Jōgan", max_tokens=4000,
+        )
+        return self._stages(content, elapsed)
+
+    def refine(self, conclusions, change):
+        """Delta pass for a follow-up: only the change + condensed prior conclusions."""
+        content, elapsed = self.llm(
+            DELTA_SYSTEM,
+            [{"role": "user", "content": f"Prior conclusions:\n{conclusions}\n\nChange:\n{change}"}],
+            label="Byakugan × Mode Sage × Jōgan (delta)", max_tokens=2000,
+        )
+        return self._stages(content, elapsed)
+
+    @staticmethod
+    def _stages(content, elapsed):
+        parts = parse_fused(content)
+        share = round(elapsed / len(SECTIONS), 3)
+        return tuple({"module": name, "content": parts[name], "time": share, "fused": True}
+                     for name in SECTIONS)
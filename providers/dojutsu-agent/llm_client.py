@@ -0,0 +1,243 @@
+"""
+🥷 Dojutsu-for-AI — Provider HTTP client (stdlib only)
+llm_caller(system, messages, label="", max_tokens=3000) -> (content, seconds)
+
+- OpenAI-compatible chat completions: groq | openai | mistral | openrouter | huggingface
+- Anthropic Messages API; system prompt shaped by prompts.cache_hint
+- Usage (prompt / completion / cached tokens) as the provider reports it,
+  appended to `caller.usage` — used for every provider, Groq and OpenAI
+  included: senjutsu's SDK caller returns text only (no cached-token counts)
+  and an SDK call cannot be aborted mid-flight
+- Cancellation: a CancelToken bound to the current context (`cancel_scope`)
+  aborts the in-flight request by shutting its socket down
+- Admission: every call waits its turn in the process-wide scheduler
+  (scheduler.py); the queue wait is recorded per call, 429s are retried
+
+Base URLs come from PROVIDER_BASE_URLS, overridable per provider with
+DOJUTSU_<PROVIDER>_BASE_URL or globally with DOJUTSU_BASE_URL.
+"""
+import contextvars
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+import urllib.parse
+
+from prompts import cache_hint
+from scheduler import get_scheduler, stage_of
+
+PROVIDER_BASE_URLS = {
+    "groq":        "https://api.groq.com/openai/v1",
+    "openai":      "https://api.openai.com/v1",
+    "anthropic":   "https://api.anthropic.com/v1",
+    "mistral":     "https://api.mistral.ai/v1",
+    "openrouter":  "https://openrouter.ai/api/v1",
+    "huggingface": "https://router.huggingface.co/v1",
+}
+ANTHROPIC_VERSION = "2023-06-01"
+MAX_429_RETRIES = 3
+
+
+class LLMError(RuntimeError):
+    """Provider returned an error or an unreadable answer."""
+
+
+class Cancelled(LLMError):
+    """The request was cancelled while waiting on the provider."""
+
+
+class CancelToken:
+    """Cancels whatever LLM call is in flight in the context it is bound to."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self.cancelled = False
+
+    def attach(self, conn):
+        with self._lock:
+            self._conn = conn
+        self.check()
+
+    def detach(self):
+        with self._lock:
+            self._conn = None
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled("cancelled")
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            sock = self._conn.sock if self._conn is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+current_cancel = contextvars.ContextVar("dojutsu_cancel", default=None)
+
+
+def cancel_scope(token):
+    """Bind `token` to the current context; returns the contextvars reset token."""
+    return current_cancel.set(token)
+
+
+def _override(provider):
+    return (os.environ.get(f"DOJUTSU_{provider.upper()}_BASE_URL")
+            or os.environ.get("DOJUTSU_BASE_URL"))
+
+
+def base_url(provider):
+    url = _override(provider) or PROVIDER_BASE_URLS.get(provider, PROVIDER_BASE_URLS["openai"])
+    return url.rstrip("/")
+
+
+def build_request(provider, model, system, messages, max_tokens):
+    """Return (path, headers-without-auth, payload) for one completion."""
+    headers = {"Content-Type": "application/json"}
+    if provider == "anthropic":
+        headers["anthropic-version"] = ANTHROPIC_VERSION
+        return "/messages", headers, {
+            "model": model, "max_tokens": max_tokens,
+            "system": cache_hint(system, provider, model), "messages": list(messages),
+        }
+    system_msg = {"role": "system", "content": cache_hint(system, provider, model)}
+    return "/chat/completions", headers, {
+        "model": model, "max_tokens": max_tokens,
+        "messages": [system_msg, *messages],
+    }
+
+
+def parse_usage(usage):
+    """Normalize provider usage to {prompt_tokens, completion_tokens, cached_tokens}."""
+    usage = usage or {}
+    details = usage.get("prompt_tokens_details") or {}
+    cached = (details.get("cached_tokens") or usage.get("cache_read_input_tokens")
+              or usage.get("prompt_cache_hit_tokens") or 0)
+    prompt = usage.get("prompt_tokens")
+    if prompt is None:  # Anthropic: input_tokens excludes cache reads / writes
+        prompt = (usage.get("input_tokens", 0) + usage.get("cache_read_input_tokens", 0)
+                  + usage.get("cache_creation_input_tokens", 0))
+    completion = usage.get("completion_tokens", usage.get("output_tokens", 0))
+    return {"prompt_tokens": prompt or 0, "completion_tokens": completion or 0,
+            "cached_tokens": cached}
+
+
+def parse_content(provider, data):
+    try:
+        if provider == "anthropic":
+            return "".join(b.get("text", "") for b in data["content"] if b.get("type") == "text")
+        return data["choices"][0]["message"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        raise LLMError(f"{provider}: unexpected response {str(data)[:300]}") from None
+
+
+def usage_totals(*callers):
+    """Sum `caller.usage` over distinct callers."""
+    totals = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    for c in {id(c): c for c in callers}.values():
+        for u in getattr(c, "usage", ()):
+            for k in totals:
+                totals[k] += u.get(k, 0)
+    return totals
+
+
+def queue_waits(*callers):
+    """Scheduler queue wait per call label, summed over distinct callers."""
+    waits = {}
+    for c in {id(c): c for c in callers}.values():
+        for u in getattr(c, "usage", ()):
+            waits[u["label"]] = round(waits.get(u["label"], 0.0) + u.get("queue_wait", 0.0), 3)
+    return waits
+
+
+def _post(url, headers, body, timeout):
+    """POST `body`; returns (status, raw bytes, headers, seconds). Honors the bound CancelToken."""
+    u = urllib.parse.urlsplit(url)
+    conn_cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(u.hostname, u.port, timeout=timeout)
+    token = current_cancel.get()
+    t0 = time.time()
+    try:
+        conn.connect()
+        if token is not None:
+            token.attach(conn)
+        target = u.path + (f"?{u.query}" if u.query else "")
+        conn.request("POST", target, body=body, headers=headers)
+        resp = conn.getresponse()
+        raw = resp.read()
+    except (OSError, http.client.HTTPException):
+        if token is not None and token.cancelled:
+            raise Cancelled("cancelled") from None
+        raise
+    finally:
+        if token is not None:
+            token.detach()
+        conn.close()
+    if token is not None:
+        token.check()
+    return resp.status, raw, dict(resp.getheaders()), round(time.time() - t0, 2)
+
+
+def _http_send(api_key, provider, model, timeout):
+    """send(system, messages, max_tokens) → (status, text or error detail, usage,
+    response headers, seconds)."""
+    url = base_url(provider)
+
+    def send(system, messages, max_tokens):
+        path, headers, payload = build_request(provider, model, system, messages, max_tokens)
+        if provider == "anthropic":
+            headers["x-api-key"] = api_key
+        else:
+            headers["Authorization"] = f"Bearer {api_key}"
+        status, raw, resp_headers, elapsed = _post(url + path, headers,
+                                                   json.dumps(payload).encode(), timeout)
+        if status >= 400:
+            return status, raw[:300].decode("utf-8", "replace"), None, resp_headers, elapsed
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            raise LLMError(f"{provider}: non-JSON response {raw[:300]!r}") from None
+        return (status, parse_content(provider, data), parse_usage(data.get("usage")),
+                resp_headers, elapsed)
+
+    return send
+
+
+def build_caller(api_key, provider, model, timeout=120):
+    send = _http_send(api_key, provider, model, timeout)
+
+    def caller(system, messages, label="", max_tokens=3000):
+        size = len(system) + sum(len(json.dumps(m["content"])) for m in messages)
+        estimate = size // 4 + max_tokens
+        sched, token, waited = get_scheduler(), current_cancel.get(), 0.0
+        for attempt in range(MAX_429_RETRIES + 1):
+            ticket = sched.acquire(provider, api_key, estimate, stage=stage_of(label),
+                                   abort=token.check if token is not None else None)
+            waited += ticket.wait
+            try:
+                status, content, usage, resp_headers, elapsed = send(system, messages, max_tokens)
+            except BaseException:
+                sched.settle(ticket, 0)
+                raise
+            sched.observe(ticket, status, resp_headers)
+            if status != 429 or attempt == MAX_429_RETRIES:
+                break
+            sched.settle(ticket, 0)
+        if status >= 400:
+            sched.settle(ticket, 0)
+            raise LLMError(f"{provider} HTTP {status}: {content}")
+        if usage["prompt_tokens"]:
+            sched.settle(ticket, usage["prompt_tokens"] + usage["completion_tokens"])
+        caller.usage.append({"label": label, **usage, "queue_wait": round(waited, 3)})
+        return content, elapsed
+
+    caller.usage = []
+    caller.provider, caller.model = provider, model
+    return caller
@@ -4,8 +4,13 @@ Entry point: python main.py <function> [args...]
 
 Compatible providers: groq | openai | huggingface | openrouter | anthropic | mistral
 stdout = JSON result  |  stderr = error + exit(1)
+
+DISPATCH functions return their result; the CLI prints it and server.py
+frames it on the provider socket.
 """
-import sys, json, os, subprocess
+import sys, json, os, subprocess, threading, time
+
+import profiling
 
 # Auto-install senjutsu if missing
 try:
@@ -22,6 +27,29 @@ PROVIDER_DEFAULTS = {
     "huggingface": "mistralai/Mistral-7B-Instruct-v0.3",
 }
 
+# Cheaper / faster models for the analysis stages — Execution keeps PROVIDER_DEFAULTS
+PROVIDER_FAST_DEFAULTS = {
+    "groq":        "llama-3.1-8b-instant",
+    "openai":      "gpt-4o-mini",
+    "anthropic":   "claude-haiku-4-5",
+    "mistral":     "mistral-small-latest",
+    "openrouter":  "openai/gpt-4o-mini",
+    "huggingface": "mistralai/Mistral-7B-Instruct-v0.3",
+}
+
+# Token budget for injected skills (precomputed digests); 0 → full SKILL.md content
+SKILL_BUDGET = int(os.environ.get("DOJUTSU_SKILL_BUDGET", "3072"))
+
+# Skills index shards (worker processes, scatter-gather); 0 → senjutsu SkillsRAG
+SKILL_SHARDS = int(os.environ.get("DOJUTSU_SHARDS", "0"))
+# Build processes of a long-lived, lock-free SkillIndex (per shard when sharded);
+# 0 → one per CPU, -1 → SkillsRAG
+SKILL_INDEX_WORKERS = int(os.environ.get("DOJUTSU_INDEX_WORKERS", "-1"))
+# Poll interval (s) for applying SKILL.md edits to either long-lived index; 0 → off
+SKILL_WATCH = float(os.environ.get("DOJUTSU_WATCH", "0"))
+# Name of a skills index published with `shm_index.py publish` → attach, don't index
+SKILL_SHM = os.environ.get("DOJUTSU_SHM", "")
+
 PROVIDER_ENV = {
     "groq":        "GROQ_API_KEY",
     "openai":      "OPENAI_API_KEY",
@@ -37,64 +65,296 @@ def _get_key(api_key, provider):
     env_var = PROVIDER_ENV.get(provider, "GROQ_API_KEY")
     key = os.environ.get(env_var, "")
     if not key:
-        _err(f"API key required. Pass as arg or set {env_var} env var.")
+        raise ValueError(f"API key required. Pass as arg or set {env_var} env var.")
     return key
 
 def _err(msg):
     print(json.dumps({"error": msg}), file=sys.stderr)
     sys.exit(1)
 
-def run(task, api_key="", provider="groq", model="", verbose="false"):
-    """Full 5-step Precision Absolute pipeline."""
-    from senjutsu import SenjutsuAgent
+def _build_caller(key, provider, model):
+    from llm_client import build_caller
+    return profiling.wrap_caller(build_caller(key, provider, model))
+
+_PIPELINE_CALLS = {"Skill selection": "selector", "Final execution": "execution"}
+
+def _fast_analysis(pipeline, fast):
+    """Byakugan / Mode Sage / Jōgan on the fast model; skill selection and
+    Execution keep the pipeline's (strong) caller. Each step gets its own
+    profiling stage; retrieval and get_content stay in "pipeline"."""
+    from senjutsu.core.byakugan import Byakugan
+    from senjutsu.core.mode_sage import ModeSage
+    from senjutsu.core.jougan import Jougan
+    pipeline.byakugan, pipeline.mode_sage = Byakugan(fast), ModeSage(fast)
+    pipeline.jougan = Jougan(fast)
+    for module, step in (("byakugan", "analyze"), ("mode_sage", "evaluate"), ("jougan", "anticipate")):
+        target = getattr(pipeline, module)
+        setattr(target, step, profiling.staged(module, getattr(target, step)))
+    strong = pipeline.llm
+
+    def llm(system, messages, label="", max_tokens=3000):
+        with profiling.stage(_PIPELINE_CALLS.get(label, "pipeline")):
+            return strong(system, messages, label=label, max_tokens=max_tokens)
+    llm.usage = getattr(strong, "usage", [])
+    pipeline.llm = llm
+    return pipeline
+
+_SHARDED = None
+_LOCAL = None
+_SHM = None
+_INDEX_LOCK = threading.Lock()  # server.py calls in from worker threads
+
+def _long_lived(index):
+    """Index once, then keep it current with a SkillWatcher when DOJUTSU_WATCH is set."""
+    with profiling.stage("index"), profiling.memory("index_all"):
+        index.index_all(verbose=False)
+    if SKILL_WATCH > 0:
+        from skill_index import SkillWatcher
+        SkillWatcher(index, interval=SKILL_WATCH).start()
+    return index
+
+def _skills_rag():
+    """Skills index for this call — the shared-memory index when DOJUTSU_SHM is set,
+    the long-lived sharded index when DOJUTSU_SHARDS > 0, the long-lived in-process
+    SkillIndex when DOJUTSU_INDEX_WORKERS >= 0 (each created once), else a fresh
+    SkillsRAG."""
+    global _SHARDED, _LOCAL, _SHM
+    if SKILL_SHM:
+        if _SHM is None:
+            with _INDEX_LOCK:
+                if _SHM is None:
+                    from shm_index import attach
+                    from senjutsu.core.security import sanitize_skill
+                    _SHM = attach(SKILL_SHM, sanitize=sanitize_skill)
+        return _SHM
+    if SKILL_SHARDS > 0:
+        if _SHARDED is None:
+            with _INDEX_LOCK:
+                if _SHARDED is None:
+                    from sharded_index import ShardedSkillIndex
+                    from senjutsu.core.security import sanitize_skill
+                    workers = SKILL_INDEX_WORKERS if SKILL_INDEX_WORKERS >= 0 else 1
+                    index = ShardedSkillIndex(shards=SKILL_SHARDS, sanitize=sanitize_skill,
+                                              workers=workers)
+                    _SHARDED = _long_lived(index)  # published only once fully indexed
+        return _SHARDED
+    if SKILL_INDEX_WORKERS >= 0:
+        if _LOCAL is None:
+            with _INDEX_LOCK:
+                if _LOCAL is None:
+                    from skill_index import SkillIndex
+                    from senjutsu.core.security import sanitize_skill
+                    index = SkillIndex(sanitize=sanitize_skill, workers=SKILL_INDEX_WORKERS)
+                    _LOCAL = _long_lived(index)
+        return _LOCAL
     from senjutsu.core.rag_booster import SkillsRAG
+    rag = SkillsRAG()
+    with profiling.stage("index"), profiling.memory("index_all"):
+        rag.index_all(verbose=False)
+    return rag
+
+def _skill_content(rag, keys):
+    """Injected skills text — digests within SKILL_BUDGET, else full SKILL.md content."""
+    if SKILL_BUDGET > 0:
+        import digests
+        from senjutsu.core.security import sanitize_skill
+        return digests.get_content(keys, SKILL_BUDGET, rag=rag, sanitize=sanitize_skill)
+    return rag.get_content(keys)
+
+def _execute(llm, task, rag, analysis=""):
+    """Provider-side Execution step — RAG skills + optional prior analysis."""
+    from prompts import execution_prompt, skill_keys, skill_names
+    with profiling.stage("retrieve"):
+        hits = rag.retrieve(task, top_k=3)
+        keys = skill_keys(hits)
+    with profiling.stage("skills"), profiling.memory("get_content"):
+        skills = _skill_content(rag, keys)
+    with profiling.stage("prompt"):
+        system, messages = execution_prompt(task, skills, analysis)
+    with profiling.stage("execution"):
+        text, t = llm(system, messages, label="Execution", max_tokens=6000)
+    return text, t, skill_names(hits)
+
+def _stage_result(stages, execution, skills, timing, total_time):
+    """Result shape shared by every depth and by the fused path: each analysis
+    stage's content under its module name (None when skipped), the stage dicts
+    ({"module", "content", "time"}) under `stages`, per-stage times in `timing`."""
+    from fused import SECTIONS
+    ran = {s["module"]: s for s in stages}
+    return {
+        **{name: ran[name]["content"] if name in ran else None for name in SECTIONS},
+        "stages": [dict(s) for s in stages],
+        "execution": execution, "skills_used": skills,
+        "timing": {**{name: s["time"] for name, s in ran.items()}, **timing},
+        "total_time": total_time,
+    }
+
+def run(task, api_key="", provider="groq", model="", verbose="false",
+        depth="auto", fast_model="", fused="false", files="", *, on_stage=None):
+    """Adaptive Precision Absolute pipeline.
+    depth: auto | execution | byakugan | full  (auto → local complexity classifier)
+    fused: true → Byakugan × Mode Sage × Jōgan in one LLM call (full depth only)
+    files: workspace files / extensions ("src/app.ts, .vue") → skills outside their scope skipped
+    on_stage(name, data): called as each stage completes (server.py stage frames)
+    """
+    emit = on_stage or (lambda name, data: None)
+    from complexity import classify, Depth, DEPTHS
     key = _get_key(api_key, provider)
-    rag = SkillsRAG(); rag.index_all(verbose=False)
-    agent = SenjutsuAgent(api_key=key, provider=provider,
-                          model=model or None, rag=rag,
-                          verbose=(verbose.lower() == "true"))
-    result = agent.run(task)
-    print(json.dumps({
-        "byakugan": result.byakugan, "mode_sage": result.mode_sage,
-        "jougan": result.jougan, "execution": result.execution,
-        "skills_used": result.skills_used, "timing": result.timing,
-        "total_time": result.total_seconds,
-    }, ensure_ascii=False))
+    strong_m = model or PROVIDER_DEFAULTS.get(provider, "moonshotai/kimi-k2-instruct-0905")
+    fast_m = fast_model or PROVIDER_FAST_DEFAULTS.get(provider, strong_m)
+    if depth in DEPTHS:
+        level, reason = Depth(depth), "caller override"
+    elif depth in ("", "auto"):
+        with profiling.stage("classify"):
+            c = classify(task)
+        level, reason = c.depth, c.reason
+    else:
+        raise ValueError(f"Unknown depth '{depth}'. Use: auto, {', '.join(DEPTHS)}")
+
+    rag = _skills_rag()
+    from scopes import ScopedRAG, parse_workspace
+    workspace = parse_workspace(files)
+    if workspace:
+        rag = ScopedRAG(rag, **workspace)
+    strong = _build_caller(key, provider, strong_m)
+    fast = strong if fast_m == strong_m else _build_caller(key, provider, fast_m)
+
+    if level is Depth.FULL and fused.lower() == "true":
+        from fused import FusedAnalysis
+        t0 = time.time()
+        with profiling.stage("analysis"):
+            stages = FusedAnalysis(fast).analyze(task)
+        for s in stages:
+            emit(s["module"], s)
+        analysis = "\n\n".join(f"## {s['module']}\n{s['content']}" for s in stages)
+        execution, exec_time, skills = _execute(strong, task, rag, analysis)
+        out = _stage_result(stages, execution, skills,
+                            {"fused_analysis": round(sum(s["time"] for s in stages), 2),
+                             "execution": exec_time}, round(time.time() - t0, 2))
+    elif level is Depth.FULL:
+        from fused import SECTIONS
+        from prompts import skill_names
+        from senjutsu.core.pipeline import PrecisionAbsolutePipeline
+        pipeline = _fast_analysis(PrecisionAbsolutePipeline(
+            llm_caller=strong, rag=rag, verbose=(verbose.lower() == "true")), fast)
+        with profiling.stage("pipeline"):
+            steps = pipeline.run(task)
+        total, steps = steps["total_time"], steps["steps"]
+        stages = [steps[name] for name in SECTIONS]
+        for s in stages:
+            emit(s["module"], s)
+        out = _stage_result(stages, steps["execution"]["content"],
+                            skill_names(steps["skills"]["rag_hits"]),
+                            {"skills": steps["skills"]["time"],
+                             "execution": steps["execution"]["time"]}, round(total, 2))
+    else:
+        from senjutsu.core.byakugan import Byakugan
+        t0, stages, analysis = time.time(), [], ""
+        if level is Depth.BYAKUGAN:
+            with profiling.stage("analysis"):
+                b = Byakugan(fast).analyze(task)
+            emit("byakugan", b)
+            stages, analysis = [b], f"## Byakugan analysis\n{b['content']}"
+        execution, exec_time, skills = _execute(strong, task, rag, analysis)
+        out = _stage_result(stages, execution, skills, {"execution": exec_time},
+                            round(time.time() - t0, 2))
+    from llm_client import usage_totals, queue_waits
+    out["timing"] = dict(out.get("timing") or {}, **usage_totals(strong, fast),
+                         queue_wait=queue_waits(strong, fast))
+    out.update(depth=level.value, depth_reason=reason,
+               models={"analysis": fast_m, "execution": strong_m})
+    return out
 
 def byakugan(task, api_key="", provider="groq", model=""):
     """Structural analysis only — 1 LLM call."""
     from senjutsu.core.byakugan import Byakugan
-    from senjutsu import SenjutsuAgent
     key = _get_key(api_key, provider)
     _m = model or PROVIDER_DEFAULTS.get(provider, "moonshotai/kimi-k2-instruct-0905")
-    agent = SenjutsuAgent.__new__(SenjutsuAgent)
-    llm = agent._build_caller(key, provider, _m)
+    llm = _build_caller(key, provider, _m)
     result = Byakugan(llm).analyze(task)
-    print(json.dumps({"byakugan": result["content"], "time": result["time"]}, ensure_ascii=False))
+    return {"byakugan": result["content"], "time": result["time"]}
 
 def skills_list():
-    from senjutsu.core.rag_booster import SkillsRAG
-    rag = SkillsRAG(); rag.index_all(verbose=False)
-    print(rag.list_skills())
+    return _skills_rag().list_skills()
+
+def skills_query(prefix="", contains="", source="", scope="", files="", limit="50", cursor=""):
+    """Faceted catalog query → {total, items, next_cursor, facets} (see catalog.py)."""
+    from catalog import corpus_catalog
+    return corpus_catalog().query(prefix, contains, source, scope, files, limit, cursor)
 
 def skills_count():
-    from senjutsu.core.rag_booster import SkillsRAG
-    rag = SkillsRAG(); rag.index_all(verbose=False)
-    print(json.dumps({"count": rag.count}))
+    return {"count": _skills_rag().count}
 
 def check_skill(skill_content):
     from senjutsu.core.security import is_skill_safe
     safe, v = is_skill_safe(skill_content)
-    print(json.dumps({"safe": safe, "violations": v}))
+    return {"safe": safe, "violations": v}
 
 def version():
     import senjutsu
-    print(json.dumps({"version": getattr(senjutsu, "__version__", "2.0.0"),
-                      "package": "dojutsu-for-ai",
-                      "providers": list(PROVIDER_DEFAULTS.keys())}))
+    return {"version": getattr(senjutsu, "__version__", "2.0.0"),
+            "package": "dojutsu-for-ai",
+            "providers": list(PROVIDER_DEFAULTS.keys())}
+
+def _session_callers(api_key, provider, model, fast_model):
+    key = _get_key(api_key, provider)
+    strong_m = model or PROVIDER_DEFAULTS.get(provider, "moonshotai/kimi-k2-instruct-0905")
+    fast_m = fast_model or PROVIDER_FAST_DEFAULTS.get(provider, strong_m)
+    strong = _build_caller(key, provider, strong_m)
+    fast = strong if fast_m == strong_m else _build_caller(key, provider, fast_m)
+    return fast, strong, {"analysis": fast_m, "execution": strong_m}
+
+def _session_rag(files):
+    rag = _skills_rag()
+    from scopes import ScopedRAG, parse_workspace
+    workspace = parse_workspace(files)
+    return ScopedRAG(rag, **workspace) if workspace else rag
+
+def session_start(task, api_key="", provider="groq", model="", fast_model="", files=""):
+    """Open an iterative session: full fused run, state saved for follow-ups."""
+    from session import Session
+    fast, strong, models = _session_callers(api_key, provider, model, fast_model)
+    rag = _session_rag(files)
+    s = Session(fast, strong, rag, skill_content=lambda keys: _skill_content(rag, keys))
+    s.meta = {"provider": provider, "models": models, "files": files}
+    out = s.start(task)
+    s.save()
+    return dict(out, models=models)
+
+def session_followup(session_id, change, api_key="", provider="", model="", fast_model=""):
+    """Refine a session with one change — delta analysis, new skills only, prior code as context."""
+    from session import Session, read
+    meta = read(session_id).get("meta", {})
+    provider = provider or meta.get("provider", "groq")
+    models = meta.get("models", {})
+    fast, strong, models = _session_callers(api_key, provider, model or models.get("execution", ""),
+                                            fast_model or models.get("analysis", ""))
+    rag = _session_rag(meta.get("files", ""))
+    s = Session.load(session_id, fast, strong, rag,
+                     skill_content=lambda keys: _skill_content(rag, keys))
+    out = s.followup(change)
+    s.save()
+    return dict(out, models=models)
 
-DISPATCH = {"run": run, "byakugan": byakugan, "skills_list": skills_list,
-            "skills_count": skills_count, "check_skill": check_skill, "version": version}
+DISPATCH = {"run": run, "byakugan": byakugan,
+            "skills_list": skills_list, "skills_query": skills_query,
+            "skills_count": skills_count, "check_skill": check_skill,
+            "version": version,
+            "session_start": session_start, "session_followup": session_followup}
+DISPATCH = {name: profiling.profiled(fn) for name, fn in DISPATCH.items()}
+
+def _emit(result):
+    with profiling.stage("serialize"):
+        text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+    print(text)
+
+def _profile(fn, *args):
+    """python main.py profile <function> [args...] — one profiled call."""
+    if fn not in DISPATCH:
+        _err(f"Unknown function '{fn}'. Available: {list(DISPATCH.keys())}")
+    with profiling.session(fn, profiling.PROFILE_DIR or profiling.DEFAULT_DIR) as s:
+        _emit(DISPATCH[fn](*args))
+    print(json.dumps({"profile": str(s.dir)}), file=sys.stderr)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -103,10 +363,17 @@ if __name__ == "__main__":
                           "providers": list(PROVIDER_DEFAULTS.keys())}), file=sys.stderr)
         sys.exit(1)
     fn = sys.argv[1]
+    if fn == "profile" and len(sys.argv) > 2:
+        try:
+            _profile(*sys.argv[2:])
+        except Exception as e:
+            _err(str(e))
+        sys.exit(0)
     if fn not in DISPATCH:
         _err(f"Unknown function '{fn}'. Available: {list(DISPATCH.keys())}")
     try:
-        DISPATCH[fn](*sys.argv[2:])
+        with profiling.session(fn):  # DOJUTSU_PROFILE: serialization in the same profile
+            _emit(DISPATCH[fn](*sys.argv[2:]))
     except TypeError as e:
         _err(f"Wrong args for '{fn}': {e}")
     except Exception as e:
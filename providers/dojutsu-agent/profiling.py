@@ -0,0 +1,189 @@
+"""
+🥷 Dojutsu-for-AI — Opt-in profiling of the non-LLM hot paths
+Enabled with DOJUTSU_PROFILE=<dir> (every DISPATCH call) or
+`python main.py profile <function> [args...]` (one call, ./dojutsu-profile).
+
+Per call, <dir>/<time>-<function>-<pid>/ gets:
+  <stage>.pstats      cProfile of each stage (retrieve, skills, prompt, analysis,
+                      byakugan, selector, execution, serialize …); time
+                      blocked in the llm_caller is excluded — the profiler is
+                      paused around every call
+  <stage>.txt         top functions by cumulative time
+  alloc-<name>.txt    tracemalloc diff around index_all / get_content
+  summary.json        wall / LLM seconds per stage, net + peak bytes per section
+
+When disabled, `profiled` returns the function unchanged, `stage` / `memory`
+return a shared no-op context (so `staged` costs one lookup) and `wrap_caller`
+returns the caller itself.
+
+Profiling is per process: cProfile allows one active profiler per process
+(3.12+) and tracemalloc is process-global, so one session runs at a time.
+A call that starts while another thread's session is active (server.py
+workers) runs unprofiled rather than waiting or corrupting that profile.
+"""
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+PROFILE_DIR = os.environ.get("DOJUTSU_PROFILE", "")
+DEFAULT_DIR = "dojutsu-profile"
+TOP = 30
+
+_current = contextvars.ContextVar("dojutsu_profile", default=None)
+_active = threading.Lock()  # held for the whole of the one running session
+_NULL = contextlib.nullcontext()
+
+
+class Session:
+    def __init__(self, name, out_dir):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.dir = Path(out_dir) / f"{stamp}-{name}-{os.getpid()}"
+        self.profiles, self.stack = {}, []
+        self.wall, self.llm, self.memory_stats = {}, {}, {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        prof = self.profiles.setdefault(name, cProfile.Profile())
+        if self.stack:
+            self.stack[-1][1].disable()  # stages are exclusive of nested ones
+        self.stack.append((name, prof))
+        t0 = time.perf_counter()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            self.stack.pop()
+            self.wall[name] = self.wall.get(name, 0.0) + time.perf_counter() - t0
+            if self.stack:
+                self.stack[-1][1].enable()
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Around an LLM call: stop profiling, book the time as LLM, not stage."""
+        if not self.stack:
+            yield
+            return
+        name, prof = self.stack[-1]
+        prof.disable()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            self.llm[name] = self.llm.get(name, 0.0) + dt
+            self.wall[name] = self.wall.get(name, 0.0) - dt
+            prof.enable()
+
+    @contextlib.contextmanager
+    def memory(self, name):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(25)
+        tracemalloc.reset_peak()
+        base, before = tracemalloc.take_snapshot(), tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            diff = tracemalloc.take_snapshot().compare_to(base, "lineno")
+            if started:
+                tracemalloc.stop()
+            self.memory_stats[name] = {"net_bytes": after - before, "peak_bytes": peak - before}
+            lines = [f"{name}: net {after - before:+,} B, peak {peak - before:,} B", ""]
+            lines += [str(s) for s in diff[:TOP]]
+            self.dir.mkdir(parents=True, exist_ok=True)
+            (self.dir / f"alloc-{name}.txt").write_text("\n".join(lines) + "\n")
+
+    def write(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        stages = {}
+        for name, prof in self.profiles.items():
+            prof.dump_stats(str(self.dir / f"{name}.pstats"))
+            out = io.StringIO()
+            stats = pstats.Stats(prof, stream=out)
+            stats.sort_stats("cumulative").print_stats(TOP)
+            (self.dir / f"{name}.txt").write_text(out.getvalue())
+            stages[name] = {"wall_s": round(self.wall.get(name, 0.0), 4),
+                            "llm_s": round(self.llm.get(name, 0.0), 4),
+                            "calls": stats.total_calls}
+        summary = {"stages": stages, "memory": self.memory_stats}
+        (self.dir / "summary.json").write_text(json.dumps(summary, indent=2))
+        return self.dir
+
+
+@contextlib.contextmanager
+def session(name, out_dir=None):
+    """Profile everything inside; yields the Session — the enclosing one when nested,
+    None when profiling is off or another thread's session is running."""
+    out_dir = out_dir or PROFILE_DIR
+    if not out_dir or _current.get() is not None:
+        yield _current.get()
+        return
+    if not _active.acquire(blocking=False):
+        yield None
+        return
+    try:
+        s = Session(name, out_dir)
+        token = _current.set(s)
+        try:
+            with s.stage(name):
+                yield s
+        finally:
+            _current.reset(token)
+            s.write()
+    finally:
+        _active.release()
+
+
+def profiled(fn):
+    """Decorator for DISPATCH functions: a session per call when DOJUTSU_PROFILE is set."""
+    if not PROFILE_DIR:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with session(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def stage(name):
+    s = _current.get()
+    return _NULL if s is None else s.stage(name)
+
+
+def staged(name, fn):
+    """`fn` run inside stage(name) — for steps a library runs in one call."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def memory(name):
+    s = _current.get()
+    return _NULL if s is None else s.memory(name)
+
+
+def wrap_caller(llm):
+    """llm_caller whose blocking time is kept out of the stage profiles."""
+    s = _current.get()
+    if s is None:
+        return llm
+
+    def caller(system, messages, label="", max_tokens=3000):
+        with s.paused():
+            return llm(system, messages, label=label, max_tokens=max_tokens)
+    caller.usage = getattr(llm, "usage", [])
+    return caller
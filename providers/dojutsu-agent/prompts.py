@@ -0,0 +1,61 @@
+"""
+🥷 Dojutsu-for-AI — Prompt layout for provider-side stages
+Every prompt assembled here follows the same layout:
+
+    system = static instructions + selected skills (sorted by key)   ← cacheable prefix
+    user   = task + per-run analysis                                  ← varies per call
+
+so providers with prefix caching (Anthropic `cache_control`, OpenAI / Groq
+automatic prefix caching) can reuse the system prefix across stages and runs.
+`cache_hint` turns that prefix into the block form carrying the explicit hint.
+"""
+
+
+def execution_system():
+    """System prompt of the pipeline's Execution stage — every depth executes with it."""
+    from senjutsu.core.pipeline import EXECUTION_SYSTEM
+    return EXECUTION_SYSTEM.strip()
+
+
+def accepts_cache_control(provider, model):
+    """Providers that take explicit prefix-cache hints (others cache automatically)."""
+    return provider == "anthropic" or (provider == "openrouter" and model.startswith("anthropic/"))
+
+
+def cache_hint(system, provider, model):
+    """System prompt as sent to `provider`: one text block marked `cache_control`
+    (ephemeral) where hints are accepted, the plain string elsewhere."""
+    if not accepts_cache_control(provider, model):
+        return system
+    return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+
+def skill_keys(hits):
+    """RAG hits → keys in a byte-stable order (score order changes per task)."""
+    return sorted(k for k, _, _ in hits)
+
+
+def skill_names(hits):
+    """RAG hits → skill names, in hit order. SkillsRAG hits carry the whole
+    record (key, {name, content, …}, score); a bare name is taken as is."""
+    return [d["name"] if isinstance(d, dict) else d for _, d, _ in hits]
+
+
+def task_message(task, analysis=""):
+    content = f"Task:\n{task}" + (f"\n\n{analysis}" if analysis else "")
+    return [{"role": "user", "content": content}]
+
+
+def execution_prompt(task, skills="", analysis=""):
+    """Return (system, messages) for the Execution step."""
+    system = execution_system() + (f"\n\n## Skills\n{skills}" if skills else "")
+    return system, task_message(task, analysis)
+
+
+def followup_prompt(task, change, previous, skills="", analysis=""):
+    """Return (system, messages) for a session follow-up: same system prefix as
+    `execution_prompt`, the prior execution and the change in the user message."""
+    system, _ = execution_prompt(task, skills)
+    content = (f"Task:\n{task}\n\n## Previous execution\n{previous}\n\n"
+               f"## Follow-up change\n{change}" + (f"\n\n{analysis}" if analysis else ""))
+    return system, [{"role": "user", "content": content}]
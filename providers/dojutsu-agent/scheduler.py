@@ -0,0 +1,287 @@
+"""
+🥷 Dojutsu-for-AI — Process-wide admission control for LLM calls
+Every llm_client call goes through `get_scheduler().acquire(...)`:
+
+- one lane per (provider, API key), each with two token buckets:
+  requests/min and estimated tokens/min
+- priority queue per lane: interactive before batch, then Execution before
+  the analysis stages (Byakugan, Mode Sage, Jōgan)
+- fair queuing across tenants inside a priority level (virtual finish times,
+  so one tenant's burst cannot starve the others); a tenant is only tracked
+  while it has queued work, and work that is aborted or settled below its
+  estimate gives its virtual time back
+- limits adapt from the provider's rate-limit headers (x-ratelimit-*,
+  anthropic-ratelimit-*, retry-after on 429), read over each provider's
+  window (HEADER_WINDOWS: Groq's request limit is per day, its token limit
+  per minute)
+
+Defaults come from DEFAULT_LIMITS, overridable with DOJUTSU_RPM / DOJUTSU_TPM.
+Tenant and traffic class are bound per context with `scheduling(...)`.
+"""
+import contextlib
+import contextvars
+import hashlib
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+# (requests per minute, tokens per minute) until the provider's headers say otherwise
+DEFAULT_LIMITS = {
+    "groq":        (30, 30000),
+    "openai":      (500, 200000),
+    "anthropic":   (50, 40000),
+    "mistral":     (60, 500000),
+    "openrouter":  (200, 400000),
+    "huggingface": (60, 100000),
+}
+# Seconds a provider's limit headers cover, per bucket, when not one minute
+HEADER_WINDOWS = {
+    "groq": {"requests": 86400.0},
+}
+WINDOW = 60.0
+TRAFFIC = {"interactive": 0, "batch": 1}
+STAGES = {"execution": 0, "analysis": 1}
+ANALYSIS_LABELS = ("byakugan", "sage", "jougan", "jōgan")
+
+_tenant = contextvars.ContextVar(
+    "dojutsu_tenant", default=os.environ.get("DOJUTSU_TENANT", "default"))
+_traffic = contextvars.ContextVar(
+    "dojutsu_traffic", default=os.environ.get("DOJUTSU_TRAFFIC", "interactive"))
+
+
+def stage_of(label):
+    """'analysis' for Byakugan / Mode Sage / Jōgan labels, else 'execution'."""
+    label = (label or "").lower()
+    return "analysis" if any(s in label for s in ANALYSIS_LABELS) else "execution"
+
+
+@contextlib.contextmanager
+def scheduling(tenant=None, traffic=None):
+    """Bind tenant / traffic class ("interactive" | "batch") for calls in this context."""
+    resets = []
+    if tenant:
+        resets.append((_tenant, _tenant.set(tenant)))
+    if traffic:
+        if traffic not in TRAFFIC:
+            raise ValueError(f"Unknown traffic class '{traffic}'. Use: {', '.join(TRAFFIC)}")
+        resets.append((_traffic, _traffic.set(traffic)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(resets):
+            var.reset(token)
+
+
+def parse_reset(value, now=None):
+    """'1s', '6m0s', '250ms', '2', or an RFC 3339 timestamp → seconds from now."""
+    if value is None or value == "":
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(n) * scale[u] for n, u in parts)
+    try:
+        at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (at - now).total_seconds())
+
+
+def _header(headers, kind, field):
+    """OpenAI-style x-ratelimit-<field>-<kind> or anthropic-ratelimit-<kind>-<field>."""
+    for name in (f"x-ratelimit-{field}-{kind}", f"anthropic-ratelimit-{kind}-{field}"):
+        if name in headers:
+            return headers[name]
+    return None
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """`capacity` units, refilled at `rate` units/second; pausable."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate, self.capacity, self.clock = rate, capacity, clock
+        self.level, self.stamp, self.paused_until = capacity, clock(), 0.0
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, n):
+        """Seconds until `n` units can be taken (oversized asks wait for a full bucket)."""
+        now = self.clock()
+        self._refill(now)
+        n = min(n, self.capacity)
+        wait = max(0.0, self.paused_until - now)
+        if self.level < n:
+            wait = max(wait, (n - self.level) / self.rate)
+        return wait
+
+    def take(self, n):
+        self._refill(self.clock())
+        self.level -= min(n, self.capacity)
+
+    def give(self, n):
+        self._refill(self.clock())
+        self.level = min(self.capacity, self.level + n)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def adapt(self, limit=None, remaining=None, reset=None, window=WINDOW):
+        """Resize to a per-minute `limit`, sync to `remaining`. A limit over a longer
+        `window` (e.g. per day) does not size a per-minute bucket; its `remaining`
+        and `reset` still pause the bucket once the quota is spent."""
+        self._refill(self.clock())
+        if limit and window == WINDOW:
+            self.capacity, self.rate = float(limit), limit / WINDOW
+        if remaining is not None:
+            self.level = min(self.level, float(remaining), self.capacity)
+            if remaining <= 0 and reset:
+                self.pause(reset)
+
+
+class _Lane:
+    def __init__(self, provider, rpm, tpm, clock):
+        self.provider = provider
+        self.requests = TokenBucket(rpm / 60.0, rpm, clock)
+        self.tokens = TokenBucket(tpm / 60.0, tpm, clock)
+        self.heap, self.vtime = [], 0.0
+        self.finish, self.queued = {}, {}  # per tenant, only while it has queued work
+
+    def enqueue(self, tenant, tokens):
+        """Virtual (start, finish) for `tenant`'s next request of ~`tokens`."""
+        start = max(self.vtime, self.finish.get(tenant, 0.0))
+        self.finish[tenant] = start + tokens
+        self.queued[tenant] = self.queued.get(tenant, 0) + 1
+        return start, start + tokens
+
+    def dequeue(self, tenant, refund=0.0):
+        """One of `tenant`'s requests left the queue; `refund` virtual time it did not use."""
+        self.queued[tenant] -= 1
+        if not self.queued[tenant]:
+            del self.queued[tenant], self.finish[tenant]
+        elif refund:
+            self.finish[tenant] -= refund
+
+
+class Ticket:
+    __slots__ = ("lane", "tokens", "wait", "tenant")
+
+    def __init__(self, lane, tokens, wait, tenant):
+        self.lane, self.tokens, self.wait, self.tenant = lane, tokens, wait, tenant
+
+
+class Scheduler:
+    POLL = 0.25  # max seconds between abort checks while queued
+
+    def __init__(self, limits=None, clock=time.monotonic):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._lanes = {}
+        self._seq = itertools.count()
+
+    def _lane(self, provider, api_key):
+        lane_id = (provider, hashlib.sha256(api_key.encode()).hexdigest()[:16])
+        lane = self._lanes.get(lane_id)
+        if lane is None:
+            rpm, tpm = self.limits.get(provider, (60, 100000))
+            rpm = float(os.environ.get("DOJUTSU_RPM", rpm))
+            tpm = float(os.environ.get("DOJUTSU_TPM", tpm))
+            lane = self._lanes[lane_id] = _Lane(provider, rpm, tpm, self.clock)
+        return lane
+
+    def acquire(self, provider, api_key, tokens, stage="execution", abort=None):
+        """Block until the lane admits one request of ~`tokens` tokens → Ticket.
+        `abort()` is polled while queued; if it raises, the request leaves the queue."""
+        tenant, traffic = _tenant.get(), _traffic.get()
+        t0 = self.clock()
+        with self._cond:
+            lane = self._lane(provider, api_key)
+            start, finish = lane.enqueue(tenant, tokens)
+            entry = ((TRAFFIC.get(traffic, 0), STAGES.get(stage, 0)), finish, next(self._seq))
+            heapq.heappush(lane.heap, entry)
+            self._cond.notify_all()
+            try:
+                while True:
+                    if abort is not None:
+                        abort()
+                    if lane.heap[0] is entry:
+                        wait = max(lane.requests.delay(1), lane.tokens.delay(tokens))
+                        if wait <= 0:
+                            heapq.heappop(lane.heap)
+                            lane.dequeue(tenant)
+                            lane.requests.take(1)
+                            lane.tokens.take(tokens)
+                            lane.vtime = max(lane.vtime, start)
+                            self._cond.notify_all()
+                            return Ticket(lane, tokens, round(self.clock() - t0, 3), tenant)
+                        self._cond.wait(min(wait, self.POLL))
+                    else:
+                        self._cond.wait(self.POLL)
+            except BaseException:
+                if entry in lane.heap:
+                    lane.heap.remove(entry)
+                    heapq.heapify(lane.heap)
+                    lane.dequeue(tenant, refund=tokens)
+                self._cond.notify_all()
+                raise
+
+    def settle(self, ticket, actual_tokens):
+        """Reconcile the estimate with the tokens the provider actually billed
+        (0 for failed / cancelled calls): bucket tokens and, while the tenant
+        still has queued work, its virtual time."""
+        with self._cond:
+            diff = ticket.tokens - actual_tokens
+            if diff > 0:
+                ticket.lane.tokens.give(diff)
+                if ticket.tenant in ticket.lane.finish:
+                    ticket.lane.finish[ticket.tenant] -= diff
+            elif diff < 0:
+                ticket.lane.tokens.take(-diff)
+            self._cond.notify_all()
+
+    def observe(self, ticket, status, headers):
+        """Adapt the lane from response headers; pause it on 429."""
+        h = {k.lower(): v for k, v in (headers or {}).items()}
+        lane = ticket.lane
+        windows = HEADER_WINDOWS.get(lane.provider, {})
+        with self._cond:
+            for kind, bucket in (("requests", lane.requests), ("tokens", lane.tokens)):
+                bucket.adapt(_int(_header(h, kind, "limit")), _int(_header(h, kind, "remaining")),
+                             parse_reset(_header(h, kind, "reset")), windows.get(kind, WINDOW))
+            if status == 429:
+                retry = parse_reset(h.get("retry-after")) or 1.0
+                lane.requests.pause(retry)
+                lane.tokens.pause(retry)
+            self._cond.notify_all()
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler shared by every llm_client caller."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = Scheduler()
+        return _SCHEDULER
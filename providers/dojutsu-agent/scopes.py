@@ -0,0 +1,247 @@
+"""
+🥷 Dojutsu-for-AI — Workspace scopes for skills
+Many skills declare the files they apply to, as a `globs:` frontmatter line,
+a "[Applies to: **/*.{ts,tsx}]" prefix in their description, or a trailing
+"globs: …" carried into the description by the .cursorrules conversion.
+ScopeIndex compiles those globs once: pure extension patterns ("**/*.py")
+go into an extension → skills map, everything else ("**/main.py",
+"src/**/*.astro") into per-skill regexes. Skills without a scope, or scoped to
+every file ("**/*"), always pass.
+
+`candidates(files, extensions)` returns the skill keys a workspace can use;
+the index scores only those. ScopedRAG applies the same cut in front of any
+rag object (including senjutsu's SkillsRAG) for the pipeline.
+"""
+import re
+from pathlib import PurePosixPath
+
+from cowmap import CowMap
+from digests import skill_name
+
+_APPLIES = re.compile(r"\[Applies to:\s*([^\]]*)\]", re.IGNORECASE)
+_INLINE_GLOBS = re.compile(r"\bglobs:\s*(\S.*?)\s*$")   # cursorrules-converted descriptions
+_PURE_EXT = re.compile(r"^(?:\*\*/)?\*\.([A-Za-z0-9_.+-]+)$")
+_ALT = re.compile(r"\(([^()/]*\|[^()/]*)\)")
+_UNIVERSAL = frozenset(("*", "*.*", "**", "**/*", "**/*.*"))
+
+
+def _split_top(text):
+    """Split on commas outside {…}."""
+    parts, depth, cur = [], 0, []
+    for ch in text:
+        depth += ch == "{"
+        depth -= ch == "}" and depth > 0
+        if ch == "," and depth == 0:
+            parts.append("".join(cur))
+            cur = []
+        else:
+            cur.append(ch)
+    parts.append("".join(cur))
+    return [p.strip().strip("'\"") for p in parts if p.strip().strip("'\"")]
+
+
+def expand_braces(pattern):
+    """'**/*.{ts,tsx}' → ['**/*.ts', '**/*.tsx'] (also '(ts|tsx)')."""
+    pattern = _ALT.sub(lambda m: "{" + m.group(1).replace("|", ",") + "}", pattern)
+    m = re.search(r"\{([^{}]*)\}", pattern)
+    if not m:
+        return [pattern]
+    head, tail = pattern[:m.start()], pattern[m.end():]
+    return [p for alt in m.group(1).split(",") for p in expand_braces(head + alt.strip() + tail)]
+
+
+def parse_scope(meta):
+    """Glob patterns a skill declares, or None when it applies everywhere."""
+    raw = []
+    if meta.get("globs"):
+        raw += _split_top(meta["globs"])
+    description = meta.get("description", "")
+    for rx in (_APPLIES, _INLINE_GLOBS):
+        m = rx.search(description)
+        if m:
+            raw += _split_top(m.group(1))
+    patterns = sorted({p.lstrip("/") + ("**" if p.endswith("/") else "")
+                       for r in raw for p in expand_braces(r) if p.lstrip("/")})
+    if not patterns or any(p in _UNIVERSAL for p in patterns):
+        return None
+    return patterns
+
+
+def glob_regex(pattern):
+    """Compile a glob; it may match at any directory depth (cursor-rules semantics)."""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("(?:.*/)?" + "".join(out) + r"\Z")
+
+
+def _ext_hint(pattern):
+    """Extension a path pattern implies ('' = any, None = cannot tell)."""
+    base = pattern.rsplit("/", 1)[-1]
+    if "." not in base:
+        return None
+    ext = base.rsplit(".", 1)[1]
+    return "" if any(c in ext for c in "*?[") else ext.lower()
+
+
+def file_exts(path):
+    """'a/b.cy.js' → ['cy.js', 'js']."""
+    parts = PurePosixPath(path).name.lower().split(".")[1:]
+    return [".".join(parts[i:]) for i in range(len(parts))]
+
+
+def norm_ext(ext):
+    return ext.lower().lstrip("*").lstrip(".")
+
+
+class ScopeIndex:
+    """Key sets are CowMaps (key → True), so copy() is O(1) and an add / remove
+    afterwards copies only what it touches."""
+
+    def __init__(self):
+        self.scopes = CowMap()    # key → patterns (scoped skills only)
+        self.unscoped = CowMap()  # key → True
+        self.by_ext = CowMap()    # ext → CowMap{key: True}
+        self.paths = CowMap()     # key → [(regex, ext hint)]
+        self._own = set()         # exts whose by_ext map this index may write in place
+
+    def _ext_keys(self, ext):
+        keys = self.by_ext.get(ext)
+        if keys is None or ext not in self._own:
+            keys = self.by_ext[ext] = CowMap() if keys is None else keys.copy()
+            self._own.add(ext)
+        return keys
+
+    def add(self, key, meta):
+        self.remove(key)
+        patterns = parse_scope(meta)
+        if patterns is None:
+            self.unscoped[key] = True
+            return
+        self.scopes[key] = patterns
+        compiled = []
+        for p in patterns:
+            m = _PURE_EXT.match(p)
+            if m:
+                self._ext_keys(m.group(1).lower())[key] = True
+            else:
+                compiled.append((glob_regex(p), _ext_hint(p)))
+        if compiled:
+            self.paths[key] = compiled
+
+    def remove(self, key):
+        self.unscoped.pop(key, None)
+        for p in self.scopes.pop(key, ()):
+            m = _PURE_EXT.match(p)
+            if m and m.group(1).lower() in self.by_ext:
+                keys = self._ext_keys(m.group(1).lower())
+                keys.pop(key, None)
+                if not keys:
+                    del self.by_ext[m.group(1).lower()]
+        self.paths.pop(key, None)
+
+    def copy(self):
+        """O(1) copy sharing every node with this one (compiled patterns are
+        immutable and shared too)."""
+        out = ScopeIndex.__new__(ScopeIndex)
+        out.scopes, out.unscoped = self.scopes.copy(), self.unscoped.copy()
+        out.by_ext, out.paths = self.by_ext.copy(), self.paths.copy()
+        out._own, self._own = set(), set()
+        return out
+
+    def candidates(self, files=None, extensions=None):
+        """Skill keys usable in a workspace with these files / extensions;
+        None when neither is given (no filtering)."""
+        if not files and not extensions:
+            return None
+        files = [str(f).replace("\\", "/") for f in files or ()]
+        exts = {norm_ext(e) for e in extensions or ()}
+        for f in files:
+            exts.update(file_exts(f))
+        out = set(self.unscoped)
+        for ext in exts:
+            out.update(self.by_ext.get(ext, ()))
+        for key, compiled in self.paths.items():
+            if key in out:
+                continue
+            for regex, hint in compiled:
+                if any(regex.match(f) for f in files) or (
+                        extensions and (hint is None or hint == "" or hint in exts)):
+                    out.add(key)
+                    break
+        return out
+
+
+def parse_workspace(spec):
+    """'src/app.ts, .py, *.vue' → {'files': [...], 'extensions': [...]}; {} when empty."""
+    items = [s.strip() for s in re.split(r"[,\n]", spec or "") if s.strip()]
+    if not items:
+        return {}
+    exts = [norm_ext(s) for s in items if s.startswith((".", "*."))]
+    files = [s for s in items if not s.startswith((".", "*."))]
+    return {"files": files, "extensions": exts}
+
+
+class ScopedRAG:
+    """Wraps a rag so every retrieve() only returns skills in scope.
+    Indexes with native scope support filter before scoring; others are
+    over-fetched and filtered against a ScopeIndex of the corpus."""
+
+    OVERFETCH = 50
+
+    def __init__(self, rag, files=None, extensions=None, scopes=None):
+        self.rag, self.files, self.extensions = rag, files, extensions
+        self._scopes = scopes
+
+    def __getattr__(self, name):
+        return getattr(self.rag, name)
+
+    def retrieve(self, query, top_k=3):
+        if getattr(self.rag, "supports_scope", False):
+            return self.rag.retrieve(query, top_k, files=self.files, extensions=self.extensions)
+        if self._scopes is None:
+            self._scopes = corpus_scopes()
+        allowed = self._scopes.candidates(self.files, self.extensions)
+        hits = self.rag.retrieve(query, top_k=max(top_k, self.OVERFETCH))
+        return [h for h in hits if _hit_in(h, allowed)][:top_k]
+
+
+def _hit_in(hit, allowed):
+    """Whether a (key, record, score) hit is in scope. SkillsRAG keys are
+    "<source>::<name>" and its records are dicts, so match on the bare key and
+    the record's name; older rags hand back the name itself."""
+    key, record = hit[0], hit[1]
+    name = record.get("name") if isinstance(record, dict) else record
+    return key in allowed or skill_name(key) in allowed or name in allowed
+
+
+_CORPUS = None
+
+
+def corpus_scopes():
+    """ScopeIndex over the skill roots, keyed by directory and frontmatter name."""
+    global _CORPUS
+    if _CORPUS is None:
+        from skills_corpus import iter_skill_files, parse_skill, read_skill
+        index = ScopeIndex()
+        for key, path in iter_skill_files():
+            meta = parse_skill(read_skill(path))[0]
+            index.add(key, meta)
+            if meta.get("name") and meta["name"] != key:
+                index.add(meta["name"], meta)
+        _CORPUS = index
+    return _CORPUS
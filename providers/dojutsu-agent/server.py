@@ -0,0 +1,255 @@
+"""
+🥷 Dojutsu-for-AI — Provider socket server (framed + legacy one-shot)
+Entry point: python server.py [socket_path] [workers]
+
+Framed mode — the client opens with the 4-byte preface b"DJF1", then both
+sides exchange frames:  [4-byte big-endian length][UTF-8 JSON object]
+
+  client → server
+    {"id": 1, "type": "call", "function": "run", "args": [...],
+     "tenant": "team-a", "traffic": "interactive" | "batch"}      (optional scheduling)
+    {"id": 1, "type": "cancel"}
+    {"id": 0, "type": "ping"}
+  server → client
+    {"id": 1, "type": "stage",  "stage": "byakugan", "data": {...}}   (0..n)
+    {"id": 1, "type": "chunk",  "field": "execution", "data": "..."}  (0..n, in order)
+    {"id": 1, "type": "result", "data": ...}
+    {"id": 1, "type": "error",  "error": "..."}
+    {"id": 1, "type": "cancelled"}
+    {"id": 0, "type": "pong"}
+
+Many calls may be in flight per connection; responses are matched by `id`.
+A cancel aborts the in-flight LLM request of that call (llm_client.CancelToken).
+The `execution` text of a result is streamed as STREAM_CHUNK-sized chunk frames
+and left out of the result frame's data; clients concatenate the chunks.
+A frame that is not a JSON object, or a call with malformed fields, gets an
+error frame (`id` null when unknown); a frame over MAX_FRAME gets one and the
+connection is closed, since the stream cannot be resynchronised.
+
+Legacy mode — any connection not starting with the preface is the documented
+one-shot protocol: one JSON object {"package", "function", "args"} in, one
+JSON result out (written incrementally), then the server closes the socket.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_client import CancelToken, Cancelled, cancel_scope
+from scheduler import scheduling
+
+PREFACE = b"DJF1"
+HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+STREAM_CHUNK = 16 * 1024  # chars of streamed result text per chunk frame
+STREAMED_FIELDS = ("execution",)
+DEFAULT_SOCKET = os.environ.get("DOJUTSU_SOCKET", "/tmp/dojutsu_agent.sock")
+
+
+class FrameTooLarge(ValueError):
+    """Length prefix over MAX_FRAME; the body was not read."""
+
+
+def encode_frame(obj):
+    body = json.dumps(obj, ensure_ascii=False).encode()
+    return HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader):
+    """Next frame as a dict, or None on clean EOF. Raises FrameTooLarge, or
+    ValueError for a body that is not a JSON object (the body is consumed)."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise FrameTooLarge(f"frame too large: {size} bytes (max {MAX_FRAME})")
+    frame = json.loads(await reader.readexactly(size))
+    if not isinstance(frame, dict):
+        raise ValueError(f"frame is a JSON {type(frame).__name__}, not an object")
+    return frame
+
+
+def call_error(frame):
+    """Why a call frame cannot be dispatched, or None."""
+    if not isinstance(frame.get("function", ""), str):
+        return "'function' must be a string"
+    if not isinstance(frame.get("args", []), list):
+        return "'args' must be a list"
+    return None
+
+
+def _load_dispatch():
+    from main import DISPATCH
+    return DISPATCH
+
+
+class ProviderServer:
+    def __init__(self, dispatch=None, workers=8):
+        self._dispatch = dispatch
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dojutsu")
+
+    @property
+    def dispatch(self):
+        if self._dispatch is None:
+            self._dispatch = _load_dispatch()
+        return self._dispatch
+
+    def _invoke(self, fn, args, token, on_stage=None, tenant=None, traffic=None):
+        """Runs in a worker thread, with `token` and scheduling bound for llm_client."""
+        cancel_scope(token)
+        func = self.dispatch.get(fn)
+        if func is None:
+            raise ValueError(f"Unknown function '{fn}'. Available: {list(self.dispatch)}")
+        with scheduling(tenant, traffic):
+            if on_stage is not None and fn == "run":
+                return func(*args, on_stage=on_stage)
+            return func(*args)
+
+    async def _call(self, fn, args, token, on_stage=None, tenant=None, traffic=None):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, ctx.run, self._invoke, fn, args, token, on_stage, tenant, traffic)
+
+    # ── connection handling ──────────────────────────────────────────────────
+
+    async def handle(self, reader, writer):
+        try:
+            first = await reader.read(len(PREFACE))
+            if first == PREFACE:
+                await self._framed(reader, writer)
+            elif first:
+                await self._legacy(first, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _legacy(self, head, reader, writer):
+        buf, decoder = head, json.JSONDecoder()
+        while True:
+            try:
+                req, _ = decoder.raw_decode(buf.decode("utf-8").lstrip())
+                break
+            except (ValueError, UnicodeDecodeError):
+                chunk = await reader.read(65536) if len(buf) <= MAX_FRAME else b""
+                if not chunk:
+                    error = "request too large" if len(buf) > MAX_FRAME else "invalid request"
+                    writer.write(json.dumps({"error": error}).encode())
+                    await writer.drain()
+                    return
+                buf += chunk
+        error = "request must be a JSON object" if not isinstance(req, dict) else call_error(req)
+        if error:
+            out = {"error": error}
+        else:
+            try:
+                out = await self._call(req.get("function", ""), req.get("args", []), CancelToken())
+            except Exception as e:
+                out = {"error": str(e)}
+        pending = []
+        for piece in json.JSONEncoder(ensure_ascii=False).iterencode(out):
+            pending.append(piece)
+            if len(pending) >= 256:
+                writer.write("".join(pending).encode())
+                pending.clear()
+                await writer.drain()
+        writer.write("".join(pending).encode())
+        await writer.drain()
+
+    async def _framed(self, reader, writer):
+        lock = asyncio.Lock()
+        inflight = {}
+        loop = asyncio.get_running_loop()
+
+        async def send(obj):
+            async with lock:
+                writer.write(encode_frame(obj))
+                await writer.drain()
+
+        async def send_result(rid, out):
+            if isinstance(out, dict):
+                streamed = [f for f in STREAMED_FIELDS if isinstance(out.get(f), str)]
+                for field in streamed:
+                    text = out[field]
+                    for i in range(0, len(text), STREAM_CHUNK):
+                        await send({"id": rid, "type": "chunk", "field": field,
+                                    "data": text[i:i + STREAM_CHUNK]})
+                out = {k: v for k, v in out.items() if k not in streamed}
+            await send({"id": rid, "type": "result", "data": out})
+
+        async def serve_call(rid, frame, token):
+            def on_stage(name, data):
+                asyncio.run_coroutine_threadsafe(
+                    send({"id": rid, "type": "stage", "stage": name, "data": data}), loop)
+            try:
+                out = await self._call(frame.get("function", ""), frame.get("args", []), token,
+                                       on_stage, frame.get("tenant"), frame.get("traffic"))
+                await send_result(rid, out)
+            except (Cancelled, asyncio.CancelledError):
+                await send({"id": rid, "type": "cancelled"})
+            except Exception as e:
+                await send({"id": rid, "type": "error", "error": str(e)})
+            finally:
+                inflight.pop(rid, None)
+
+        try:
+            while True:
+                try:
+                    frame = await read_frame(reader)
+                except FrameTooLarge as e:
+                    await send({"id": None, "type": "error", "error": str(e)})
+                    break
+                except ValueError as e:
+                    await send({"id": None, "type": "error", "error": f"bad frame: {e}"})
+                    continue
+                if frame is None:
+                    break
+                rid, kind = frame.get("id"), frame.get("type")
+                if not isinstance(rid, (int, str, type(None))):
+                    await send({"id": None, "type": "error",
+                                "error": "'id' must be an int or string"})
+                    continue
+                if kind == "call":
+                    error = call_error(frame) or ("duplicate id" if rid in inflight else None)
+                    if error:
+                        await send({"id": rid, "type": "error", "error": error})
+                        continue
+                    token = CancelToken()
+                    task = asyncio.ensure_future(serve_call(rid, frame, token))
+                    inflight[rid] = (task, token)
+                elif kind == "cancel" and rid in inflight:
+                    inflight[rid][1].cancel()
+                elif kind == "ping":
+                    await send({"id": rid, "type": "pong"})
+                elif kind != "cancel":
+                    await send({"id": rid, "type": "error", "error": f"unknown frame type '{kind}'"})
+        finally:
+            for task, token in list(inflight.values()):
+                token.cancel()
+            if inflight:
+                await asyncio.gather(*(t for t, _ in inflight.values()), return_exceptions=True)
+
+    async def serve(self, path=DEFAULT_SOCKET):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.handle, path=path, limit=MAX_FRAME)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    sock_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOCKET
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(json.dumps({"listening": sock_path, "workers": workers}), file=sys.stderr)
+    try:
+        asyncio.run(ProviderServer(workers=workers).serve(sock_path))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,268 @@
+"""
+🥷 Dojutsu-for-AI — Iterative sessions
+A session keeps the first run's stage outputs, selected skills and execution, so a
+follow-up ("now add rate limiting", "switch to Postgres") refines them instead of
+re-running the whole pipeline on a task that is 90% the same:
+
+  start       fused analysis → retrieve → execution                (cold run)
+  follow-up   ONE delta-analysis call on the change + condensed prior conclusions
+              → retrieve on the change, inject only skills not used yet (the ones
+                already applied live on in the prior execution)
+              → execution with the prior execution and the delta as context
+
+Each follow-up reports what it saved against a cold `run` of the accumulated task
+through the full pipeline (Byakugan → Mode Sage → Jōgan → Skill selection →
+Execution, 5 calls): calls, and prompt + completion tokens (~4 chars / token on
+both sides; the cold prompts are rebuilt exactly, cold completions are the
+accumulated stage outputs, the skills used so far as the selector's reply and
+this turn's execution).
+Sessions persist as JSON in DOJUTSU_SESSION_DIR (default ~/.dojutsu/sessions),
+one `<id>.json` per session; ids are the 12-hex-digit ones `start` hands out.
+"""
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+
+from fused import SECTIONS, FusedAnalysis
+from prompts import execution_prompt, followup_prompt, skill_keys, skill_names
+
+SESSION_DIR = Path(os.environ.get("DOJUTSU_SESSION_DIR",
+                                  Path.home() / ".dojutsu" / "sessions"))
+CONCLUSION_BUDGET = 600  # chars per analysis section in the delta prompt
+_ID = re.compile(r"^[0-9a-f]{12}$")
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+
+
+def est_tokens(*texts):
+    return sum((len(t) + 3) // 4 for t in texts)
+
+
+def prompt_tokens(system, messages):
+    return est_tokens(system, *(m["content"] for m in messages))
+
+
+def condense(text, budget=CONCLUSION_BUDGET):
+    """First sentence of each paragraph (conclusions lead), until `budget` chars."""
+    text = text.strip()
+    if len(text) <= budget:
+        return text
+    out, used = [], 0
+    for para in re.split(r"\n\s*\n", text):
+        lead = _SENTENCE.split(para.strip(), 1)[0].strip()
+        if not lead:
+            continue
+        if used + len(lead) > budget:
+            out.append(lead[:max(0, budget - used)].rstrip() + "…")
+            break
+        out.append(lead)
+        used += len(lead) + 1
+    return "\n".join(out)
+
+
+def session_path(session_id):
+    """SESSION_DIR/<id>.json — only for ids shaped like the ones `start` hands out,
+    so a caller-supplied id can never name a file outside SESSION_DIR."""
+    if not isinstance(session_id, str) or not _ID.match(session_id):
+        raise ValueError(f"Invalid session id '{session_id}'")
+    return SESSION_DIR / f"{session_id}.json"
+
+
+def read(session_id):
+    """Saved session dict for an id in SESSION_DIR."""
+    path = session_path(session_id)
+    if not path.is_file():
+        raise ValueError(f"Unknown session '{session_id}'")
+    return json.loads(path.read_text())
+
+
+def cold_analysis(task, stages):
+    """[(prompt tokens, completion tokens)] of the three sequential analysis calls
+    a full-pipeline run makes, with `stages` as their outputs. The prompts are the
+    pipeline's own, built by its stage modules against a recording caller."""
+    from senjutsu.core.byakugan import Byakugan
+    from senjutsu.core.jougan import Jougan
+    from senjutsu.core.mode_sage import ModeSage
+    calls, outputs = [], iter(SECTIONS)
+
+    def record(system, messages, label="", max_tokens=3000):
+        text = stages[next(outputs)]
+        calls.append((prompt_tokens(system, messages), est_tokens(text)))
+        return text, 0.0
+
+    byakugan = Byakugan(record).analyze(task)
+    mode_sage = ModeSage(record).evaluate(task, byakugan)
+    Jougan(record).anticipate(task, byakugan, mode_sage)
+    return calls
+
+
+def cold_selection(task, stages, skills_list, selected):
+    """(prompt tokens, completion tokens) of the pipeline's skill-selection call
+    on the full catalog, with the `selected` skill names as its reply."""
+    from senjutsu.core.pipeline import SKILL_SELECTOR_SYSTEM
+    combined = "\n".join(stages[name] for name in SECTIONS)
+    messages = [{"role": "user", "content": f"Demande : {task}"},
+                {"role": "assistant", "content": f"ANALYSES :\n{combined[:1500]}"},
+                {"role": "user", "content": "Sélectionne les skills précis."}]
+    system = SKILL_SELECTOR_SYSTEM.format(skills_list=skills_list)
+    return prompt_tokens(system, messages), est_tokens("\n".join(selected))
+
+
+def render(stages):
+    return "\n\n".join(f"## {name}\n{stages[name]}" for name in SECTIONS if stages.get(name))
+
+
+class Session:
+    """Multi-turn refinement over one task.
+
+    analysis_llm / execution_llm: llm_callers (the same one is fine)
+    rag: skills index (retrieve / get_content); skill_content(keys) → injected text,
+    defaults to rag.get_content.
+    """
+
+    def __init__(self, analysis_llm, execution_llm, rag, skill_content=None, top_k=3,
+                 session_id=None):
+        self.fast, self.strong, self.rag = analysis_llm, execution_llm, rag
+        self.skill_content = skill_content or rag.get_content
+        self.top_k = top_k
+        self.id = session_id or uuid.uuid4().hex[:12]
+        self.task, self.changes = "", []
+        self.stages = dict.fromkeys(SECTIONS, "")
+        self.skills, self.skill_names = [], []
+        self.execution = ""
+        self.turns = []
+        self.meta = {}
+        self.path = None  # file it was loaded from / last saved to
+
+    # ── turns ────────────────────────────────────────────────────────────────
+
+    def _call(self, turn, llm, system, messages, label, max_tokens):
+        text, elapsed = llm(system, messages, label=label, max_tokens=max_tokens)
+        turn["calls"].append({"label": label, "prompt_tokens": prompt_tokens(system, messages),
+                              "completion_tokens": est_tokens(text),
+                              "seconds": round(elapsed, 3)})
+        return text
+
+    def _add_skills(self, query):
+        """Retrieve for `query` → (keys not injected in an earlier turn, their text).
+        Skills already applied live on in the prior execution."""
+        hits = self.rag.retrieve(query, top_k=self.top_k)
+        new = [k for k in skill_keys(hits) if k not in self.skills]
+        names = dict(zip((k for k, _, _ in hits), skill_names(hits)))
+        self.skills += new
+        self.skill_names += [names[k] for k in new]
+        return new, self.skill_content(new) if new else ""
+
+    def start(self, task):
+        """Cold run: fused analysis + execution. Returns the turn report."""
+        if self.turns:
+            raise ValueError(f"session '{self.id}' already started")
+        self.task, t0 = task, time.time()
+        turn = {"change": None, "calls": []}
+        analyst = FusedAnalysis(self._metered(turn, self.fast))
+        for s in analyst.analyze(task):
+            self.stages[s["module"]] = s["content"]
+        new, skills = self._add_skills(task)
+        system, messages = execution_prompt(task, skills, render(self.stages))
+        self.execution = self._call(turn, self.strong, system, messages, "Execution", 6000)
+        return self._close(turn, new, t0)
+
+    def followup(self, change):
+        """Delta analysis + incremental skills + execution on top of the prior one."""
+        if not self.turns:
+            raise ValueError(f"session '{self.id}' has no initial run; call start() first")
+        t0, previous = time.time(), self.execution
+        turn = {"change": change, "calls": []}
+        conclusions = render({name: condense(self.stages[name]) for name in SECTIONS})
+        delta = FusedAnalysis(self._metered(turn, self.fast)).refine(conclusions, change)
+        delta = {s["module"]: s["content"].strip() for s in delta}
+        new, skills = self._add_skills(change)
+        system, messages = followup_prompt(self.task, change, previous, skills, render(delta))
+        self.execution = self._call(turn, self.strong, system, messages, "Execution", 6000)
+        self.changes.append(change)
+        for name in SECTIONS:
+            if delta[name]:
+                self.stages[name] = f"{self.stages[name]}\n\n### Follow-up: {change}\n{delta[name]}"
+        return self._close(turn, new, t0)
+
+    def _metered(self, turn, llm):
+        def caller(system, messages, label="", max_tokens=3000):
+            text = self._call(turn, llm, system, messages, label, max_tokens)
+            return text, turn["calls"][-1]["seconds"]
+        return caller
+
+    def _close(self, turn, new_skills, t0):
+        turn["new_skills"] = new_skills
+        turn["tokens"] = sum(c["prompt_tokens"] + c["completion_tokens"] for c in turn["calls"])
+        turn["seconds"] = round(time.time() - t0, 2)
+        self.turns.append(turn)
+        if turn["change"] is not None:
+            cold = self.cold_estimate(turn)
+            turn["cold"] = cold
+            turn["saved"] = {"calls": cold["calls"] - len(turn["calls"]),
+                             "tokens": cold["tokens"] - turn["tokens"]}
+        return self.report(turn)
+
+    # ── accounting ───────────────────────────────────────────────────────────
+
+    def cold_task(self):
+        if not self.changes:
+            return self.task
+        return self.task + "\n\nAlso:\n" + "\n".join(f"- {c}" for c in self.changes)
+
+    def cold_estimate(self, turn):
+        """Calls / tokens a cold full-pipeline run of `cold_task()` would spend now:
+        the three sequential analysis calls, skill selection over the catalog, then
+        Execution on all their outputs, with this turn's execution completion."""
+        task = self.cold_task()
+        calls = cold_analysis(task, self.stages)
+        calls.append(cold_selection(task, self.stages, self.rag.list_skills(),
+                                    self.skill_names))
+        keys = skill_keys(self.rag.retrieve(task, top_k=self.top_k))
+        system, messages = execution_prompt(task, self.skill_content(keys), render(self.stages))
+        tokens = (sum(p + c for p, c in calls) + prompt_tokens(system, messages)
+                  + turn["calls"][-1]["completion_tokens"])
+        return {"calls": len(calls) + 1, "tokens": tokens}
+
+    def report(self, turn=None):
+        turn = turn or self.turns[-1]
+        out = {"session": self.id, "turn": len(self.turns), "execution": self.execution,
+               "skills_used": list(self.skill_names), "new_skills": turn["new_skills"],
+               "calls": len(turn["calls"]), "tokens": turn["tokens"],
+               "seconds": turn["seconds"]}
+        out.update(self.stages)
+        if "saved" in turn:
+            out.update(cold=turn["cold"], saved=turn["saved"])
+        return out
+
+    # ── persistence ──────────────────────────────────────────────────────────
+
+    def to_dict(self):
+        return {"id": self.id, "task": self.task, "changes": self.changes,
+                "stages": self.stages, "skills": self.skills, "skill_names": self.skill_names,
+                "execution": self.execution,
+                "turns": self.turns, "top_k": self.top_k, "meta": self.meta}
+
+    def save(self, path=None):
+        """Write to `path`, else back to the file it came from, else SESSION_DIR/<id>.json."""
+        path = Path(path) if path else self.path or session_path(self.id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+        os.replace(tmp, path)
+        self.path = path
+        return path
+
+    @classmethod
+    def load(cls, session_id, analysis_llm, execution_llm, rag, skill_content=None):
+        """Session `session_id` from SESSION_DIR; `save()` writes it back there."""
+        data = read(session_id)
+        s = cls(analysis_llm, execution_llm, rag, skill_content, data.get("top_k", 3), data["id"])
+        s.task, s.changes, s.execution = data["task"], data["changes"], data["execution"]
+        s.stages.update(data["stages"])
+        s.skills, s.skill_names = data["skills"], data["skill_names"]
+        s.turns, s.meta = data["turns"], data.get("meta", {})
+        s.path = session_path(session_id)
+        return s
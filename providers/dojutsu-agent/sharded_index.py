@@ -0,0 +1,218 @@
+"""
+🥷 Dojutsu-for-AI — Sharded scatter-gather skills index
+ShardedSkillIndex(shards=N) partitions skills across N worker processes,
+each owning a SkillIndex slice (crc32(key) % N). The coordinator keeps the
+global statistics (N, df) summed from the shards, turns a query into global
+idf weights, scatters it, and merges the per-shard top-k — scores are the
+ones a single SkillIndex over the whole corpus would give.
+
+index_all / retrieve / get_content / count / list_skills keep SkillsRAG's
+signatures. add_skill / update_skill / remove_skill go to the owning shard
+only; the coordinator applies the returned term deltas to its global df, and
+counts the skill from the shard's answer to "did you already hold this key"
+(a skill without terms has an empty vector, so its absence proves nothing).
+Shard workers are spawned (see skill_index); each builds its slice with
+`workers` processes of its own, like SkillIndex(workers=…).
+"""
+import heapq
+import multiprocessing as mp
+import sys
+import threading
+from collections import Counter
+from multiprocessing.util import Finalize
+
+from skill_index import SkillIndex, load_skill, query_weights, shard_of, skill_line
+from skills_corpus import iter_skill_files
+
+
+def _serve_shard(conn, sanitize, workers):
+    index = SkillIndex(sanitize=sanitize, workers=workers)
+    while True:
+        try:
+            cmd, *args = conn.recv()
+        except EOFError:  # coordinator gone without a "stop"
+            return
+        if cmd == "stop":
+            conn.close()
+            return
+        try:
+            if cmd == "index":
+                index.rebuild(args[0])
+                out = (index.count, dict(index.df))
+            elif cmd == "put":
+                key, path = args
+                if path is None:
+                    if key not in index.storage:
+                        raise KeyError(f"skill '{key}' is not indexed")
+                    path = index.storage[key]["path"]
+                existed = key in index.storage
+                old = list(index.vectors.get(key, ()))
+                record, vector = load_skill(key, path)
+                index._commit([(key, record, vector)])
+                out = (existed, old, list(vector))
+            elif cmd == "drop":
+                old = list(index.vectors.get(args[0], ()))
+                out = old if index.remove_skill(args[0]) else None
+            elif cmd == "search":
+                weights, k, files, extensions = args
+                out = index.search(weights, k, index.scopes.candidates(files, extensions))
+            elif cmd == "content":
+                out = {k: index.get_content([k]) for k in args[0] if k in index.storage}
+            elif cmd == "records":
+                out = {k: index.storage[k] for k in args[0] if k in index.storage}
+            elif cmd == "list":
+                out = [(k, skill_line(r)) for k, r in index.storage.items()]
+            else:
+                raise ValueError(f"unknown shard command '{cmd}'")
+            conn.send(("ok", out))
+        except Exception as e:  # reported to the coordinator, shard keeps serving
+            conn.send(("error", repr(e)))
+
+
+def _stop_shards(conns, procs):
+    for conn in conns:
+        try:
+            conn.send(("stop",))
+            conn.close()
+        except (OSError, BrokenPipeError):
+            pass
+    for proc in procs:
+        proc.join(timeout=5)
+    conns.clear()
+    procs.clear()
+
+
+class ShardedSkillIndex:
+    supports_scope = True
+
+    def __init__(self, shards=4, dirs=None, sanitize=None, context=None, workers=1):
+        self.shards, self.dirs = shards, dirs
+        ctx = context or mp.get_context("spawn")
+        self._conns, self._procs = [], []
+        for _ in range(shards):
+            parent, child = ctx.Pipe()
+            # a daemonic process may not start the build pool of its own
+            proc = ctx.Process(target=_serve_shard, args=(child, sanitize, workers),
+                               daemon=workers == 1)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        # stops the shards before multiprocessing joins non-daemonic children at exit
+        self._stop = Finalize(self, _stop_shards, (self._conns, self._procs), exitpriority=10)
+        self.df, self._count = Counter(), 0
+        self._lock = threading.RLock()  # one request in flight per pipe; df/count updates
+
+    # ── scatter / gather ─────────────────────────────────────────────────────
+
+    def _scatter(self, messages):
+        """Send messages[i] to shard i (None = skip), gather replies in order."""
+        with self._lock:
+            return self._exchange(messages)
+
+    def _exchange(self, messages):
+        for conn, msg in zip(self._conns, messages):
+            if msg is not None:
+                conn.send(msg)
+        out = []
+        for conn, msg in zip(self._conns, messages):
+            if msg is None:
+                out.append(None)
+                continue
+            status, value = conn.recv()
+            if status != "ok":
+                raise RuntimeError(f"shard error: {value}")
+            out.append(value)
+        return out
+
+    def _broadcast(self, *msg):
+        return self._scatter([msg] * self.shards)
+
+    # ── SkillsRAG surface ────────────────────────────────────────────────────
+
+    def index_all(self, verbose=True):
+        parts = [[] for _ in range(self.shards)]
+        for key, path in iter_skill_files(self.dirs):
+            parts[shard_of(key, self.shards)].append((key, path))
+        with self._lock:
+            self.df, self._count = Counter(), 0
+            for count, df in self._scatter([("index", p) for p in parts]):
+                self._count += count
+                self.df.update(df)
+        if verbose:
+            print(f"📚 {self._count} skills indexed across {self.shards} shards", file=sys.stderr)
+        return self._count
+
+    @property
+    def count(self):
+        return self._count
+
+    def retrieve(self, query, top_k=3, files=None, extensions=None):
+        with self._lock:
+            weights = query_weights(query, self.df, self._count)
+            search = ("search", weights, top_k, files, extensions)
+            hits = list(heapq.merge(*self._broadcast(*search)))[:top_k]
+            by_shard = [[] for _ in range(self.shards)]
+            for _, key in hits:
+                by_shard[shard_of(key, self.shards)].append(key)
+            records = {}
+            for part in self._scatter([("records", ks) if ks else None for ks in by_shard]):
+                records.update(part or {})
+        return [(key, records[key], -neg) for neg, key in hits]
+
+    def get_content(self, keys):
+        keys = list(keys)
+        by_shard = [[] for _ in range(self.shards)]
+        for key in keys:
+            by_shard[shard_of(key, self.shards)].append(key)
+        content = {}
+        for part in self._scatter([("content", ks) if ks else None for ks in by_shard]):
+            content.update(part or {})
+        return "\n\n".join(content[k] for k in keys if content.get(k))
+
+    def _one(self, key, msg):
+        shard = shard_of(key, self.shards)
+        messages = [None] * self.shards
+        messages[shard] = msg
+        return self._scatter(messages)[shard]
+
+    def _apply_df(self, old, new=()):
+        self.df.update(new)
+        for t in old:
+            self.df[t] -= 1
+            if self.df[t] <= 0:
+                del self.df[t]
+
+    def _put(self, key, path):
+        with self._lock:
+            existed, old, new = self._one(key, ("put", key, path))
+            self._count += 0 if existed else 1
+            self._apply_df(old, new)
+
+    def add_skill(self, key, path):
+        self._put(key, path)
+
+    def update_skill(self, key, path=None):
+        self._put(key, path)
+
+    def remove_skill(self, key):
+        with self._lock:
+            old = self._one(key, ("drop", key))
+            if old is None:
+                return False
+            self._count -= 1
+            self._apply_df(old)
+            return True
+
+    def list_skills(self):
+        items = sorted(item for part in self._broadcast("list") for item in part)
+        return "\n".join(line for _, line in items)
+
+    def close(self):
+        self._stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,312 @@
+"""
+🥷 Dojutsu-for-AI — Read-only skills index in shared memory
+One process builds a SkillIndex and publishes it as flat arrays in a single
+multiprocessing.shared_memory segment; worker processes attach by name and
+query it in place — no re-index, no per-worker copy of postings or bodies.
+
+Layout: b"DJSHM002" | u64 header length | JSON header | 8-aligned sections
+  term / term_off      sorted vocabulary (utf-8 blob + u64 offsets)
+  post_off             u64 per term → range in post_doc / post_w (df = range length)
+  post_doc / post_w    u32 doc ids / f64 term weights
+  key, name, description, source, globs, path, body
+                       utf-8 blobs + u64 offsets, docs ordered by key
+Scores are bit-identical to SkillIndex (same weights, same summation order).
+
+    python shm_index.py publish [name]     # build, publish, hold until Ctrl-C
+    DOJUTSU_SHM=<name> python main.py …    # workers attach instead of indexing
+"""
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from multiprocessing import shared_memory
+
+from scopes import ScopeIndex
+from skill_index import analyze, best_k, idf, skill_line
+
+MAGIC = b"DJSHM002"
+_PREFIX = struct.Struct("<8sQ")
+DOC_FIELDS = ("key", "name", "description", "source", "globs", "path", "body")
+
+
+def _strings(values):
+    blobs, offsets, pos = [], array("Q", [0]), 0
+    for v in values:
+        b = v.encode("utf-8")
+        blobs.append(b)
+        pos += len(b)
+        offsets.append(pos)
+    return b"".join(blobs), offsets
+
+
+def _pack(index):
+    """SkillIndex → ({section: bytes}, meta)."""
+    g = index.snapshot()
+    keys = sorted(g.storage)
+    records = [g.storage[k] for k in keys]
+    terms = sorted(g.postings)
+    postings = [g.postings[t] for t in terms]
+    doc_id = {k: i for i, k in enumerate(keys)}
+    sections = {}
+    sections["term"], sections["term_off"] = _strings(terms)
+    post_off, post_doc, post_w = array("Q", [0]), array("I"), array("d")
+    for posting in postings:
+        for d, key in sorted((doc_id[k], k) for k in posting):
+            post_doc.append(d)
+            post_w.append(posting[key])
+        post_off.append(len(post_doc))
+    sections.update(post_off=post_off, post_doc=post_doc, post_w=post_w)
+    columns = {"key": keys, "body": [r["content"] for r in records]}
+    for f in ("name", "description", "source", "globs", "path"):
+        columns[f] = [r.get(f, "") for r in records]
+    for f in DOC_FIELDS:
+        sections[f], sections[f + "_off"] = _strings(columns[f])
+    return {k: bytes(v) for k, v in sections.items()}, {"docs": len(keys), "terms": len(terms)}
+
+
+def _layout(sections, meta):
+    """Header + 8-aligned section offsets. Offsets depend on the header's own
+    length, so the header is padded to a reserved size that covers them."""
+    order = sorted(sections)
+    header = {"meta": meta, "sections": {name: [0, 0] for name in order}}
+    reserve = len(json.dumps(header, separators=(",", ":"))) + 24 * len(order) + 64
+    pos = -(-(_PREFIX.size + reserve) // 8) * 8
+    for name in order:
+        header["sections"][name] = [pos, len(sections[name])]
+        pos = -(-(pos + len(sections[name])) // 8) * 8
+    head = json.dumps(header, separators=(",", ":")).encode()
+    assert len(head) <= reserve
+    return head, header["sections"], max(pos, 8)
+
+
+def publish(index, name=None):
+    """Copy a built SkillIndex into a new shared memory segment (the owner handle)."""
+    sections, meta = _pack(index)
+    head, spans, size = _layout(sections, meta)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    shm.buf[:_PREFIX.size] = _PREFIX.pack(MAGIC, len(head))
+    shm.buf[_PREFIX.size:_PREFIX.size + len(head)] = head
+    for s, (off, length) in spans.items():
+        shm.buf[off:off + length] = sections[s]
+    return SharedSkillIndex(shm, owner=True, sanitize=index.sanitize)
+
+
+def _attach_untracked(name):
+    """Open an existing segment without leaving it in this process's resource
+    tracker — otherwise a worker exiting would unlink the index for everyone.
+    Before 3.13 attaching always registers, so we unregister right after (a child
+    spawned by the owner shares its tracker, which then logs a harmless KeyError
+    when the owner unlinks — CPython gh-82300)."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":  # only POSIX segments are registered with the tracker
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def attach(name, sanitize=None):
+    """Zero-copy read-only view of an index published under `name`."""
+    return SharedSkillIndex(_attach_untracked(name), owner=False, sanitize=sanitize)
+
+
+class _Storage:
+    """Read-only key → record mapping decoded on access (SkillsRAG.storage)."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index.count
+
+    def __contains__(self, key):
+        return self._index._doc(key) is not None
+
+    def __getitem__(self, key):
+        d = self._index._doc(key)
+        if d is None:
+            raise KeyError(key)
+        return self._index._record(d)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        return (self._index._field("key", d) for d in range(self._index.count))
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self._index._record(d) for d in range(self._index.count)]
+
+    def items(self):
+        return [(self._index._field("key", d), self._index._record(d))
+                for d in range(self._index.count)]
+
+
+class SharedSkillIndex:
+    supports_scope = True
+
+    def __init__(self, shm, owner=False, sanitize=None):
+        self.shm, self.owner, self.sanitize = shm, owner, sanitize
+        self.name = shm.name
+        buf = shm.buf
+        magic, head_len = _PREFIX.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"shared memory '{shm.name}' is not a published skills index")
+        header = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + head_len]))
+        self.meta = header["meta"]
+        self._views = []
+        self._s = {}
+        for s, (off, length) in header["sections"].items():
+            view = buf[off:off + length]
+            if s.endswith("_off") or s == "post_off":
+                view = view.cast("Q")
+            elif s == "post_doc":
+                view = view.cast("I")
+            elif s == "post_w":
+                view = view.cast("d")
+            self._views.append(view)
+            self._s[s] = view
+        self._scopes = None
+        self.storage = _Storage(self)
+
+    # ── low-level access ─────────────────────────────────────────────────────
+
+    @property
+    def count(self):
+        return self.meta["docs"]
+
+    def _field(self, field, d):
+        off = self._s[field + "_off"]
+        return bytes(self._s[field][off[d]:off[d + 1]]).decode("utf-8")
+
+    def _record(self, d):
+        f = {name: self._field(name, d) for name in DOC_FIELDS}
+        return {"name": f["name"], "description": f["description"], "source": f["source"],
+                "globs": f["globs"], "path": f["path"], "content": f["body"]}
+
+    def _find(self, field, n, target):
+        """Binary search a sorted string column → index or None."""
+        blob, off = self._s[field], self._s[field + "_off"]
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            v = bytes(blob[off[mid]:off[mid + 1]])
+            if v < target:
+                lo = mid + 1
+            elif v > target:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def _doc(self, key):
+        return self._find("key", self.count, key.encode("utf-8"))
+
+    def _term(self, term):
+        return self._find("term", self.meta["terms"], term.encode("utf-8"))
+
+    @property
+    def scopes(self):
+        if self._scopes is None:
+            scopes = ScopeIndex()
+            for d in range(self.count):
+                scopes.add(self._field("key", d), {"description": self._field("description", d),
+                                                   "globs": self._field("globs", d)})
+            self._scopes = scopes
+        return self._scopes
+
+    # ── SkillsRAG surface ────────────────────────────────────────────────────
+
+    def index_all(self, verbose=True):
+        """Already built by the publisher; kept for the SkillsRAG interface."""
+        if verbose:
+            print(f"📚 {self.count} skills (shared memory '{self.name}')", file=sys.stderr)
+        return self.count
+
+    def retrieve(self, query, top_k=3, files=None, extensions=None):
+        po, docs, wts = self._s["post_off"], self._s["post_doc"], self._s["post_w"]
+        n = self.count
+        allowed = self.scopes.candidates(files, extensions)
+        allowed_ids = None if allowed is None else {d for d in map(self._doc, allowed)
+                                                    if d is not None}
+        scores = {}
+        for t, c in Counter(analyze(query)).items():
+            i = self._term(t)
+            if i is None:
+                continue
+            a, b = po[i], po[i + 1]
+            qw = idf(b - a, n) * c
+            for j in range(a, b):
+                d = docs[j]
+                if allowed_ids is None or d in allowed_ids:
+                    scores[d] = scores.get(d, 0.0) + qw * wts[j]
+        # doc ids follow key order, so id ties break exactly like SkillIndex's key ties
+        return [(self._field("key", d), self._record(d), -neg)
+                for neg, d in best_k(scores, top_k)]
+
+    def get_content(self, keys):
+        parts = []
+        for key in keys:
+            d = self._doc(key)
+            if d is None:
+                continue
+            body = self._field("body", d)
+            if self.sanitize is not None:
+                body = self.sanitize(body)
+            parts.append(f"## {self._field('name', d)}\n{body.strip()}")
+        return "\n\n".join(parts)
+
+    def list_skills(self):
+        return "\n".join(skill_line({"name": self._field("name", d),
+                                     "description": self._field("description", d)})
+                         for d in range(self.count))
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views, self._s = [], {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _serve(name):
+    import signal
+    from skill_index import SkillIndex
+    index = SkillIndex()
+    index.index_all(verbose=False)
+    shared = publish(index, name or None)
+    print(json.dumps({"shm": shared.name, "skills": shared.count,
+                      "bytes": shared.shm.size}), flush=True)
+
+    def _stop(*_):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shared.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "publish":
+        _serve(sys.argv[2] if len(sys.argv) > 2 else "")
+    else:
+        print("usage: python shm_index.py publish [name]", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,441 @@
+"""
+🥷 Dojutsu-for-AI — Provider-side skills index (TF-IDF)
+Same surface as senjutsu's SkillsRAG — index_all(verbose), retrieve(query,
+top_k) → [(key, record, score)], get_content(keys), list_skills(), count,
+storage — so it can be handed to the pipeline as `rag`.
+
+Scoring: score(q, d) = Σ_t∈q idf(t) · qtf(t) · w(t, d)
+  w(t, d) = (1 + log tf) / ‖d‖   — the document norm does not depend on idf,
+  idf(t)  = log((1 + N) / (1 + df)) + 1
+so idf is applied at query time from (N, df) alone. That is what lets
+ShardedSkillIndex scatter a query with *global* idf weights and get exactly
+the scores of a single index — and what keeps add/update/remove_skill
+cheap: only that skill's own postings and df entries change.
+
+Concurrency: the index state is an immutable Generation. Readers take the
+current one with a single attribute read and no lock, so retrieve /
+get_content can run from any number of threads. Writers (index_all, the
+add/update/remove calls, SkillWatcher) build a fresh generation or fork the
+current one and publish it with one reference swap under a writer-only lock.
+A generation's maps are CowMaps: a fork is O(1) and an update copies only the
+trie paths to what it touches — that skill's storage and vector entries, its
+terms' postings and df entries — so its cost does not grow with the corpus. A retrieve
+sees the index either before or after a whole update, never in between; an
+old generation is freed by reference counting once the last reader holding
+it returns.
+
+Worker processes (the parallel build here, ShardedSkillIndex's shards) are
+spawned, never forked: the index usually lives in a threaded server, and a
+fork would copy whatever locks its other threads held.
+"""
+import hashlib
+import heapq
+import json
+import math
+import multiprocessing as mp
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+
+from cowmap import CowMap
+from scopes import ScopeIndex
+from skills_corpus import iter_skill_files, parse_skill, read_skill
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_STOP = frozenset("""a an and are as at be by for from has have i in into is it its of on or
+that the this to was were will with you your we our can should must do not use using when
+if then than but so such all any each more most""".split())
+NAME_BOOST, DESCRIPTION_BOOST = 3, 2
+BUILD_CHUNK = 64  # skills per work unit in a parallel build
+
+
+def analyze(text):
+    """Lower-cased terms, stop words and 1-char tokens removed."""
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in _STOP]
+
+
+def idf(df, n):
+    return math.log((1 + n) / (1 + df)) + 1
+
+
+def doc_vector(meta, body):
+    """Normalized (1 + log tf) weights for one skill."""
+    tf = Counter(analyze(body))
+    for _ in range(NAME_BOOST):
+        tf.update(analyze(meta.get("name", "").replace("-", " ")))
+    for _ in range(DESCRIPTION_BOOST):
+        tf.update(analyze(meta.get("description", "")))
+    weights = {t: 1 + math.log(c) for t, c in tf.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {t: w / norm for t, w in weights.items()}
+
+
+def load_skill(key, path):
+    """Read + parse one SKILL.md → (storage record, term vector)."""
+    text = read_skill(path)
+    meta, body = parse_skill(text)
+    record = {"name": meta.get("name") or key, "description": meta.get("description", ""),
+              "source": meta.get("source", ""), "globs": meta.get("globs", ""),
+              "path": str(path), "content": body}
+    return record, doc_vector(meta, body)
+
+
+def query_weights(query, df, n):
+    """[(term, idf · qtf)] in first-appearance order, for terms present in the corpus."""
+    qtf = Counter(analyze(query))
+    return [(t, idf(df[t], n) * c) for t, c in qtf.items() if df.get(t)]
+
+
+def best_k(scores, k):
+    """Highest scores first; ties broken by key so every index agrees on order."""
+    return heapq.nsmallest(k, ((-s, key) for key, s in scores.items()))
+
+
+def build_chunk(items):
+    """Worker stage of a parallel build: read, parse frontmatter and tokenize
+    one chunk of (key, path) → (entries, partial postings, partial df)."""
+    entries, postings, df = [], {}, Counter()
+    for key, path in items:
+        record, vector = load_skill(key, path)
+        entries.append((key, record, vector))
+        for t, w in vector.items():
+            postings.setdefault(t, {})[key] = w
+        df.update(vector.keys())
+    return entries, postings, df
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Generation:
+    """One immutable index state. Built privately (insert / delete), then
+    published by SkillIndex and never mutated again; later states are forks."""
+
+    __slots__ = ("number", "storage", "vectors", "postings", "df", "scopes", "__weakref__")
+
+    def __init__(self, number=0):
+        self.number = number
+        self.storage = CowMap()    # key → {name, description, source, globs, path, content}
+        self.vectors = CowMap()    # key → {term: weight}
+        self.postings = CowMap()   # term → CowMap{key: weight}
+        self.df = CowMap()         # term → document frequency
+        self.scopes = ScopeIndex()
+
+    @property
+    def count(self):
+        return len(self.storage)
+
+    def merge(self, entries, postings, df):
+        """Append one build_chunk result (new keys only). Chunks merged in scan
+        order give the exact maps and floats of inserting one by one."""
+        for key, record, vector in entries:
+            self.storage[key] = record
+            self.vectors[key] = vector
+            self.scopes.add(key, record)
+        for t, posting in postings.items():
+            mine = self.postings.get(t)
+            if mine is None:
+                self.postings[t] = CowMap(posting)
+            else:
+                mine.update(posting)
+        for t, n in df.items():
+            self.df[t] = self.df.get(t, 0) + n
+
+    def fingerprint(self):
+        """sha256 of the whole state in key order (build reproducibility)."""
+        h = hashlib.sha256()
+        for part in (self.storage, self.vectors, self.postings, self.df, self.scopes.scopes):
+            h.update(b"\0")
+            for key in sorted(part):  # streamed: a whole-state dump would double memory
+                value = part[key]
+                if isinstance(value, CowMap):
+                    value = dict(sorted(value.items()))
+                h.update(json.dumps([key, value], ensure_ascii=False).encode())
+        return h.hexdigest()
+
+    def fork(self, terms):
+        """Next generation sharing everything with this one; the postings of
+        `terms` (about to change) become their own copy-on-write copies."""
+        g = Generation(self.number + 1)
+        g.storage, g.vectors = self.storage.copy(), self.vectors.copy()
+        g.postings, g.df = self.postings.copy(), self.df.copy()
+        for t in terms:
+            posting = g.postings.get(t)
+            if posting is not None:
+                g.postings[t] = posting.copy()
+        g.scopes = self.scopes.copy()
+        return g
+
+    def insert(self, key, record, vector):
+        if key in self.vectors:
+            self.delete(key)
+        self.storage[key] = record
+        self.vectors[key] = vector
+        for t, w in vector.items():
+            posting = self.postings.get(t)
+            if posting is None:
+                posting = self.postings[t] = CowMap()
+            posting[key] = w
+            self.df[t] = self.df.get(t, 0) + 1
+        self.scopes.add(key, record)
+
+    def delete(self, key):
+        vector = self.vectors.pop(key)
+        self.storage.pop(key, None)
+        self.scopes.remove(key)
+        for t in vector:
+            posting = self.postings[t]
+            del posting[key]
+            if not posting:
+                del self.postings[t]
+            if self.df[t] > 1:
+                self.df[t] -= 1
+            else:
+                del self.df[t]
+
+    def search(self, weights, k, allowed=None):
+        scores = {}
+        for t, qw in weights:
+            posting = self.postings.get(t, {})
+            if allowed is None:
+                items = posting.items()
+            elif len(allowed) < len(posting):
+                items = ((key, posting[key]) for key in allowed if key in posting)
+            else:
+                items = ((key, w) for key, w in posting.items() if key in allowed)
+            for key, w in items:
+                scores[key] = scores.get(key, 0.0) + qw * w
+        return best_k(scores, k)
+
+
+class SkillIndex:
+    supports_scope = True  # retrieve(files=, extensions=) filters before scoring
+
+    def __init__(self, dirs=None, sanitize=None, workers=1):
+        self.dirs = dirs
+        self.sanitize = sanitize
+        self.workers = workers  # index_all processes; 0 → one per CPU
+        self._write = threading.Lock()  # writers only; readers never block
+        self._gen = Generation()
+
+    def snapshot(self):
+        """Current generation — consistent for as long as the caller holds it."""
+        return self._gen
+
+    # Attributes of the current generation (SkillsRAG.storage and friends)
+    storage = property(lambda self: self._gen.storage)
+    vectors = property(lambda self: self._gen.vectors)
+    postings = property(lambda self: self._gen.postings)
+    df = property(lambda self: self._gen.df)
+    scopes = property(lambda self: self._gen.scopes)
+
+    # ── build ────────────────────────────────────────────────────────────────
+
+    def index_all(self, verbose=True):
+        count = self.rebuild(iter_skill_files(self.dirs))
+        if verbose:
+            print(f"📚 {count} skills indexed", file=sys.stderr)
+        return count
+
+    def rebuild(self, items, workers=None):
+        """Index (key, path) items into a fresh generation, then swap it in;
+        readers keep the old one until they drop it.
+
+        workers > 1: the scanned items stream in BUILD_CHUNK work units to a
+        process pool (read → parse → tokenize → partial postings / df), and the
+        chunks are merged in scan order — the result is identical to the serial
+        build; the pool is spawned (see the module docstring). Keys repeated
+        across roots fall back to the serial path, whose re-insert order
+        defines the override; that fallback is reported on stderr."""
+        items = list(items)
+        workers = self.workers if workers is None else workers
+        workers = workers if workers > 0 else os.cpu_count() or 1
+        fresh = Generation()
+        parallel = workers > 1 and len(items) > BUILD_CHUNK
+        if parallel and len(dict(items)) < len(items):
+            repeated = len(items) - len(dict(items))
+            print(f"⚠️ {repeated} skill keys repeated across roots — building serially",
+                  file=sys.stderr)
+            parallel = False
+        if parallel:
+            with mp.get_context("spawn").Pool(workers) as pool:
+                for chunk in pool.imap(build_chunk, _chunks(items, BUILD_CHUNK)):
+                    fresh.merge(*chunk)
+        else:
+            for key, path in items:
+                fresh.insert(key, *load_skill(key, path))
+        with self._write:
+            fresh.number = self._gen.number + 1
+            self._gen = fresh
+        return fresh.count
+
+    def add_paths(self, items):
+        self._commit([(key, *load_skill(key, path)) for key, path in items])
+
+    # ── live updates ─────────────────────────────────────────────────────────
+
+    def _commit(self, inserts=(), deletes=()):
+        """Copy-on-write update: fork the current generation (sharing all
+        untouched postings), apply, publish with one reference swap."""
+        with self._write:
+            current = self._gen
+            deletes = [key for key in deletes if key in current.vectors]
+            terms = set()
+            for key, _, vector in inserts:
+                terms.update(vector)
+                terms.update(current.vectors.get(key, ()))
+            for key in deletes:
+                terms.update(current.vectors[key])
+            g = current.fork(terms)
+            for key in deletes:
+                g.delete(key)
+            for key, record, vector in inserts:
+                g.insert(key, record, vector)
+            self._gen = g
+        return deletes
+
+    def add_skill(self, key, path):
+        """Index (or re-index) one SKILL.md."""
+        record, vector = load_skill(key, path)
+        self._commit([(key, record, vector)])
+
+    def update_skill(self, key, path=None):
+        """Re-read a skill already in the index (from its recorded path by default)."""
+        record = self._gen.storage.get(key)
+        if record is None:
+            raise KeyError(f"skill '{key}' is not indexed")
+        self.add_skill(key, path or record["path"])
+
+    def remove_skill(self, key):
+        """Drop one skill; returns False if it was not indexed."""
+        return bool(self._commit(deletes=[key]))
+
+    # ── query (lock-free: one generation per call) ───────────────────────────
+
+    @property
+    def count(self):
+        return self._gen.count
+
+    def search(self, weights, k, allowed=None):
+        """Score with precomputed [(term, idf · qtf)] → [(-score, key)] best first.
+        `allowed` (a key set) restricts scoring to those skills."""
+        return self._gen.search(weights, k, allowed)
+
+    def retrieve(self, query, top_k=3, files=None, extensions=None):
+        """files / extensions: workspace listing — only skills scoped to it are scored."""
+        g = self._gen
+        allowed = g.scopes.candidates(files, extensions)
+        hits = g.search(query_weights(query, g.df, g.count), top_k, allowed)
+        return [(key, g.storage[key], -neg) for neg, key in hits]
+
+    def get_content(self, keys):
+        storage = self._gen.storage
+        parts = []
+        for record in (storage.get(key) for key in keys):
+            if record is None:
+                continue
+            body = record["content"]
+            if self.sanitize is not None:
+                body = self.sanitize(body)
+            parts.append(f"## {record['name']}\n{body.strip()}")
+        return "\n\n".join(parts)
+
+    def list_skills(self):
+        return "\n".join(skill_line(r) for _, r in sorted(self._gen.storage.items()))
+
+
+def skill_line(record):
+    return f"- {record['name']}: {record['description'][:100]}"
+
+
+def shard_of(key, shards):
+    """Stable partition of skill keys across shards."""
+    return zlib.crc32(key.encode()) % shards
+
+
+# ── filesystem watcher ───────────────────────────────────────────────────────
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def scan(dirs=None):
+    """{key: (path, (mtime_ns, size))} — later roots override earlier ones, as in index_all."""
+    out = {}
+    for key, path in iter_skill_files(dirs):
+        try:
+            out[key] = (path, _signature(path))
+        except OSError:
+            continue  # removed between listing and stat
+    return out
+
+
+class SkillWatcher:
+    """Polls the skill roots every `interval` s and applies add/update/remove
+    to `index` once a file has been stable for `debounce` s (editors write in
+    several steps). Stdlib-only: a stat() poll stands in for inotify."""
+
+    def __init__(self, index, dirs=None, interval=1.0, debounce=0.5, clock=time.monotonic):
+        self.index, self.dirs = index, dirs
+        self.interval, self.debounce, self.clock = interval, debounce, clock
+        self.applied = {key: sig for key, (_, sig) in scan(dirs).items()}
+        self.pending = {}   # key → (signature or None for removal, first seen)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """One scan; returns [(action, key)] applied this round."""
+        now, current = self.clock(), scan(self.dirs)
+        seen = {key: sig for key, (_, sig) in current.items()}
+        for key in set(seen) | set(self.applied):
+            sig = seen.get(key)
+            if sig == self.applied.get(key):
+                self.pending.pop(key, None)
+            elif key not in self.pending or self.pending[key][0] != sig:
+                self.pending[key] = (sig, now)
+        done = []
+        for key, (sig, since) in sorted(self.pending.items()):
+            if now - since < self.debounce:
+                continue
+            try:
+                if sig is None:
+                    self.index.remove_skill(key)
+                    done.append(("remove", key))
+                else:
+                    action = "update" if key in self.applied else "add"
+                    self.index.add_skill(key, current[key][0])
+                    done.append((action, key))
+            except OSError:
+                continue  # vanished mid-read; retried on the next scan
+            del self.pending[key]
+            if sig is None:
+                self.applied.pop(key, None)
+            else:
+                self.applied[key] = sig
+        return done
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:  # keep watching; one bad file must not stop updates
+                print(f"⚠️ skill watcher: {e}", file=sys.stderr)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="skill-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,60 @@
+"""
+🥷 Dojutsu-for-AI — Skills corpus helpers
+Locates SKILL.md files and splits them into frontmatter + body.
+Shared by the classifier, digests, index and catalog modules.
+"""
+import json
+import os
+from pathlib import Path
+
+SKILLS_DIR = Path(__file__).resolve().parents[2] / "senjutsu" / "skills"
+
+
+def skill_dirs():
+    """Skill roots: built-ins plus any extra dirs in DOJUTSU_SKILLS_PATH (os.pathsep)."""
+    extra = [Path(p) for p in os.environ.get("DOJUTSU_SKILLS_PATH", "").split(os.pathsep) if p]
+    return [SKILLS_DIR, *extra]
+
+
+def iter_skill_files(dirs=None):
+    """Yield (key, path) for every <dir>/<key>/SKILL.md, sorted by key per root."""
+    for root in dirs or skill_dirs():
+        root = Path(root)
+        if not root.is_dir():
+            continue
+        for d in sorted(root.iterdir()):
+            f = d / "SKILL.md"
+            if d.is_dir() and not d.name.startswith(("_", ".")) and f.is_file():
+                yield d.name, f
+
+
+def _value(raw):
+    raw = raw.strip()
+    if raw.startswith('"') and raw.endswith('"') and len(raw) >= 2:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw[1:-1]
+    if raw.startswith("'") and raw.endswith("'") and len(raw) >= 2:
+        return raw[1:-1].replace("''", "'")
+    return raw
+
+
+def parse_skill(text):
+    """Return (meta, body). `meta` holds the flat `key: value` frontmatter lines."""
+    if not text.startswith("---"):
+        return {}, text
+    end = text.find("\n---", 3)
+    if end < 0:
+        return {}, text
+    meta = {}
+    for line in text[3:end].splitlines():
+        key, sep, raw = line.partition(":")
+        if sep and key.strip() and not key.startswith((" ", "\t")):
+            meta[key.strip()] = _value(raw)
+    body_start = text.find("\n", end + 4)
+    return meta, text[body_start + 1:] if body_start >= 0 else ""
+
+
+def read_skill(path):
+    return Path(path).read_text(encoding="utf-8", errors="replace")
@@ -3,10 +3,17 @@
 All tests MUST pass. If ANY test fails, the deployment pipeline is halted.
 """
 import json
+import sys
 import pytest
 from unittest.mock import MagicMock, patch
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+PROVIDER_DIR = ROOT / "providers" / "dojutsu-agent"
+for _p in (PROVIDER_DIR, ROOT / "tools"):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  SECURITY TESTS
@@ -246,6 +253,1063 @@ class TestPipelineUnit:
         assert result.total_seconds > 0
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+#  ADAPTIVE DEPTH (local complexity classifier)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestComplexity:
+    def test_vocabulary_built_from_skills(self):
+        from complexity import vocabulary
+        vocab = vocabulary()
+        assert "fastapi" in vocab
+        assert "prompt" not in vocab
+
+    def test_simple_task_execution_only(self):
+        from complexity import classify
+        c = classify("Write a Python function to reverse a string")
+        assert c.depth == "execution"
+        assert "execution" in c.reason
+
+    def test_medium_task_byakugan(self):
+        from complexity import classify
+        c = classify("Build a FastAPI auth service with JWT")
+        assert c.depth == "byakugan"
+        assert "fastapi" in c.technologies
+
+    def test_production_task_full(self):
+        from complexity import classify
+        c = classify(
+            "Build a production-ready async job queue with FastAPI, Redis Streams, "
+            "dead letter queue, idempotency keys, worker heartbeat, and backpressure"
+        )
+        assert c.depth == "full"
+        assert c.score > 5
+
+    def test_stop_words_are_not_technologies(self):
+        from complexity import classify, vocabulary
+        assert classify("Explain what this regex does").technologies == ()
+        assert "this" not in vocabulary() and "use" not in vocabulary()
+
+    def test_depths_ordered(self):
+        from complexity import DEPTHS, Depth, classify
+        assert DEPTHS == ("execution", "byakugan", "full")
+        assert classify("Reverse a string").depth is Depth.EXECUTION
+        assert [Depth.of(s) for s in (0, 3, 9)] == [Depth.EXECUTION, Depth.BYAKUGAN, Depth.FULL]
+
+    def test_short_paths_use_execution_stage_prompt(self):
+        from senjutsu.core.pipeline import EXECUTION_SYSTEM
+        from prompts import execution_prompt
+        system, messages = execution_prompt("Reverse a string", "# skill", "## Byakugan\nB")
+        assert system.startswith(EXECUTION_SYSTEM.strip())
+        assert messages[0]["content"].endswith("## Byakugan\nB")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  FUSED ANALYSIS (Byakugan × Mode Sage × Jōgan in one call)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestFusedAnalysis:
+    def test_parse_json_answer(self):
+        from fused import parse_fused
+        text = '```json\n{"byakugan": "B", "Mode Sage": "M", "jōgan": "J"}\n```'
+        assert parse_fused(text) == {"byakugan": "B", "mode_sage": "M", "jougan": "J"}
+
+    def test_parse_markdown_headings(self):
+        from fused import parse_fused
+        text = "## 1. Byakugan\nB\n**Mode Sage**\nM\n### Jōgan — risks\nJ"
+        assert parse_fused(text) == {"byakugan": "B", "mode_sage": "M", "jougan": "J"}
+
+    def test_parse_fallback_keeps_text(self):
+        from fused import parse_fused
+        parts = parse_fused("free-form answer")
+        assert parts["byakugan"] == "free-form answer"
+        assert parts["mode_sage"] == "" and parts["jougan"] == ""
+
+    def test_analyze_single_call_same_shape(self):
+        from fused import FusedAnalysis
+        calls = []
+
+        def caller(system, messages, label="", max_tokens=3000):
+            calls.append(label)
+            return json.dumps({"byakugan": "B", "mode_sage": "M", "jougan": "J"}), 0.3
+
+        b, ms, jg = FusedAnalysis(caller).analyze("Build a FastAPI service")
+        assert len(calls) == 1
+        assert [d["module"] for d in (b, ms, jg)] == ["byakugan", "mode_sage", "jougan"]
+        assert ms["content"] == "M"
+        assert all("time" in d for d in (b, ms, jg))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  PROMPT PREFIX CACHING (local stand-in provider)
+# ──────────────────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def standin(monkeypatch):
+    """The bundled stand-in provider (tools/standin_provider.py) behind DOJUTSU_BASE_URL;
+    it reports a repeated system prefix as cached tokens. Each test gets a fresh
+    scheduler, so one test's calls don't use up the next one's rate-limit budget."""
+    import scheduler
+    from standin_provider import StandinServer
+    monkeypatch.setattr(scheduler, "_SCHEDULER", None)
+    with StandinServer() as server:
+        monkeypatch.setenv("DOJUTSU_BASE_URL", server.url)
+        yield server
+
+
+class TestPromptCaching:
+    HITS_A = [("fastapi", "fastapi", 0.9), ("auth_jwt", "auth-jwt", 0.4)]
+    HITS_B = [("auth_jwt", "auth-jwt", 0.8), ("fastapi", "fastapi", 0.2)]
+
+    def _skills(self, keys):
+        return "\n\n".join(f"# {k}\nskill body" for k in keys)
+
+    def test_execution_prefix_stable_across_tasks(self, standin):
+        from llm_client import build_caller
+        from prompts import execution_prompt, skill_keys
+        llm = build_caller("k", "openai", "gpt-4o")
+        prompts = [execution_prompt(task, self._skills(skill_keys(hits)), "analysis")
+                   for task, hits in (("Build a login API", self.HITS_A),
+                                      ("Add refresh tokens", self.HITS_B))]
+        for system, messages in prompts:
+            llm(system, messages, label="Execution")
+        (sys_a, msgs_a), (sys_b, msgs_b) = prompts
+        assert sys_a == sys_b and msgs_a != msgs_b
+        assert llm.usage[0]["cached_tokens"] == 0
+        assert llm.usage[1]["cached_tokens"] == len(sys_a) // 4
+
+    def test_anthropic_cache_control_hint(self, standin):
+        from llm_client import build_caller, build_request, usage_totals
+        _, _, payload = build_request("anthropic", "m", "S", [{"role": "user", "content": "u"}], 10)
+        assert payload["system"][0]["cache_control"] == {"type": "ephemeral"}
+        llm = build_caller("k", "anthropic", "claude-sonnet-4-5")
+        llm("static prefix", [{"role": "user", "content": "a"}])
+        llm("static prefix", [{"role": "user", "content": "b"}])
+        totals = usage_totals(llm, llm)
+        assert totals["cached_tokens"] == len("static prefix") // 4
+        assert llm.usage[0]["prompt_tokens"] == llm.usage[1]["prompt_tokens"]
+
+    def test_openai_gets_plain_system(self):
+        from llm_client import build_request
+        from prompts import cache_hint
+        _, _, payload = build_request("groq", "m", "S", [{"role": "user", "content": "u"}], 10)
+        assert payload["messages"][0] == {"role": "system", "content": "S"}
+        assert cache_hint("S", "openrouter", "anthropic/claude-sonnet-4-5")[0]["text"] == "S"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  PROVIDER SOCKET SERVER (framed + legacy one-shot)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestProviderServer:
+    def _dispatch(self, hang_url=""):
+        def run(task, *args, on_stage=None):
+            if on_stage:
+                on_stage("byakugan", {"module": "byakugan", "content": "B"})
+            return {"execution": f"code for {task}"}
+
+        def slow():
+            from llm_client import build_caller
+            build_caller("k", "openai", "m", timeout=30)("s", [{"role": "user", "content": "u"}])
+            return {"never": True}
+
+        def big():
+            from server import STREAM_CHUNK
+            return {"execution": "x" * (2 * STREAM_CHUNK) + "end", "n": 1}
+
+        return {"run": run, "version": lambda: {"version": "test"}, "slow": slow, "big": big}
+
+    def _with_server(self, tmp_path, scenario, dispatch):
+        import asyncio
+        from server import ProviderServer
+
+        async def main():
+            path = str(tmp_path / "dojutsu.sock")
+            srv = ProviderServer(dispatch=dispatch, workers=4)
+            server = await asyncio.start_unix_server(srv.handle, path=path)
+            try:
+                return await asyncio.wait_for(scenario(path), 10)
+            finally:
+                server.close()
+                srv.executor.shutdown(wait=False)
+
+        return asyncio.run(main())
+
+    def test_frame_roundtrip(self):
+        import asyncio
+        from server import encode_frame, read_frame
+
+        async def roundtrip():
+            reader = asyncio.StreamReader()
+            reader.feed_data(encode_frame({"id": 7, "type": "ping", "text": "é"}))
+            reader.feed_eof()
+            return await read_frame(reader), await read_frame(reader)
+
+        assert asyncio.run(roundtrip()) == ({"id": 7, "type": "ping", "text": "é"}, None)
+
+    def test_legacy_one_shot(self, tmp_path):
+        from allpath_loadtest import legacy_call
+        out = self._with_server(tmp_path, lambda p: legacy_call(p, "version"), self._dispatch())
+        assert out == {"version": "test"}
+
+    def test_multiplexed_calls_and_stages(self, tmp_path):
+        import asyncio
+        from allpath_loadtest import FramedClient
+
+        async def scenario(path):
+            c = await FramedClient.connect(path)
+            frames = await asyncio.gather(*(c.call("run", [f"t{i}"]) for i in range(20)),
+                                          c.call("version"), c.call("nope"))
+            await c.close()
+            return frames, c.stages
+
+        frames, stages = self._with_server(tmp_path, scenario, self._dispatch())
+        assert [f["data"]["execution"] for f in frames[:20]] == [f"code for t{i}" for i in range(20)]
+        assert frames[20]["data"] == {"version": "test"}
+        assert frames[21]["type"] == "error"
+        assert all(v == ["byakugan"] for v in stages.values()) and len(stages) == 20
+
+    def test_result_streamed_in_chunks(self, tmp_path):
+        from allpath_loadtest import FramedClient
+        from server import STREAM_CHUNK
+
+        async def scenario(path):
+            c = await FramedClient.connect(path)
+            frame = await c.call("big")
+            await c.close()
+            return frame
+
+        frame = self._with_server(tmp_path, scenario, self._dispatch())
+        assert frame["data"] == {"execution": "x" * (2 * STREAM_CHUNK) + "end", "n": 1}
+
+    def test_bad_frames_get_error_frames(self, tmp_path, monkeypatch):
+        import asyncio
+        import server
+        from server import HEADER, PREFACE, encode_frame, read_frame
+        monkeypatch.setattr(server, "MAX_FRAME", 1024)
+
+        async def scenario(path):
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(PREFACE + HEADER.pack(8) + b"not json" + encode_frame([1, 2])
+                         + encode_frame({"id": 1, "type": "call", "function": "version",
+                                         "args": "x"})
+                         + encode_frame({"id": 2, "type": "call", "function": "version"})
+                         + HEADER.pack(4096))
+            frames = [await read_frame(reader) for _ in range(5)]
+            eof = await read_frame(reader)
+            writer.close()
+            return frames, eof
+
+        frames, eof = self._with_server(tmp_path, scenario, self._dispatch())
+        errors = [f for f in frames if f["type"] == "error"]
+        assert [f["id"] for f in errors] == [None, None, 1, None]
+        assert "bad frame" in errors[0]["error"] and "too large" in errors[3]["error"]
+        assert {"id": 2, "type": "result", "data": {"version": "test"}} in frames
+        assert eof is None
+
+    def test_cancel_aborts_inflight_llm_call(self, tmp_path, monkeypatch):
+        import asyncio
+        import socket as _socket
+        from server import PREFACE, encode_frame, read_frame
+
+        hang = _socket.socket()
+        hang.bind(("127.0.0.1", 0))
+        hang.listen(8)
+        monkeypatch.setenv("DOJUTSU_BASE_URL", f"http://127.0.0.1:{hang.getsockname()[1]}/v1")
+
+        async def scenario(path):
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(PREFACE + encode_frame({"id": 1, "type": "call", "function": "slow"}))
+            await asyncio.sleep(0.3)
+            writer.write(encode_frame({"id": 1, "type": "cancel"}))
+            frame = await read_frame(reader)
+            writer.close()
+            return frame
+
+        try:
+            frame = self._with_server(tmp_path, scenario, self._dispatch())
+        finally:
+            hang.close()
+        assert frame == {"id": 1, "type": "cancelled"}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  ADMISSION CONTROL / RATE-LIMIT SCHEDULER
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TestScheduler:
+    def _drain_order(self, requests):
+        """Exhaust a 1-request lane, queue `requests` (stage, traffic, tenant), return admit order."""
+        import threading
+        import time
+        from scheduler import Scheduler, scheduling
+
+        sched = Scheduler(limits={"openai": (120, 10 ** 6)})
+        lane = sched._lane("openai", "k")
+        lane.requests.capacity = lane.requests.level = 1
+        sched.acquire("openai", "k", 1)
+        order, threads = [], []
+
+        def worker(name, stage, traffic, tenant):
+            with scheduling(tenant, traffic):
+                sched.acquire("openai", "k", 1, stage=stage)
+            order.append(name)
+
+        for name, stage, traffic, tenant in requests:
+            t = threading.Thread(target=worker, args=(name, stage, traffic, tenant))
+            t.start()
+            threads.append(t)
+            time.sleep(0.02)
+        for t in threads:
+            t.join(10)
+        return order
+
+    def test_token_bucket_delay(self):
+        from scheduler import TokenBucket
+        now = [0.0]
+        b = TokenBucket(rate=10, capacity=20, clock=lambda: now[0])
+        b.take(20)
+        assert b.delay(5) == pytest.approx(0.5)
+        now[0] = 0.5
+        assert b.delay(5) == 0
+
+    def test_priority_execution_and_interactive_first(self):
+        order = self._drain_order([
+            ("batch-exec", "execution", "batch", "a"),
+            ("inter-analysis", "analysis", "interactive", "a"),
+            ("inter-exec", "execution", "interactive", "a"),
+        ])
+        assert order == ["inter-exec", "inter-analysis", "batch-exec"]
+
+    def test_fair_across_tenants(self):
+        order = self._drain_order(
+            [(f"a{i}", "execution", "interactive", "a") for i in range(3)]
+            + [("b0", "execution", "interactive", "b")])
+        assert order.index("b0") <= 1
+
+    def test_adapts_from_headers(self):
+        from scheduler import Scheduler, parse_reset
+        sched = Scheduler()
+        ticket = sched.acquire("groq", "k", 100)
+        sched.observe(ticket, 200, {"X-RateLimit-Limit-Tokens": "6000",
+                                    "x-ratelimit-remaining-tokens": "0",
+                                    "x-ratelimit-reset-tokens": "7.5s"})
+        assert ticket.lane.tokens.capacity == 6000
+        assert ticket.lane.tokens.delay(1) > 7
+        assert parse_reset("6m0s") == 360 and parse_reset("250ms") == 0.25
+
+    def test_header_windows_per_provider(self):
+        from scheduler import Scheduler
+        sched = Scheduler()
+        headers = {"x-ratelimit-limit-requests": "14400", "x-ratelimit-remaining-requests": "9"}
+        groq, openai = sched.acquire("groq", "k", 10), sched.acquire("openai", "k", 10)
+        sched.observe(groq, 200, headers)
+        sched.observe(openai, 200, headers)
+        assert groq.lane.requests.capacity == 30  # per day: the per-minute default stays
+        assert groq.lane.requests.level <= 9
+        assert openai.lane.requests.capacity == 14400
+
+    def test_tenants_dropped_and_aborts_not_charged(self):
+        from scheduler import Scheduler, scheduling
+        sched = Scheduler(limits={"openai": (120, 1000)})
+        lane = sched._lane("openai", "k")
+        with scheduling("a"):
+            ticket = sched.acquire("openai", "k", 1000)
+            sched.settle(ticket, 0)
+
+            def abort():
+                raise TimeoutError
+
+            with pytest.raises(TimeoutError):
+                sched.acquire("openai", "k", 500, abort=abort)
+        assert lane.finish == {} and lane.queued == {} and lane.heap == []
+
+    def test_queue_wait_in_usage(self, standin):
+        from llm_client import build_caller, queue_waits
+        llm = build_caller("k2", "openai", "gpt-4o")
+        llm("s", [{"role": "user", "content": "u"}], label="Byakugan")
+        assert "queue_wait" in llm.usage[0]
+        assert set(queue_waits(llm)) == {"Byakugan"}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  SKILL DIGESTS (precomputed extractive budgets)
+# ──────────────────────────────────────────────────────────────────────────────
+
+SAMPLE_SKILL = """---
+name: sample-queue
+description: "Apply when building Redis job queues with retries and dead letter queues."
+---
+
+# Sample Queue
+
+Adhere to these guidelines for clean code. Redis queues need retries and a dead letter queue.
+
+## Retries
+Use exponential backoff for job retries.
+```python
+def retry(job):
+    return backoff(job)
+```
+
+## Dead letter
+Move poisoned jobs to the dead letter queue after max retries.
+```python
+def retry(job):
+    return backoff(job)
+```
+""" + "\n".join(f"Filler paragraph {i} about unrelated styling choices." for i in range(200))
+
+
+class TestSkillDigests:
+    def test_split_units_kinds(self):
+        from digests import split_units
+        kinds = [u["kind"] for u in split_units("# T\nA b. C d.\n\n- item\n\n```py\nx\n```\n")]
+        assert kinds == ["heading", "text", "text", "item", "code"]
+        lead = split_units("BAD:\n```py\nx\n```\n")
+        assert [u["kind"] for u in lead] == ["code"] and lead[0]["start"] == 0
+
+    def test_levels_respect_budgets_and_dedupe(self):
+        from digests import build_entry, tokens_of, BUDGETS
+        entry = build_entry(SAMPLE_SKILL)
+        for b in BUDGETS:
+            spans = entry["levels"][str(b)]
+            if spans is None:
+                assert entry["tokens"] <= b
+                continue
+            text = "\n".join(SAMPLE_SKILL[s:e] for s, e in spans)
+            assert tokens_of(text) <= b + len(spans)
+        small = "\n".join(SAMPLE_SKILL[s:e] for s, e in entry["levels"]["256"])
+        assert "dead letter" in small.lower()
+        assert small.count("return backoff(job)") <= 1
+
+    def test_runtime_budget_and_stale_fallback(self, tmp_path, monkeypatch):
+        import digests
+        skill = tmp_path / "sample-queue"
+        skill.mkdir()
+        (skill / "SKILL.md").write_text(SAMPLE_SKILL)
+        digests.build(tmp_path)
+        monkeypatch.setenv("DOJUTSU_SKILLS_PATH", str(tmp_path))
+        out = digests.get_content(["sample-queue"], 256)
+        assert out.startswith("## sample-queue") and digests.tokens_of(out) < 300
+        assert len(digests.get_content(["sample-queue"], 4096)) > len(out)
+        assert digests.get_content(["local::sample-queue"], 256) == out   # SkillsRAG keys
+        (skill / "SKILL.md").write_text(SAMPLE_SKILL + "\nedited")
+        rag = MagicMock()
+        rag.get_content.return_value = "FULL"
+        assert digests.get_content(["sample-queue"], 256, rag=rag) == "FULL"
+
+    def test_skills_rag_keys_have_digests(self, skills_rag):
+        import digests
+        hits = skills_rag.retrieve("github actions ci workflow", top_k=6)
+        keys = [k for k, d, _ in hits if d["name"] == "github-actions"]
+        assert keys and "::" in keys[0] and digests.digest(keys[0], 1024) is not None
+
+
+@pytest.fixture(scope="module")
+def single():
+    from skill_index import SkillIndex
+    index = SkillIndex()
+    index.index_all(verbose=False)
+    return index
+
+
+class TestSkillIndex:
+    QUERIES = ["fastapi async endpoint", "react hooks state", "rust ownership borrow", "zzqx"]
+
+    def test_retrieve_and_content(self, single):
+        assert single.count > 100
+        hits = single.retrieve("python fastapi backend", top_k=3)
+        assert len(hits) == 3 and hits[0][2] >= hits[1][2] >= hits[2][2] > 0
+        assert any("fastapi" in key for key, _, _ in hits)
+        assert single.get_content([hits[0][0]]).startswith(f"## {hits[0][1]['name']}")
+        assert single.retrieve("zzqx") == []
+
+    def test_sharded_matches_single(self, single):
+        from sharded_index import ShardedSkillIndex
+        with ShardedSkillIndex(shards=3) as sharded:
+            assert {type(p).__name__ for p in sharded._procs} == {"SpawnProcess"}
+            assert sharded.index_all(verbose=False) == single.count
+            assert sharded.df == single.df
+            for q in self.QUERIES:
+                assert sharded.retrieve(q, top_k=5) == single.retrieve(q, top_k=5)
+            keys = [k for k, _, _ in single.retrieve(self.QUERIES[0], top_k=3)]
+            assert sharded.get_content(keys) == single.get_content(keys)
+            assert sharded.list_skills() == single.list_skills()
+
+    def test_sharded_parallel_build(self, single):
+        import subprocess
+        from sharded_index import ShardedSkillIndex
+        with ShardedSkillIndex(shards=2, workers=2) as sharded:
+            assert not any(p.daemon for p in sharded._procs)
+            assert sharded.index_all(verbose=False) == single.count and sharded.df == single.df
+            q = self.QUERIES[0]
+            assert sharded.retrieve(q, top_k=5) == single.retrieve(q, top_k=5)
+        # left open, the non-daemonic shards are still stopped at interpreter exit
+        script = ("from sharded_index import ShardedSkillIndex\n"
+                  "ShardedSkillIndex(shards=2, workers=2).count")
+        subprocess.run([sys.executable, "-c", script], cwd=PROVIDER_DIR, check=True, timeout=60)
+
+    @staticmethod
+    def _skill(root, key, body):
+        (root / key).mkdir(exist_ok=True)
+        (root / key / "SKILL.md").write_text(f"---\nname: {key}\ndescription: {body}\n---\n{body}\n")
+
+    def test_live_updates_match_rebuild(self, tmp_path):
+        from skill_index import SkillIndex
+        from sharded_index import ShardedSkillIndex
+        for key, body in [("alpha", "redis streams queue"), ("beta", "vue components"),
+                          ("gamma", "redis cache ttl")]:
+            self._skill(tmp_path, key, body)
+        live = SkillIndex(dirs=[tmp_path])
+        live.index_all(verbose=False)
+        with ShardedSkillIndex(shards=2, dirs=[tmp_path]) as sharded:
+            sharded.index_all(verbose=False)
+            self._skill(tmp_path, "delta", "solidity contracts redis")
+            self._skill(tmp_path, "beta", "svelte stores redis")
+            for index in (live, sharded):
+                index.add_skill("delta", tmp_path / "delta" / "SKILL.md")
+                index.update_skill("beta")
+                assert index.remove_skill("alpha") and not index.remove_skill("alpha")
+            (tmp_path / "alpha" / "SKILL.md").unlink()
+            rebuilt = SkillIndex(dirs=[tmp_path])
+            rebuilt.index_all(verbose=False)
+            assert live.df == rebuilt.df == sharded.df and live.count == sharded.count == 3
+            assert live.retrieve("redis", 5) == rebuilt.retrieve("redis", 5) \
+                == sharded.retrieve("redis", 5)
+
+    def test_sharded_count_termless_skill(self, tmp_path):
+        from sharded_index import ShardedSkillIndex
+        self._skill(tmp_path, "alpha", "redis streams queue")
+        (tmp_path / "empty").mkdir()
+        (tmp_path / "empty" / "SKILL.md").write_text('---\nname: "!"\n---\n!!\n')
+        with ShardedSkillIndex(shards=2, dirs=[tmp_path]) as sharded:
+            assert sharded.index_all(verbose=False) == 2
+            sharded.add_skill("empty", tmp_path / "empty" / "SKILL.md")
+            sharded.update_skill("empty")
+            assert sharded.count == 2
+            assert sharded.remove_skill("empty") and sharded.count == 1
+
+    def test_watcher_debounces_changes(self, tmp_path):
+        from skill_index import SkillIndex, SkillWatcher
+        self._skill(tmp_path, "alpha", "redis streams queue")
+        index = SkillIndex(dirs=[tmp_path])
+        index.index_all(verbose=False)
+        now = [0.0]
+        watcher = SkillWatcher(index, dirs=[tmp_path], debounce=1.0, clock=lambda: now[0])
+        self._skill(tmp_path, "beta", "kafka consumer groups")
+        assert watcher.poll() == []            # seen, not yet stable
+        now[0] = 2.0
+        assert watcher.poll() == [("add", "beta")]
+        assert index.retrieve("kafka")[0][0] == "beta"
+        import shutil
+        shutil.rmtree(tmp_path / "alpha")
+        watcher.poll()
+        now[0] = 4.0
+        assert watcher.poll() == [("remove", "alpha")] and index.count == 1
+
+    def test_readers_consistent_during_reindex(self, tmp_path):
+        import threading
+        from skill_index import SkillIndex
+        topics = ["redis cache", "python async", "react hooks", "kafka stream", "rust borrow"]
+        for i in range(40):
+            self._skill(tmp_path, f"s{i:02d}", f"{topics[i % 5]} notes {i}")
+        index = SkillIndex(dirs=[tmp_path])
+        index.index_all(verbose=False)
+        toggle = tmp_path / "zeta" / "SKILL.md"
+        self._skill(tmp_path, "zeta", "redis cache eviction python")
+        toggle.rename(tmp_path / "zeta.md")
+        queries = ["redis cache", "python eviction", "react hooks"]
+        def ranked(q):
+            return tuple((k, d["name"], score) for k, d, score in index.retrieve(q, 5))
+
+        without = {q: ranked(q) for q in queries}
+        index.add_skill("zeta", tmp_path / "zeta.md")
+        with_zeta = {q: ranked(q) for q in queries}
+        assert without != with_zeta
+
+        def read(stop, seen, errors):
+            last = -1
+            while not stop.is_set():
+                g = index.snapshot()
+                if g.number < last:
+                    errors.append(f"generation went back {last} → {g.number}")
+                last = g.number
+                has_zeta = "zeta" in g.storage
+                if (has_zeta != ("zeta" in g.postings.get("eviction", ()))
+                        or has_zeta != ("zeta" in g.vectors) or len(g.vectors) != g.count):
+                    errors.append(f"torn generation {g.number}")
+                for q in queries:
+                    seen.add((q, ranked(q)))
+
+        stop, seen, errors = threading.Event(), set(), []
+        pool = [threading.Thread(target=read, args=(stop, seen, errors)) for _ in range(4)]
+        for t in pool:
+            t.start()
+        for _ in range(10):
+            index.index_all(verbose=False)
+            index.add_skill("zeta", tmp_path / "zeta.md")
+            index.remove_skill("zeta")
+        stop.set()
+        for t in pool:
+            t.join()
+        allowed = {(q, r) for q in queries for r in (without[q], with_zeta[q])}
+        assert not errors and seen <= allowed
+
+    def test_update_cost_flat_in_corpus_size(self):
+        import time as _time
+        from skill_index import Generation
+
+        def update_seconds(n):
+            g = Generation()
+            for i in range(n):
+                terms = {f"t{(i * 7 + j) % 5000}": 0.1 for j in range(30)}
+                g.insert(f"k{i}", {"name": f"k{i}", "description": ""}, dict(terms, common=0.1))
+            vector = {"common": 0.5, "t1": 0.5, "fresh": 0.5}
+            best = float("inf")
+            for _ in range(20):
+                t0 = _time.perf_counter()
+                g.fork(vector).insert("new", {"name": "new", "description": ""}, vector)
+                best = min(best, _time.perf_counter() - t0)
+            return best
+
+        small, large = update_seconds(200), update_seconds(10000)
+        assert large < 3 * small   # a full copy would be ~50x: only touched paths are new
+
+    def test_parallel_build_identical(self, single, tmp_path):
+        from skill_index import SkillIndex
+        parallel = SkillIndex(workers=2)
+        assert parallel.index_all(verbose=False) == single.count
+        assert parallel.snapshot().fingerprint() == single.snapshot().fingerprint()
+        assert list(parallel.postings["fastapi"]) == list(single.postings["fastapi"])
+        self._skill(tmp_path, "alpha", "redis streams queue")
+        other = SkillIndex(dirs=[tmp_path], workers=2)
+        other.index_all(verbose=False)                  # below one chunk → serial path
+        assert other.retrieve("redis")[0][0] == "alpha"
+
+    def test_repeated_keys_build_serially(self, tmp_path, capsys):
+        from skill_index import BUILD_CHUNK, SkillIndex
+        self._skill(tmp_path, "alpha", "redis streams queue")
+        self._skill(tmp_path, "beta", "kafka consumer queue")
+        alpha, beta = tmp_path / "alpha" / "SKILL.md", tmp_path / "beta" / "SKILL.md"
+        items = [(f"s{i}", alpha) for i in range(BUILD_CHUNK)] + [("s0", beta)]
+        index = SkillIndex(workers=2)
+        assert index.rebuild(items) == BUILD_CHUNK
+        assert "repeated across roots" in capsys.readouterr().err
+        assert index.storage["s0"]["path"] == str(beta)   # the later root wins
+
+    def test_old_generation_reclaimed(self, tmp_path):
+        import weakref
+        from skill_index import SkillIndex
+        self._skill(tmp_path, "alpha", "redis streams queue")
+        index = SkillIndex(dirs=[tmp_path])
+        index.index_all(verbose=False)
+        held = index.snapshot()
+        ref = weakref.ref(held)
+        self._skill(tmp_path, "beta", "kafka consumer queue")
+        index.add_skill("beta", tmp_path / "beta" / "SKILL.md")
+        assert index.snapshot().number == held.number + 1
+        assert held.count == 1 and index.count == 2       # the held view is unchanged
+        assert "kafka" not in held.postings and "beta" not in held.postings["queue"]
+        assert held.postings["redis"] is index.postings["redis"]   # untouched → shared
+        del held
+        assert ref() is None
+
+
+def _attach_and_query(name, query, out):
+    from shm_index import attach
+    with attach(name) as index:
+        out.put(index.retrieve(query, top_k=5))
+
+
+class TestSharedMemoryIndex:
+    def test_attached_index_matches(self, single):
+        from shm_index import publish, attach
+        with publish(single) as owner, attach(owner.name) as index:
+            assert index.count == single.count
+            for q in TestSkillIndex.QUERIES:
+                assert index.retrieve(q, top_k=5) == single.retrieve(q, top_k=5)
+            assert index.retrieve("react", 3, extensions=["py"]) == \
+                single.retrieve("react", 3, extensions=["py"])
+            keys = [k for k, _, _ in single.retrieve("fastapi", top_k=3)]
+            assert index.get_content(keys) == single.get_content(keys)
+            assert index.list_skills() == single.list_skills()
+            assert index.storage["fastapi"]["name"] == single.storage["fastapi"]["name"]
+
+    def test_workers_attach_by_name(self, single):
+        import multiprocessing as mp
+        from shm_index import publish, attach
+        ctx = mp.get_context("spawn")
+        with publish(single) as owner:
+            out = ctx.Queue()
+            for _ in range(2):  # a worker exiting must not unlink the segment
+                p = ctx.Process(target=_attach_and_query, args=(owner.name, "rust borrow", out))
+                p.start()
+                assert out.get(timeout=60) == single.retrieve("rust borrow", 5)
+                p.join()
+                assert p.exitcode == 0
+            with attach(owner.name) as again:
+                assert again.retrieve("rust borrow", 5) == single.retrieve("rust borrow", 5)
+
+
+class TestScopes:
+    def test_parse_scope(self):
+        from scopes import parse_scope, expand_braces
+        assert expand_braces("**/*.{ts,tsx}") == ["**/*.ts", "**/*.tsx"]
+        assert expand_braces("/app/**/*.(ts|tsx)") == ["/app/**/*.ts", "/app/**/*.tsx"]
+        desc = "[Applies to: **/Dockerfile,**/docker-compose*.{yml,yaml}] Docker rules."
+        assert parse_scope({"description": desc}) == [
+            "**/Dockerfile", "**/docker-compose*.yaml", "**/docker-compose*.yml"]
+        assert parse_scope({"description": "[Applies to: **/*] anything"}) is None
+        assert parse_scope({"globs": "*.js, *.py", "description": "x"}) == ["*.js", "*.py"]
+        assert parse_scope({"description": "no scope"}) is None
+
+    def test_candidates(self):
+        from scopes import ScopeIndex
+        idx = ScopeIndex()
+        idx.add("zod", {"description": "[Applies to: **/*.{ts,tsx}] zod"})
+        idx.add("sol", {"description": "[Applies to: **/*.sol] solidity"})
+        idx.add("docker", {"globs": "**/Dockerfile"})
+        idx.add("astro", {"globs": "src/components/**/*.astro"})
+        idx.add("general", {"description": "anything"})
+        assert idx.candidates() is None
+        assert idx.candidates(files=["web/src/app.tsx"]) == {"zod", "general"}
+        assert idx.candidates(files=["Dockerfile", "src/components/a/Card.astro"]) == \
+            {"docker", "astro", "general"}
+        assert idx.candidates(extensions=[".sol"]) == {"sol", "general", "docker"}
+        idx.remove("sol")
+        assert "sol" not in idx.candidates(extensions=["sol"])
+
+    def test_retrieve_prefilters_corpus(self, single):
+        from scopes import ScopedRAG
+        allowed = single.scopes.candidates(files=["api/main.py", "api/models.py"])
+        assert "solidity-best-practices" not in allowed and "vue" not in allowed
+        assert len(allowed) < single.count
+        q = "smart contract components best practices"
+        hits = single.retrieve(q, top_k=5, extensions=["py"])
+        assert hits and all(k in single.scopes.candidates(extensions=["py"]) for k, _, _ in hits)
+        assert "solidity-best-practices" in [k for k, _, _ in single.retrieve(q, top_k=5)]
+        assert "solidity-best-practices" not in [k for k, _, _ in hits]
+        assert hits == ScopedRAG(single, extensions=["py"]).retrieve(q, top_k=5)
+        legacy = MagicMock()
+        legacy.retrieve.return_value = [("vue", "vue", 2.0), ("fastapi", "fastapi", 1.0)]
+        legacy.supports_scope = False
+        scoped = ScopedRAG(legacy, files=["main.py"], scopes=single.scopes)
+        assert scoped.retrieve(q, top_k=3) == [("fastapi", "fastapi", 1.0)]
+
+
+class TestProfiling:
+    def test_disabled_is_passthrough(self):
+        import profiling
+        def fn():
+            pass
+        caller = MagicMock()
+        if not profiling.PROFILE_DIR:
+            assert profiling.profiled(fn) is fn
+        assert profiling.wrap_caller(caller) is caller
+        assert profiling.stage("x") is profiling.memory("y") is profiling._NULL
+
+    def test_session_excludes_llm_time(self, tmp_path):
+        import time as _time
+        import profiling
+
+        def slow_llm(system, messages, label="", max_tokens=3000):
+            _time.sleep(0.2)
+            return "ok", 0.2
+
+        with profiling.session("run", tmp_path) as s:
+            llm = profiling.wrap_caller(slow_llm)
+            with profiling.stage("prompt"), profiling.memory("get_content"):
+                blob = [bytearray(100) for _ in range(10000)]
+            with profiling.stage("execution"):
+                assert llm("s", [], label="Execution") == ("ok", 0.2)
+        summary = json.loads((s.dir / "summary.json").read_text())
+        assert summary["stages"]["execution"]["llm_s"] >= 0.2
+        assert summary["stages"]["execution"]["wall_s"] < 0.1
+        assert summary["memory"]["get_content"]["net_bytes"] > 1_000_000 and blob
+        for name in ("run.pstats", "prompt.pstats", "execution.txt", "alloc-get_content.txt"):
+            assert (s.dir / name).is_file()
+        assert profiling._current.get() is None
+
+    def test_one_session_per_process(self, tmp_path):
+        import threading
+        import profiling
+        seen = []
+
+        def other():
+            with profiling.session("other", tmp_path) as o:
+                seen.append(o)
+
+        with profiling.session("run", tmp_path) as s:
+            t = threading.Thread(target=other)
+            t.start()
+            t.join()
+        assert s is not None and seen == [None]
+        with profiling.session("again", tmp_path) as again:
+            assert again is not None
+
+    def test_cli_profiles_serialization(self, tmp_path):
+        import os
+        import subprocess
+        env = dict(os.environ, DOJUTSU_PROFILE=str(tmp_path))
+        subprocess.run([sys.executable, str(PROVIDER_DIR / "main.py"), "skills_list"],
+                       env=env, cwd=ROOT, check=True, capture_output=True)
+        (run,) = tmp_path.iterdir()
+        stages = json.loads((run / "summary.json").read_text())["stages"]
+        assert {"skills_list", "serialize"} <= set(stages)
+
+
+class TestCatalog:
+    RECORDS = [
+        ("fastapi", {"name": "fastapi", "description": "FastAPI services", "source": "cursor_mdc",
+                     "globs": "**/*.py"}),
+        ("fastapi-cr", {"name": "FastAPI-rules", "description": "Async endpoints",
+                        "source": "cursorrules"}),
+        ("react", {"name": "react", "description": "Hooks [Applies to: **/*.{tsx,jsx}]",
+                   "source": "cursor_mdc"}),
+        ("redis", {"name": "redis", "description": "Caching with FastAPI"}),
+    ]
+
+    def test_prefix_substring_filters(self):
+        from catalog import Catalog
+        c = Catalog(self.RECORDS)
+        keys = lambda out: [i["key"] for i in out["items"]]
+        assert keys(c.query(prefix="FAST")) == ["fastapi", "fastapi-cr"]
+        assert keys(c.query(prefix="fastapi-")) == ["fastapi-cr"]
+        assert c.query(prefix="fz")["total"] == 0
+        assert keys(c.query(contains="fastapi")) == ["fastapi", "fastapi-cr", "redis"]
+        assert keys(c.query(contains="fastapi", source="cursor_mdc,none")) == ["fastapi", "redis"]
+        assert keys(c.query(scope="tsx")) == ["react"]
+        assert keys(c.query(files="app.py")) == ["fastapi", "fastapi-cr", "redis"]
+        assert c.facets["source"] == {"cursor_mdc": 2, "cursorrules": 1, "none": 1}
+        assert c.query(prefix="fast")["facets"]["scope"] == {"any": 1, "py": 1}
+
+    def test_cursor_pagination(self):
+        from catalog import Catalog
+        c = Catalog(self.RECORDS)
+        first = c.query(limit=3)
+        assert first["total"] == 4 and first["next_cursor"]
+        rest = c.query(limit=3, cursor=first["next_cursor"])
+        assert [i["key"] for i in first["items"] + rest["items"]] == c.keys
+        assert rest["next_cursor"] is None
+        with pytest.raises(ValueError):
+            c.query(cursor="%%%")
+
+    def test_corpus_prefix_matches_scan(self):
+        from catalog import corpus_catalog
+        c = corpus_catalog()
+        assert len(c) > 100 and sum(c.facets["source"].values()) == len(c)
+        for prefix in ("p", "py", "react", "next", "zz"):
+            expected = [k for k, n in zip(c.keys, c.names) if n.lower().startswith(prefix)]
+            assert [i["key"] for i in c.query(prefix=prefix, limit=500)["items"]] == expected
+
+
+class TestSession:
+    ANALYSIS = {"byakugan": "Users log in with a password.\n\nTokens are JWT. " + "x" * 2000,
+                "mode_sage": "Layered FastAPI app.", "jougan": "Token expiry."}
+
+    @staticmethod
+    def _llm(calls, analysis):
+        def caller(system, messages, label="", max_tokens=3000):
+            calls.append((label, system, messages[0]["content"]))
+            if label == "Execution":
+                return f"code v{sum(c[0] == 'Execution' for c in calls)}", 0.1
+            return json.dumps(analysis), 0.1
+        return caller
+
+    def test_followup_is_incremental(self, single):
+        from fused import DELTA_SYSTEM
+        from session import Session
+        calls = []
+        s = Session(self._llm(calls, self.ANALYSIS), self._llm(calls, self.ANALYSIS), single)
+        first = s.start("Build a FastAPI login service with JWT")
+        assert first["calls"] == 2 and "saved" not in first
+        s.fast = self._llm(calls, {"byakugan": "", "mode_sage": "Add a limiter layer.",
+                                   "jougan": "Shared counters across workers."})
+        out = s.followup("now add rate limiting with redis")
+        (_, system, delta_in), (_, _, exec_in) = calls[2:]
+        assert system == DELTA_SYSTEM and "x" * 700 not in delta_in
+        assert "Users log in with a password." in delta_in and "rate limiting" in delta_in
+        assert "## Previous execution\ncode v1" in exec_in and out["execution"] == "code v2"
+        assert out["new_skills"] and not set(out["new_skills"]) & set(first["new_skills"])
+        assert out["cold"]["calls"] == 5 and out["saved"]["calls"] == 3
+        from senjutsu.core.pipeline import SKILL_SELECTOR_SYSTEM
+        from session import est_tokens
+        catalog = est_tokens(SKILL_SELECTOR_SYSTEM.format(skills_list=single.list_skills()))
+        assert out["cold"]["tokens"] > catalog
+        assert out["saved"]["tokens"] > 0
+        assert "Add a limiter layer." in s.stages["mode_sage"]
+        assert s.stages["byakugan"] == self.ANALYSIS["byakugan"]
+
+    def test_skill_names_from_skills_rag(self, skills_rag):
+        from session import Session
+        llm = self._llm([], self.ANALYSIS)
+        s = Session(llm, llm, skills_rag)
+        s.start("Build a FastAPI login service with JWT")
+        assert s.skill_names and all(isinstance(n, str) for n in s.skill_names)
+        assert set(s.skill_names) <= {d["name"] for d in skills_rag.storage.values()}
+
+    def test_save_and_load(self, single, tmp_path, monkeypatch):
+        import session
+        from session import Session
+        monkeypatch.setattr(session, "SESSION_DIR", tmp_path)
+        calls = []
+        llm = self._llm(calls, self.ANALYSIS)
+        s = Session(llm, llm, single)
+        s.start("Build a FastAPI login service with JWT")
+        s.followup("add refresh tokens")
+        path = s.save()
+        assert path == tmp_path / f"{s.id}.json"
+        loaded = Session.load(s.id, llm, llm, single)
+        assert loaded.to_dict() == s.to_dict()
+        assert loaded.followup("switch to Postgres")["turn"] == 3
+        assert loaded.save() == path and session.read(s.id)["changes"][-1] == "switch to Postgres"
+        for ref in ("0123456789ab", str(path), "../" + s.id, s.id.upper()):
+            with pytest.raises(ValueError):
+                Session.load(ref, llm, llm, single)
+
+
+class TestStandinProvider:
+    @staticmethod
+    def _stream(url, path, body):
+        import http.client
+        import urllib.parse
+        u = urllib.parse.urlsplit(url + path)
+        conn = http.client.HTTPConnection(u.hostname, u.port, timeout=10)
+        conn.request("POST", u.path, body=json.dumps(dict(body, stream=True)),
+                     headers={"Content-Type": "application/json"})
+        lines = conn.getresponse().read().decode().splitlines()
+        conn.close()
+        return [json.loads(l[6:]) for l in lines if l.startswith("data: ") and l != "data: [DONE]"]
+
+    def test_callers_and_streaming(self, monkeypatch):
+        from standin_provider import StandinServer
+        from llm_client import build_caller
+        with StandinServer(tokens=12) as server:
+            monkeypatch.setenv("DOJUTSU_BASE_URL", server.url)
+            for provider in ("groq", "openai", "anthropic"):
+                llm = build_caller("k", provider, "m")
+                system = f"{provider} system prompt " * 20
+                text, _ = llm(system, [{"role": "user", "content": "hi"}])
+                llm(system, [{"role": "user", "content": "again"}])
+                assert len(text.split()) == 12
+                assert llm.usage[0]["cached_tokens"] == 0 < llm.usage[1]["cached_tokens"]
+            body = {"model": "m", "max_tokens": 5, "messages": [{"role": "user", "content": "x"}]}
+            chunks = self._stream(server.url, "/chat/completions", body)
+            streamed = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+            events = self._stream(server.url, "/messages", body)
+            anthropic = "".join(e["delta"]["text"] for e in events
+                                if e["type"] == "content_block_delta")
+            assert streamed == anthropic and len(streamed.split()) == 5
+            assert events[-1]["type"] == "message_stop" and server.stats["streamed"] == 2
+
+    def test_injected_429_and_determinism(self, monkeypatch):
+        from standin_provider import StandinServer
+        from llm_client import build_caller, LLMError, MAX_429_RETRIES
+        with StandinServer(rate429=1.0, retry_after=0.01) as server:
+            monkeypatch.setenv("DOJUTSU_BASE_URL", server.url)
+            with pytest.raises(LLMError, match="429"):
+                build_caller("k429", "openai", "m")("s", [{"role": "user", "content": "x"}])
+            assert server.stats["429"] == MAX_429_RETRIES + 1
+        body = {"model": "m", "messages": [{"role": "user", "content": "x"}]}
+        draws = []
+        for _ in range(2):
+            server = StandinServer(latency="lognormal:-3,0.5", errors=0.3, seed=7)
+            draws.append([server.answer("/v1/chat/completions", body, {})[::3] for _ in range(5)])
+            server.httpd.server_close()
+        assert draws[0] == draws[1]
+
+    def test_record_and_replay(self, tmp_path, monkeypatch):
+        from standin_provider import StandinServer
+        from llm_client import build_caller, LLMError
+        cassette = tmp_path / "cassette.jsonl"
+        msgs = [{"role": "user", "content": "Build a queue"}]
+        with StandinServer(tokens=7) as upstream:
+            with StandinServer(record=cassette, upstream=upstream.url) as recorder:
+                monkeypatch.setenv("DOJUTSU_BASE_URL", recorder.url)
+                recorded, _ = build_caller("k", "groq", "m")("sys", msgs)
+            assert recorder.stats["recorded"] == 1 and upstream.stats["ok"] == 1
+        assert "Bearer" not in cassette.read_text()
+        with StandinServer(replay=cassette, tokens=99) as replay:
+            monkeypatch.setenv("DOJUTSU_BASE_URL", replay.url)
+            llm = build_caller("k", "groq", "m")
+            assert llm("sys", msgs)[0] == recorded
+            with pytest.raises(LLMError, match="404"):
+                llm("sys", [{"role": "user", "content": "unseen"}])
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  PROVIDER ENTRY POINT (main.run on the default SkillsRAG, stand-in provider)
+# ──────────────────────────────────────────────────────────────────────────────
+
+@pytest.fixture(scope="module")
+def skills_rag():
+    from senjutsu.core.rag_booster import SkillsRAG
+    rag = SkillsRAG()
+    rag.index_all(verbose=False)
+    return rag
+
+
+class TestRun:
+    TASK = "Build a FastAPI auth service with JWT"
+
+    def test_skills_used_are_names_at_every_depth(self, standin):
+        import main
+        for depth, fused in (("execution", "false"), ("byakugan", "false"), ("full", "false"),
+                             ("full", "true")):
+            out = main.run(self.TASK, "k", "groq", depth=depth, fused=fused)
+            assert out["skills_used"] and all(isinstance(n, str) for n in out["skills_used"])
+
+    def test_full_depth_on_sharded_index(self, standin, monkeypatch):
+        import main
+        monkeypatch.setattr(main, "SKILL_SHARDS", 2)
+        monkeypatch.setattr(main, "_SHARDED", None)
+        try:
+            out = main.run(self.TASK, "k", "groq", depth="full")
+        finally:
+            if main._SHARDED is not None:
+                main._SHARDED.close()
+        assert out["execution"] and all(isinstance(n, str) for n in out["skills_used"])
+
+    def test_long_lived_skill_index(self, standin, monkeypatch):
+        import main
+        from skill_index import SkillIndex
+        monkeypatch.setattr(main, "SKILL_INDEX_WORKERS", 1)
+        monkeypatch.setattr(main, "_LOCAL", None)
+        rag = main._skills_rag()
+        assert isinstance(rag, SkillIndex) and rag.count and main._skills_rag() is rag
+        out = main.run(self.TASK, "k", "groq", depth="full")
+        assert out["execution"] and all(isinstance(n, str) for n in out["skills_used"])
+
+    def test_scoped_skills_rag(self, skills_rag):
+        from scopes import ScopeIndex, ScopedRAG
+        keys = [k for k, _, _ in skills_rag.retrieve(self.TASK, top_k=50)]
+        assert keys and all("::" in k for k in keys)
+        scopes = ScopeIndex()
+        for i, key in enumerate(keys):
+            scopes.add(key.rsplit("::", 1)[-1], {"globs": "**/*.sol"} if i == 0 else {})
+        hits = ScopedRAG(skills_rag, extensions=["py"], scopes=scopes).retrieve(self.TASK, top_k=50)
+        assert [k for k, _, _ in hits] == keys[1:]
+        hits = ScopedRAG(skills_rag, files=["Token.sol"], scopes=scopes).retrieve(self.TASK, top_k=50)
+        assert [k for k, _, _ in hits] == keys
+
+    def test_full_depth_profiles_each_step(self, standin, tmp_path):
+        import main
+        import profiling
+        with profiling.session("run", tmp_path) as s:
+            main.run(self.TASK, "k", "groq", depth="full")
+        stages = json.loads((s.dir / "summary.json").read_text())["stages"]
+        for name in ("byakugan", "mode_sage", "jougan", "selector", "execution"):
+            assert stages[name]["llm_s"] > 0 and (s.dir / f"{name}.pstats").is_file()
+
+    def test_full_depth_for_every_provider(self, standin):
+        import main
+        for provider in ("anthropic", "mistral"):
+            out = main.run(self.TASK, "k", provider, depth="full")
+            assert [s["module"] for s in out["stages"]] == ["byakugan", "mode_sage", "jougan"]
+            assert out["execution"] and set(out["timing"]) >= {"byakugan", "execution"}
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 #  ALLPATH RUNNER COMPATIBILITY
 # ──────────────────────────────────────────────────────────────────────────────
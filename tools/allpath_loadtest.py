@@ -0,0 +1,121 @@
+"""
+🥷 Load test — Dojutsu provider socket (framed vs legacy one-shot)
+
+    python tools/allpath_loadtest.py [socket] [function] [requests] [connections] [mode]
+
+mode: framed (default) — `connections` sockets, all requests pipelined on them
+      legacy           — one socket per request, `connections` at a time
+Prints requests/s and p50 / p99 latency as JSON. Use a non-LLM function
+(version, skills_count, check_skill) to measure the transport itself.
+"""
+import asyncio
+import itertools
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "providers" / "dojutsu-agent"))
+
+from server import DEFAULT_SOCKET, PREFACE, encode_frame, read_frame  # noqa: E402
+
+
+class FramedClient:
+    """Multiplexed client: many concurrent calls over one connection."""
+
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.pending, self.ids = {}, itertools.count(1)
+        self.stages, self.chunks = {}, {}
+        self._pump = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def connect(cls, path=DEFAULT_SOCKET):
+        reader, writer = await asyncio.open_unix_connection(path, limit=2 ** 26)
+        writer.write(PREFACE)
+        return cls(reader, writer)
+
+    async def _read_loop(self):
+        while True:
+            frame = await read_frame(self.reader)
+            if frame is None:
+                break
+            rid = frame.get("id")
+            if frame["type"] == "stage":
+                self.stages.setdefault(rid, []).append(frame["stage"])
+            elif frame["type"] == "chunk":
+                self.chunks.setdefault(rid, {}).setdefault(frame["field"], []).append(frame["data"])
+            elif rid in self.pending:
+                for field, parts in self.chunks.pop(rid, {}).items():
+                    frame["data"][field] = "".join(parts)
+                self.pending.pop(rid).set_result(frame)
+        for fut in self.pending.values():
+            fut.set_exception(ConnectionError("connection closed"))
+
+    async def call(self, function, args=()):
+        rid = next(self.ids)
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[rid] = fut
+        self.writer.write(encode_frame({"id": rid, "type": "call",
+                                        "function": function, "args": list(args)}))
+        await self.writer.drain()
+        return await fut
+
+    async def close(self):
+        self.writer.close()
+        await asyncio.gather(self._pump, return_exceptions=True)
+
+
+async def legacy_call(path, function, args=()):
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write(json.dumps({"package": "dojutsu-agent", "function": function,
+                             "args": list(args)}).encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return json.loads(data)
+
+
+async def bench(path, function, requests, connections, mode):
+    latencies = []
+
+    async def timed(coro):
+        t0 = time.perf_counter()
+        await coro
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        sem = asyncio.Semaphore(connections)
+
+        async def one():
+            async with sem:
+                await timed(legacy_call(path, function))
+        await asyncio.gather(*(one() for _ in range(requests)))
+    else:
+        clients = [await FramedClient.connect(path) for _ in range(connections)]
+        await asyncio.gather(*(timed(clients[i % connections].call(function))
+                               for i in range(requests)))
+        for c in clients:
+            await c.close()
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "mode": mode, "function": function, "requests": requests,
+        "connections": connections, "rps": round(requests / wall, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 2),
+        "p99_ms": round(1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 2),
+    }
+
+
+if __name__ == "__main__":
+    a = sys.argv[1:]
+    report = asyncio.run(bench(
+        a[0] if len(a) > 0 else DEFAULT_SOCKET,
+        a[1] if len(a) > 1 else "version",
+        int(a[2]) if len(a) > 2 else 2000,
+        int(a[3]) if len(a) > 3 else 8,
+        a[4] if len(a) > 4 else "framed",
+    ))
+    print(json.dumps(report, indent=2))
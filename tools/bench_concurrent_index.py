@@ -0,0 +1,89 @@
+"""
+🥷 Benchmark — concurrent retrieve throughput while the index is rebuilt
+
+    python tools/bench_concurrent_index.py [seconds] [max_threads]
+
+Reader threads loop over retrieve + get_content while one writer thread keeps
+re-running index_all. Compared: SkillIndex read lock-free from immutable
+generations vs the same index behind one global lock (the wrapper a server
+needed before). Reports aggregate queries/s per thread count and how many
+reindexes completed. On a GIL build pure-Python readers share one core, so
+the lock-free gain shows up as reads not stalling behind index_all; on a
+free-threaded build (3.13t) readers also run in parallel.
+"""
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "providers" / "dojutsu-agent"))
+
+from skill_index import SkillIndex  # noqa: E402
+
+QUERIES = ["fastapi async endpoint", "react hooks state", "rust ownership borrow",
+           "kubernetes helm chart", "postgres index tuning"]
+
+
+class Locked:
+    """SkillIndex behind one global lock — readers and index_all serialize."""
+
+    def __init__(self, index):
+        self.index, self.lock = index, threading.Lock()
+
+    def retrieve(self, *args):
+        with self.lock:
+            return self.index.retrieve(*args)
+
+    def get_content(self, keys):
+        with self.lock:
+            return self.index.get_content(keys)
+
+    def index_all(self, verbose=False):
+        with self.lock:
+            return self.index.index_all(verbose)
+
+
+def measure(rag, threads, seconds):
+    stop, counts = threading.Event(), [0] * threads
+
+    def reader(i):
+        while not stop.is_set():
+            for q in QUERIES:
+                rag.get_content([k for k, _, _ in rag.retrieve(q, 3)])
+            counts[i] += len(QUERIES)
+
+    reindexes = [0]
+
+    def writer():
+        while not stop.is_set():
+            rag.index_all(verbose=False)
+            reindexes[0] += 1
+
+    pool = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    pool.append(threading.Thread(target=writer))
+    for t in pool:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in pool:
+        t.join()
+    return {"threads": threads, "qps": round(sum(counts) / seconds, 1),
+            "reindexes": reindexes[0]}
+
+
+def main(argv):
+    seconds = float(argv[0]) if argv else 3.0
+    max_threads = int(argv[1]) if len(argv) > 1 else 8
+    index = SkillIndex()
+    index.index_all(verbose=False)
+    counts = [n for n in (1, 2, 4, 8, 16, 32) if n <= max_threads]
+    report = {"skills": index.count, "gil": getattr(sys, "_is_gil_enabled", lambda: True)(),
+              "lock_free": [measure(index, n, seconds) for n in counts],
+              "global_lock": [measure(Locked(index), n, seconds) for n in counts]}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
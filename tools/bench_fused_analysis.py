@@ -0,0 +1,123 @@
+"""
+🥷 Benchmark — fused analysis vs 3-call Byakugan → Mode Sage → Jōgan
+
+    python tools/bench_fused_analysis.py "<task>" [provider] [model] [runs]
+    python tools/bench_fused_analysis.py --offline "<task>" [runs]
+    python tools/bench_fused_analysis.py --standin "<task>" [runs] [key=value ...]
+
+Real mode calls the provider (API key from env, see main.py PROVIDER_ENV).
+Offline mode uses a canned answer and a simple cost model
+(prefill 0.2 ms/token, decode 10 ms/token) so prompt growth can be compared
+without burning quota. Standin mode runs the real HTTP client against
+tools/standin_provider.py (key=value options as there, e.g. tps=60
+latency=lognormal:-1,0.3). Tokens are estimated as chars / 4.
+"""
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "providers" / "dojutsu-agent"))
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_TASK = ("Build a production-ready async job queue with FastAPI, Redis Streams, "
+                "dead letter queue, idempotency keys, worker heartbeat, and backpressure")
+PREFILL_S, DECODE_S = 0.0002, 0.010
+
+
+def _tokens(text):
+    return max(1, len(text) // 4)
+
+
+class Meter:
+    """Wraps an llm_caller and records calls / prompt tokens / completion tokens."""
+
+    def __init__(self, llm):
+        self.llm, self.calls, self.prompt, self.completion = llm, 0, 0, 0
+
+    def __call__(self, system, messages, label="", max_tokens=3000):
+        self.calls += 1
+        self.prompt += _tokens(system) + sum(_tokens(m["content"]) for m in messages)
+        content, elapsed = self.llm(system, messages, label=label, max_tokens=max_tokens)
+        self.completion += _tokens(content)
+        return content, elapsed
+
+
+def offline_caller(system, messages, label="", max_tokens=3000):
+    prompt = _tokens(system) + sum(_tokens(m["content"]) for m in messages)
+    if "JSON" in system:
+        body = json.dumps({k: "analysis " * 150 for k in ("byakugan", "mode_sage", "jougan")})
+    else:
+        body = "analysis " * 150
+    return body, round(prompt * PREFILL_S + _tokens(body) * DECODE_S, 3)
+
+
+def three_calls(llm, task):
+    from senjutsu.core.byakugan import Byakugan
+    from senjutsu.core.mode_sage import ModeSage
+    from senjutsu.core.jougan import Jougan
+    b = Byakugan(llm).analyze(task)
+    ms = ModeSage(llm).evaluate(task, b)
+    jg = Jougan(llm).anticipate(task, b, ms)
+    return b["time"] + ms["time"] + jg["time"]
+
+
+def fused(llm, task):
+    from fused import FusedAnalysis
+    return sum(s["time"] for s in FusedAnalysis(llm).analyze(task))
+
+
+def bench(make_llm, task, runs):
+    report = {}
+    for name, fn in (("three_calls", three_calls), ("fused", fused)):
+        meter, latencies = Meter(make_llm()), []
+        for _ in range(runs):
+            t0 = time.time()
+            llm_time = fn(meter, task)
+            latencies.append(max(llm_time, time.time() - t0))
+        report[name] = {
+            "calls_per_run": meter.calls / runs,
+            "prompt_tokens_per_run": meter.prompt // runs,
+            "completion_tokens_per_run": meter.completion // runs,
+            "latency_median_s": round(statistics.median(latencies), 3),
+        }
+    a, f = report["three_calls"], report["fused"]
+    report["savings"] = {
+        "prompt_tokens_pct": round(100 * (1 - f["prompt_tokens_per_run"] / a["prompt_tokens_per_run"]), 1),
+        "latency_pct": round(100 * (1 - f["latency_median_s"] / a["latency_median_s"]), 1),
+    }
+    return report
+
+
+def main(argv):
+    if argv and argv[0] == "--offline":
+        task = argv[1] if len(argv) > 1 else DEFAULT_TASK
+        runs = int(argv[2]) if len(argv) > 2 else 3
+        report = bench(lambda: offline_caller, task, runs)
+    elif argv and argv[0] == "--standin":
+        import os
+        from llm_client import build_caller
+        from standin_provider import StandinServer
+        pos = [a for a in argv[1:] if "=" not in a]
+        opts = dict(a.split("=", 1) for a in argv[1:] if "=" in a)
+        task = pos[0] if pos else DEFAULT_TASK
+        runs = int(pos[1]) if len(pos) > 1 else 3
+        with StandinServer(**opts) as server:
+            os.environ["DOJUTSU_BASE_URL"] = server.url
+            report = bench(lambda: build_caller("standin", "groq", "standin"), task, runs)
+    else:
+        from main import _build_caller, _get_key, PROVIDER_DEFAULTS
+        task = argv[0] if argv else DEFAULT_TASK
+        provider = argv[1] if len(argv) > 1 else "groq"
+        model = argv[2] if len(argv) > 2 else PROVIDER_DEFAULTS[provider]
+        runs = int(argv[3]) if len(argv) > 3 else 3
+        key = _get_key("", provider)
+        report = bench(lambda: _build_caller(key, provider, model), task, runs)
+    report["task"] = task
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
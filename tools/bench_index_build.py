@@ -0,0 +1,55 @@
+"""
+🥷 Benchmark — serial vs parallel SkillIndex build
+
+    python tools/bench_index_build.py [replicas,...] [workers,...]
+
+For each corpus size (the built-in skills replicated `replicas` times, as in
+bench_sharded_index.py) times index_all at each worker count, and checks that
+every parallel build has the serial build's fingerprint (byte-identical
+state). Defaults: replicas 1,50 — workers 1,2,4 and the CPU count.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "providers" / "dojutsu-agent"))
+sys.path.insert(0, str(ROOT / "tools"))
+
+from bench_sharded_index import make_corpus  # noqa: E402
+from skill_index import SkillIndex  # noqa: E402
+
+
+def build(dirs, workers):
+    index = SkillIndex(dirs=dirs, workers=workers)
+    t0 = time.perf_counter()
+    count = index.index_all(verbose=False)
+    return count, time.perf_counter() - t0, index.snapshot().fingerprint()
+
+
+def main(argv):
+    replicas = [int(r) for r in argv[0].split(",")] if argv else [1, 50]
+    cpus = os.cpu_count() or 1
+    workers = ([int(w) for w in argv[1].split(",")] if len(argv) > 1
+               else sorted({1, 2, 4, cpus}))
+    report = {"cpus": cpus, "runs": []}
+    for r in replicas:
+        with tempfile.TemporaryDirectory() as tmp:
+            make_corpus(Path(tmp), r)
+            serial = None
+            for w in workers:
+                count, seconds, fp = build([tmp], w)
+                serial = serial or (seconds, fp)
+                report["runs"].append({"replicas": r, "skills": count, "workers": w,
+                                       "build_s": round(seconds, 2),
+                                       "speedup": round(serial[0] / seconds, 2),
+                                       "identical": fp == serial[1]})
+                print(json.dumps(report["runs"][-1]), file=sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
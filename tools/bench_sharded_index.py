@@ -0,0 +1,82 @@
+"""
+🥷 Benchmark — single vs sharded skills index
+
+    python tools/bench_sharded_index.py [replicas] [shards,...] [queries]
+
+Builds a synthetic corpus by replicating the built-in skills `replicas` times
+(symlinked into a temp dir under suffixed keys), then measures index build
+time and retrieve() latency (p50 / p99) for a single SkillIndex and for
+ShardedSkillIndex at each shard count. Also checks that every shard count
+returns the same top-k as the single index.
+"""
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "providers" / "dojutsu-agent"))
+
+from sharded_index import ShardedSkillIndex  # noqa: E402
+from skill_index import SkillIndex  # noqa: E402
+from skills_corpus import SKILLS_DIR, iter_skill_files  # noqa: E402
+
+QUERIES = [
+    "fastapi async endpoint with pydantic validation",
+    "react hooks state management",
+    "rust ownership and borrowing",
+    "kubernetes deployment helm chart",
+    "postgres query optimization index",
+    "django rest framework authentication",
+    "terraform aws infrastructure module",
+    "flutter widget testing",
+]
+
+
+def make_corpus(root, replicas):
+    for key, path in iter_skill_files([SKILLS_DIR]):
+        for r in range(replicas):
+            d = root / (key if r == 0 else f"{key}--r{r}")
+            d.mkdir()
+            (d / "SKILL.md").symlink_to(path)
+
+
+def measure(index, queries):
+    t0 = time.perf_counter()
+    count = index.index_all(verbose=False)
+    build = time.perf_counter() - t0
+    lat, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(index.retrieve(q, top_k=5))
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    return {
+        "skills": count,
+        "build_s": round(build, 2),
+        "p50_ms": round(statistics.median(lat), 2),
+        "p99_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))], 2),
+    }, results
+
+
+def main(argv):
+    replicas = int(argv[0]) if argv else 10
+    shard_counts = [int(s) for s in argv[1].split(",")] if len(argv) > 1 else [1, 2, 4, 8]
+    n = int(argv[2]) if len(argv) > 2 else 200
+    queries = [QUERIES[i % len(QUERIES)] for i in range(n)]
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        make_corpus(Path(tmp), replicas)
+        report["single"], expected = measure(SkillIndex(dirs=[tmp]), queries)
+        for shards in shard_counts:
+            with ShardedSkillIndex(shards=shards, dirs=[tmp]) as index:
+                stats, results = measure(index, queries)
+            stats["identical"] = results == expected
+            report[f"shards={shards}"] = stats
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,97 @@
+"""
+🥷 Benchmark — per-worker memory: private index vs shared-memory index
+
+    python tools/bench_shm_index.py [workers] [replicas]
+
+Starts `workers` fresh processes twice: once each building its own SkillIndex,
+once each attaching to one index published with shm_index.publish. Every
+worker runs a few queries, then reports its startup time and private memory
+(USS: Private_Clean + Private_Dirty from /proc/self/smaps_rollup, Linux).
+`replicas` > 1 replicates the built-in corpus to emulate a larger skills set.
+"""
+import json
+import multiprocessing as mp
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "providers" / "dojutsu-agent"))
+sys.path.insert(0, str(ROOT / "tools"))
+
+QUERIES = ["fastapi async endpoint", "react hooks state", "rust ownership borrow",
+           "kubernetes helm chart", "postgres index tuning"]
+
+
+def _uss_kb():
+    rollup = Path("/proc/self/smaps_rollup")
+    if not rollup.is_file():
+        return None
+    fields = dict(line.split(":", 1) for line in rollup.read_text().splitlines()[1:])
+    return sum(int(fields[f].split()[0]) for f in ("Private_Clean", "Private_Dirty"))
+
+
+def _worker(mode, arg, out):
+    base = _uss_kb()
+    t0 = time.perf_counter()
+    if mode == "private":
+        from skill_index import SkillIndex
+        index = SkillIndex(dirs=arg)
+        index.index_all(verbose=False)
+    else:
+        from shm_index import attach
+        index = attach(arg)
+    ready = time.perf_counter() - t0
+    for q in QUERIES:
+        index.retrieve(q, top_k=5)
+        index.get_content([k for k, _, _ in index.retrieve(q, top_k=3)])
+    uss = _uss_kb()
+    out.put({"startup_ms": ready * 1000, "uss_kb": uss - base if uss is not None else None})
+    if mode == "shared":
+        index.close()
+
+
+def run(mode, arg, workers):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(mode, arg, out)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    uss = [r["uss_kb"] for r in results if r["uss_kb"] is not None]
+    return {"workers": workers,
+            "startup_ms_median": round(statistics.median(r["startup_ms"] for r in results), 2),
+            "private_mb_per_worker": round(statistics.median(uss) / 1024, 1) if uss else None}
+
+
+def main(argv):
+    workers = int(argv[0]) if argv else 4
+    replicas = int(argv[1]) if len(argv) > 1 else 1
+    from bench_sharded_index import make_corpus
+    from shm_index import publish
+    from skill_index import SkillIndex
+    with tempfile.TemporaryDirectory() as tmp:
+        make_corpus(Path(tmp), replicas)
+        dirs = [tmp]
+        index = SkillIndex(dirs=dirs)
+        index.index_all(verbose=False)
+        t0 = time.perf_counter()
+        shared = publish(index)
+        report = {"skills": index.count,
+                  "segment_mb": round(shared.shm.size / 2 ** 20, 1),
+                  "publish_ms": round((time.perf_counter() - t0) * 1000, 1)}
+        del index
+        try:
+            report["private"] = run("private", dirs, workers)
+            report["shared"] = run("shared", shared.name, workers)
+        finally:
+            shared.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
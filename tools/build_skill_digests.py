@@ -0,0 +1,56 @@
+"""
+🥷 Build precomputed skill digests (offline step)
+
+    python tools/build_skill_digests.py [skills_dir ...]
+
+Writes <skills_dir>/digests.json (default: senjutsu/skills plus
+DOJUTSU_SKILLS_PATH) and prints the prompt-size reduction per budget level.
+Re-run after adding or editing skills; stale entries fall back to the full
+SKILL.md at runtime.
+"""
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "providers" / "dojutsu-agent"))
+
+import digests  # noqa: E402
+from skills_corpus import read_skill, skill_dirs  # noqa: E402
+
+
+def _digest_tokens(root, key, entry, budget):
+    spans = entry["levels"][str(budget)]
+    if spans is None:
+        return entry["tokens"]
+    text = read_skill(Path(root) / key / "SKILL.md")
+    return digests.tokens_of("\n".join(text[s:e] for s, e in spans))
+
+
+def report(root, data):
+    skills = data["skills"]
+    full = [e["tokens"] for e in skills.values()]
+    levels = {}
+    for b in data["budgets"]:
+        sizes = [_digest_tokens(root, k, e, b) for k, e in skills.items()]
+        levels[str(b)] = {
+            "avg_tokens": round(statistics.mean(sizes)),
+            "reduction_pct": round(100 * (1 - sum(sizes) / sum(full)), 1),
+        }
+    return {"skills": len(skills), "full_avg_tokens": round(statistics.mean(full)),
+            "full_max_tokens": max(full), "levels": levels}
+
+
+def main(argv):
+    roots = [Path(a) for a in argv] or [r for r in skill_dirs() if r.is_dir()]
+    out = {}
+    for root in roots:
+        t0 = time.time()
+        data = digests.build(root)
+        out[str(root)] = dict(report(root, data), build_seconds=round(time.time() - t0, 2))
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,421 @@
+"""
+🥷 Local stand-in provider — OpenAI-compatible + Anthropic Messages, offline
+
+    python tools/standin_provider.py [serve] [key=value ...]
+    python tools/standin_provider.py bench [requests=2000] [concurrency=32] [key=value ...]
+
+Serves POST /v1/chat/completions and /v1/messages (with `stream: true` as SSE)
+and GET /v1/models — the subset llm_client.py and the provider SDKs use.
+Point any provider at it:
+
+    DOJUTSU_BASE_URL=http://127.0.0.1:8089/v1 python providers/dojutsu-agent/main.py run "…"
+
+Options (key=value):
+  port=8089            listen port (0 = any)
+  latency=fixed:0      time to first token: fixed:s | uniform:a,b | normal:mu,sigma |
+                       lognormal:mu,sigma | exp:mean
+  tps=0                decode speed in tokens/s (0 = instant)
+  tokens=64            completion length (capped by max_tokens)
+  errors=0             fraction of requests answered 500
+  rate429=0            fraction answered 429 with retry-after
+  retry_after=0.1      seconds advertised on 429s
+  seed=0               every draw derives from (seed, request body, occurrence)
+  record=FILE upstream=URL   forward to a real provider, append answers to a cassette
+  replay=FILE          answer from a cassette; unknown requests get 404
+
+Cassettes are JSON lines {key, path, response}; the key hashes the path and the
+request body (minus stream flags), never the API key. `bench` drives
+llm_client callers through an in-process stand-in and prints rps / p50 / p99.
+"""
+import hashlib
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "providers" / "dojutsu-agent"))
+
+WORDS = ("async", "queue", "worker", "retry", "backoff", "idempotent", "stream", "schema",
+         "handler", "cache", "index", "token", "commit", "rollback", "metric", "trace")
+FORWARD_HEADERS = ("authorization", "x-api-key", "anthropic-version", "content-type")
+
+
+def parse_dist(spec):
+    """'lognormal:-2.3,0.5' → sampler(rng) → seconds (never negative)."""
+    kind, _, raw = str(spec).partition(":")
+    args = [float(a) for a in raw.split(",") if a.strip()]
+    samplers = {
+        "fixed":     lambda rng: args[0] if args else 0.0,
+        "uniform":   lambda rng: rng.uniform(args[0], args[1]),
+        "normal":    lambda rng: rng.gauss(args[0], args[1]),
+        "lognormal": lambda rng: rng.lognormvariate(args[0], args[1]),
+        "exp":       lambda rng: rng.expovariate(1 / args[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}'. Use: {', '.join(samplers)}")
+    sampler = samplers[kind]
+    return lambda rng: max(0.0, sampler(rng))
+
+
+def request_key(path, body):
+    canon = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+    raw = json.dumps([path.rsplit("/", 1)[-1], canon], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class Cassette:
+    """Recorded provider answers, keyed by request_key."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries, self._lock = {}, threading.Lock()
+        if self.path.is_file():
+            for line in self.path.read_text().splitlines():
+                if line.strip():
+                    e = json.loads(line)
+                    self.entries[e["key"]] = e["response"]
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, path, response):
+        with self._lock:
+            if key in self.entries:
+                return
+            self.entries[key] = response
+            with self.path.open("a") as f:
+                f.write(json.dumps({"key": key, "path": path, "response": response}) + "\n")
+
+
+def _text_of(content):
+    if isinstance(content, list):
+        return "".join(b.get("text", "") for b in content if isinstance(b, dict))
+    return content or ""
+
+
+def _prompt_parts(body):
+    """(system text, full prompt text) for either API shape."""
+    messages = body.get("messages", [])
+    if "system" in body:
+        system = _text_of(body["system"])
+    else:
+        system = next((_text_of(m["content"]) for m in messages if m.get("role") == "system"), "")
+    prompt = system + "".join(_text_of(m.get("content")) for m in messages
+                              if m.get("role") != "system")
+    return system, prompt
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # load tests open hundreds of connections at once
+
+
+class StandinServer:
+    def __init__(self, port=0, latency="fixed:0", tps=0, tokens=64, errors=0.0, rate429=0.0,
+                 retry_after=0.1, seed=0, record=None, upstream=None, replay=None,
+                 host="127.0.0.1"):
+        self.ttft = parse_dist(latency)
+        self.tps, self.tokens = float(tps), int(tokens)
+        self.errors, self.rate429 = float(errors), float(rate429)
+        self.retry_after, self.seed = float(retry_after), seed
+        if record and not upstream:
+            raise ValueError("record= needs upstream=<provider base URL>")
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.cassette = Cassette(record or replay) if (record or replay) else None
+        self.replaying = bool(replay)
+        self.stats = {"requests": 0, "ok": 0, "streamed": 0, "errors": 0, "429": 0,
+                      "recorded": 0, "replayed": 0, "misses": 0}
+        self._seen, self._prefixes = {}, set()
+        self._lock = threading.Lock()
+        self.httpd = _HTTPServer((host, int(port)), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ── behaviour ────────────────────────────────────────────────────────────
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _rng(self, key):
+        with self._lock:
+            n = self._seen[key] = self._seen.get(key, 0) + 1
+        return random.Random(f"{self.seed}:{key}:{n}")
+
+    def _synthetic(self, body, anthropic):
+        system, prompt = _prompt_parts(body)
+        with self._lock:
+            cached = len(system) // 4 if system and system in self._prefixes else 0
+            self._prefixes.add(system)
+        n = max(1, min(self.tokens, int(body.get("max_tokens") or self.tokens)))
+        text = " ".join(WORDS[(len(prompt) + i) % len(WORDS)] for i in range(n))
+        prompt_tokens = max(1, len(prompt) // 4)
+        if anthropic:
+            return {"id": "msg_standin", "type": "message", "role": "assistant",
+                    "model": body.get("model", ""), "stop_reason": "end_turn",
+                    "content": [{"type": "text", "text": text}],
+                    "usage": {"input_tokens": prompt_tokens - cached, "output_tokens": n,
+                              "cache_read_input_tokens": cached}}
+        return {"id": "chatcmpl-standin", "object": "chat.completion",
+                "model": body.get("model", ""),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": n,
+                          "total_tokens": prompt_tokens + n,
+                          "prompt_tokens_details": {"cached_tokens": cached}}}
+
+    def _forward(self, path, body, headers):
+        """Non-streaming call to the real provider → (status, parsed JSON)."""
+        suffix = path.split("/v1", 1)[1] if "/v1" in path else path
+        u = urllib.parse.urlsplit(self.upstream + suffix)
+        cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+        conn = cls(u.hostname, u.port, timeout=300)
+        try:
+            payload = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+            fwd = {k: v for k, v in headers.items() if k.lower() in FORWARD_HEADERS}
+            conn.request("POST", u.path, body=json.dumps(payload).encode(), headers=fwd)
+            resp = conn.getresponse()
+            raw = resp.read()
+        finally:
+            conn.close()
+        try:
+            return resp.status, json.loads(raw)
+        except ValueError:
+            return resp.status, {"error": {"message": raw[:300].decode("utf-8", "replace")}}
+
+    def answer(self, path, body, headers):
+        """(status, headers, JSON body or None, sampled ttft, decode seconds)."""
+        anthropic = path.endswith("/messages")
+        key = request_key(path, body)
+        rng = self._rng(key)
+        ttft = self.ttft(rng)
+        roll = rng.random()
+        if roll < self.rate429:
+            self._count("429")
+            extra = {"retry-after": f"{self.retry_after:g}",
+                     "x-ratelimit-reset-requests": f"{self.retry_after:g}s"}
+            return 429, extra, _error(anthropic, "rate_limit_error", "stand-in 429"), 0.0, 0.0
+        if roll < self.rate429 + self.errors:
+            self._count("errors")
+            return 500, {}, _error(anthropic, "api_error", "stand-in injected error"), ttft, 0.0
+        if self.cassette is not None and self.cassette.get(key) is not None:
+            self._count("replayed")
+            data = self.cassette.get(key)
+        elif self.replaying:
+            self._count("misses")
+            return 404, {}, _error(anthropic, "not_found_error",
+                                   f"no cassette entry for request {key[:12]}"), 0.0, 0.0
+        elif self.upstream:
+            status, data = self._forward(path, body, headers)
+            if status != 200:
+                return status, {}, data, 0.0, 0.0
+            self.cassette.put(key, path, data)
+            self._count("recorded")
+            ttft = 0.0  # the upstream call already took real time
+        else:
+            data = self._synthetic(body, anthropic)
+        out_tokens = (data.get("usage") or {}).get("completion_tokens",
+                                                  (data.get("usage") or {}).get("output_tokens", 0))
+        decode = out_tokens / self.tps if self.tps > 0 else 0.0
+        self._count("ok")
+        return 200, {}, data, ttft, decode
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, data, extra=None):
+                raw = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for k, v in (extra or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json(200, {"object": "list", "data": [
+                        {"id": "standin", "object": "model", "owned_by": "dojutsu"}]})
+                else:
+                    self._json(404, {"error": {"message": f"no route {self.path}"}})
+
+            def do_POST(self):
+                server._count("requests")
+                path = urllib.parse.urlsplit(self.path).path
+                if not path.endswith(("/chat/completions", "/messages")):
+                    self._json(404, {"error": {"message": f"no route {path}"}})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                except ValueError:
+                    self._json(400, {"error": {"message": "invalid JSON body"}})
+                    return
+                status, extra, data, ttft, decode = server.answer(path, body, self.headers)
+                time.sleep(ttft)
+                if status != 200 or not body.get("stream"):
+                    time.sleep(decode)
+                    self._json(status, data, extra)
+                    return
+                server._count("streamed")
+                if path.endswith("/messages"):
+                    events = _anthropic_events(data)
+                else:
+                    events = _openai_chunks(data, (body.get("stream_options") or {})
+                                            .get("include_usage"))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                pieces = max(1, sum(1 for _, _, tok in events if tok))
+                for name, payload, tok in events:
+                    if tok and decode:
+                        time.sleep(decode / pieces)
+                    head = f"event: {name}\n" if name else ""
+                    self.wfile.write(f"{head}data: {payload}\n\n".encode())
+                    self.wfile.flush()
+
+        return Handler
+
+
+def _error(anthropic, kind, message):
+    if anthropic:
+        return {"type": "error", "error": {"type": kind, "message": message}}
+    return {"error": {"type": kind, "message": message}}
+
+
+def _pieces(text):
+    words = text.split(" ")
+    return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+
+def _openai_chunks(data, include_usage):
+    """[(event name, data line, carries a token)] for an OpenAI chat stream."""
+    msg = data["choices"][0]["message"]
+    base = {"id": data.get("id", "chatcmpl-standin"), "object": "chat.completion.chunk",
+            "model": data.get("model", "")}
+
+    def chunk(delta, finish=None):
+        return json.dumps(dict(base, choices=[{"index": 0, "delta": delta,
+                                               "finish_reason": finish}]))
+    out = [(None, chunk({"role": "assistant", "content": ""}), False)]
+    out += [(None, chunk({"content": p}), True) for p in _pieces(msg.get("content") or "")]
+    out.append((None, chunk({}, data["choices"][0].get("finish_reason", "stop")), False))
+    if include_usage:
+        out.append((None, json.dumps(dict(base, choices=[], usage=data.get("usage"))), False))
+    out.append((None, "[DONE]", False))
+    return out
+
+
+def _anthropic_events(data):
+    """[(event name, data line, carries a token)] for an Anthropic Messages stream."""
+    text = "".join(b.get("text", "") for b in data.get("content", []) if b.get("type") == "text")
+    usage = data.get("usage", {})
+    start = dict(data, content=[], stop_reason=None, usage=dict(usage, output_tokens=0))
+    ev = [("message_start", {"type": "message_start", "message": start}, False),
+          ("content_block_start", {"type": "content_block_start", "index": 0,
+                                   "content_block": {"type": "text", "text": ""}}, False)]
+    ev += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                    "delta": {"type": "text_delta", "text": p}}, True)
+           for p in _pieces(text)]
+    ev += [("content_block_stop", {"type": "content_block_stop", "index": 0}, False),
+           ("message_delta", {"type": "message_delta",
+                              "delta": {"stop_reason": data.get("stop_reason", "end_turn")},
+                              "usage": {"output_tokens": usage.get("output_tokens", 0)}}, False),
+           ("message_stop", {"type": "message_stop"}, False)]
+    return [(name, json.dumps(payload), tok) for name, payload, tok in ev]
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+SERVER_OPTS = ("port", "latency", "tps", "tokens", "errors", "rate429", "retry_after", "seed",
+               "record", "upstream", "replay", "host")
+
+
+def bench(requests=2000, concurrency=32, provider="groq", model="standin", **opts):
+    """Drive llm_client callers through an in-process stand-in."""
+    import os
+    os.environ.setdefault("DOJUTSU_RPM", "1000000")
+    os.environ.setdefault("DOJUTSU_TPM", "1000000000")
+    from llm_client import LLMError, build_caller
+    with StandinServer(**opts) as server:
+        os.environ["DOJUTSU_BASE_URL"] = server.url
+        caller = build_caller("standin-key", provider, model)
+        system = "You are a senior engineer. " * 40
+
+        def one(i):
+            t0 = time.perf_counter()
+            try:
+                caller(system, [{"role": "user", "content": f"Task {i}"}], label="Execution",
+                       max_tokens=256)
+                ok = True
+            except LLMError:
+                ok = False
+            return ok, (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(int(concurrency)) as pool:
+            results = list(pool.map(one, range(int(requests))))
+        elapsed = time.perf_counter() - t0
+    lat = sorted(ms for _, ms in results)
+    return {"requests": int(requests), "concurrency": int(concurrency),
+            "failed": sum(1 for ok, _ in results if not ok),
+            "rps": round(len(results) / elapsed, 1),
+            "p50_ms": round(statistics.median(lat), 1),
+            "p99_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))], 1),
+            "server": server.stats}
+
+
+def main(argv):
+    mode = argv[0] if argv and "=" not in argv[0] else "serve"
+    opts = dict(a.split("=", 1) for a in argv if "=" in a)
+    if mode == "bench":
+        print(json.dumps(bench(**opts), indent=2))
+        return
+    opts.setdefault("port", "8089")
+    unknown = set(opts) - set(SERVER_OPTS)
+    if unknown:
+        raise SystemExit(f"Unknown options: {sorted(unknown)}. Use: {', '.join(SERVER_OPTS)}")
+    server = StandinServer(**opts)
+    print(json.dumps({"base_url": server.url}), file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])